@@ -1,6 +1,8 @@
 # Copyright 2018 Easymov Robotics
 # Licensed under the Apache License, Version 2.0
 
+import os
+
 # try import since this package doesn't depend on colcon-argcomplete
 try:
     from colcon_argcomplete.argcomplete_completer \
@@ -8,6 +10,8 @@ try:
 except ImportError:
     class ArgcompleteCompleterExtensionPoint:  # noqa: D101
         pass
+from colcon_cargo.argcomplete_completer.completion_index \
+    import load_completions
 from colcon_core.plugin_system import satisfies_version
 
 
@@ -28,4 +32,6 @@ class CargoArgcompleteCompleter(ArgcompleteCompleterExtensionPoint):
         except ImportError:
             return None
 
-        return ChoicesCompleter([])
+        # the index is recorded when packages are discovered, so completing
+        # doesn't need to parse manifests or invoke cargo
+        return ChoicesCompleter(load_completions(os.getcwd()))
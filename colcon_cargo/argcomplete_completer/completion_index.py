@@ -0,0 +1,244 @@
+# Copyright 2025 Open Source Robotics Foundation, Inc.
+# Licensed under the Apache License, Version 2.0
+
+import atexit
+import json
+import os
+from pathlib import Path
+import threading
+
+from colcon_cargo.package_identification.cargo import read_cargo_toml
+from colcon_cargo.task.cargo import get_cache_path
+from colcon_core.logging import colcon_logger
+
+logger = colcon_logger.getChild(__name__)
+
+# The options of `cargo build` and `cargo test` which are offered for
+# completion independent of the packages
+CARGO_ARGS = (
+    '--all-features', '--all-targets', '--bench', '--benches', '--bin',
+    '--bins', '--config', '--doc', '--example', '--examples', '--features',
+    '--frozen', '--jobs', '--keep-going', '--lib', '--locked',
+    '--no-default-features', '--no-fail-fast', '--no-run', '--offline',
+    '--profile', '--quiet', '--release', '--target', '--test', '--tests',
+    '--timings', '--verbose',
+)
+
+# The profiles which exist without being declared in a manifest
+BUILTIN_PROFILES = ('bench', 'dev', 'release', 'test')
+
+_pending = {}
+_pending_lock = threading.Lock()
+# The index as it was when the first package was recorded
+_recorded = None
+# The content of workspace manifests by path, modification time and size
+_manifests = {}
+
+
+def get_index_path():
+    """
+    Get the path of the completion index.
+
+    :rtype: Path
+    """
+    return get_cache_path('completion', 'cargo_args.json')
+
+
+def get_package_completions(path, content, *, workspace=None):
+    """
+    Collect the names offered for completion from a package manifest.
+
+    Besides the tables of the manifest the targets which cargo discovers
+    automatically from the layout of the package are considered.
+
+    :param path: The directory of the package
+    :param dict content: The content of the `Cargo.toml` file
+    :param dict workspace: The content of the root manifest of the workspace
+      the package is a member of, which declares the profiles
+    :returns: The sorted profile, feature, bin and example names
+    :rtype: dict
+    """
+    path = Path(path)
+    profiles = set(BUILTIN_PROFILES) | set(content.get('profile', {}))
+    if workspace is not None:
+        profiles.update(workspace.get('profile', {}))
+    package = content.get('package', {})
+    features = set(content.get('features', {}))
+    # optional dependencies are implicit features
+    features.update(
+        name for name, spec in content.get('dependencies', {}).items()
+        if isinstance(spec, dict) and spec.get('optional'))
+    bins = _get_target_names(content, 'bin', path / 'src' / 'bin')
+    if package.get('name') and (path / 'src' / 'main.rs').is_file():
+        bins.add(package['name'])
+    return {
+        'profiles': sorted(profiles),
+        'features': sorted(features),
+        'bins': sorted(bins),
+        'examples': sorted(
+            _get_target_names(content, 'example', path / 'examples')),
+    }
+
+
+def record_package(path, content):
+    """
+    Record the completions of a package in the index.
+
+    The completions are only collected again if the manifest or the
+    directories containing automatically discovered targets were modified
+    since the package was last recorded, so changes to the profiles of a
+    workspace are picked up once the manifest of the package changes.
+    The index is only written when the process exits and only if the
+    completions of any package changed.
+
+    :param path: The directory of the package
+    :param dict content: The content of the `Cargo.toml` file
+    """
+    global _recorded
+    key = os.path.realpath(str(path))
+    stamp = _get_stamp(Path(key))
+    with _pending_lock:
+        if _recorded is None:
+            _recorded = _load_index(get_index_path())
+        if _recorded.get(key, {}).get('stamp') == stamp:
+            return
+    completions = get_package_completions(
+        path, content, workspace=_read_workspace(Path(key), content))
+    completions['stamp'] = stamp
+    with _pending_lock:
+        if not _pending:
+            atexit.register(write_index)
+        _pending[key] = completions
+
+
+def write_index():
+    """Merge the recorded completions into the index."""
+    with _pending_lock:
+        pending = dict(_pending)
+        _pending.clear()
+    if not pending:
+        return
+    path = get_index_path()
+    index = _load_index(path)
+    if all(index.get(k) == v for k, v in pending.items()):
+        return
+    index.update(pending)
+    # forget packages which don't exist anymore
+    index = {
+        k: v for k, v in index.items()
+        if os.path.isfile(os.path.join(k, 'Cargo.toml'))}
+    # replace the index atomically since completions may read it any time
+    temp_path = path.parent / f'{path.name}.{os.getpid()}.tmp'
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path.write_text(json.dumps(index, sort_keys=True))
+        os.replace(str(temp_path), str(path))
+    except OSError as e:
+        logger.debug(f'Failed to write the completion index: {e}')
+        if temp_path.exists():
+            temp_path.unlink()
+
+
+def load_completions(base_path=None):
+    """
+    Load the values offered to complete Cargo arguments.
+
+    :param base_path: Only consider packages within this directory, if any
+      of the indexed packages are located in it
+    :returns: The Cargo options and the names of profiles, features and
+      targets, each prefixed by a space since `--cargo-args` requires it for
+      arguments starting with a dash
+    :rtype: list
+    """
+    index = _load_index(get_index_path())
+    if base_path is not None:
+        base_path = os.path.join(os.path.realpath(str(base_path)), '')
+        local = {
+            k: v for k, v in index.items()
+            if os.path.join(k, '').startswith(base_path)}
+        if local:
+            index = local
+
+    values = {
+        '--profile': set(BUILTIN_PROFILES), '--features': set(),
+        '--bin': set(), '--example': set()}
+    for completions in index.values():
+        values['--profile'].update(completions.get('profiles', ()))
+        values['--features'].update(completions.get('features', ()))
+        values['--bin'].update(completions.get('bins', ()))
+        values['--example'].update(completions.get('examples', ()))
+
+    # the names are offered as separate words rather than combined with the
+    # options using `=` which argcomplete doesn't handle well
+    choices = set(CARGO_ARGS)
+    for names in values.values():
+        choices.update(names)
+    return [f' {choice}' for choice in sorted(choices)]
+
+
+def _get_target_names(content, kind, directory):
+    names = {
+        target['name'] for target in content.get(kind, ())
+        if isinstance(target, dict) and target.get('name')}
+    if content.get('package', {}).get(f'auto{kind}s', True) and \
+            directory.is_dir():
+        for entry in directory.iterdir():
+            if entry.suffix == '.rs' and entry.is_file():
+                names.add(entry.stem)
+            elif (entry / 'main.rs').is_file():
+                names.add(entry.name)
+    return names
+
+
+def _get_stamp(path):
+    # the modification times of the directories change when targets are
+    # added or removed
+    stamp = []
+    for p in (
+        path / 'Cargo.toml', path / 'src', path / 'src' / 'bin',
+        path / 'examples',
+    ):
+        try:
+            st = p.stat()
+        except OSError:
+            stamp.append(None)
+        else:
+            stamp.append([st.st_mtime_ns, st.st_size])
+    return stamp
+
+
+def _read_workspace(path, content):
+    # the profiles of a workspace are declared in its root manifest, which
+    # is a virtual manifest without a package if the root isn't a member
+    if 'workspace' in content:
+        return content
+    explicit = content.get('package', {}).get('workspace')
+    directories = [path / explicit] if explicit else path.parents
+    for directory in directories:
+        workspace = _read_manifest(directory / 'Cargo.toml')
+        if workspace is not None and 'workspace' in workspace:
+            return workspace
+    return None
+
+
+def _read_manifest(manifest):
+    try:
+        st = manifest.stat()
+    except OSError:
+        return None
+    key = (str(manifest), st.st_mtime_ns, st.st_size)
+    if key not in _manifests:
+        try:
+            _manifests[key] = read_cargo_toml(manifest)
+        except (OSError, ValueError):
+            _manifests[key] = None
+    return _manifests[key]
+
+
+def _load_index(path):
+    try:
+        with path.open() as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return index if isinstance(index, dict) else {}
@@ -0,0 +1,209 @@
+# Copyright 2025 Open Source Robotics Foundation, Inc.
+# Licensed under the Apache License, Version 2.0
+
+import atexit
+import functools
+import json
+import os
+from pathlib import Path
+import re
+import threading
+import time
+
+from colcon_core.environment_variable import EnvironmentVariable
+
+"""Environment variable to enable the machine readable event log"""
+EVENT_LOG_ENVIRONMENT_VARIABLE = EnvironmentVariable(
+    'COLCON_CARGO_EVENT_LOG',
+    'Append the events of colcon-cargo as JSON lines to this file, or to a '
+    'file named after the process id if it is a directory')
+
+# The summary line of each test binary run by the libtest harness, e.g.
+# `test result: ok. 3 passed; 1 failed; 2 ignored; 0 measured; ...`
+TEST_RESULT_PATTERN = re.compile(
+    r'^test result: \w+\. (?P<passed>\d+) passed; (?P<failed>\d+) failed; '
+    r'(?P<ignored>\d+) ignored', re.MULTILINE)
+
+_UNSET = object()
+_event_log = _UNSET
+_event_log_lock = threading.Lock()
+
+
+class EventLog:
+    """
+    A log of events written as one JSON object per line.
+
+    Each event is appended with a single write as soon as it happens, so the
+    log can be followed while the build is running and multiple processes
+    can append to the same file.
+    """
+
+    def __init__(self, path):
+        """
+        Open the log.
+
+        :param path: The path of the file, or of a directory to create a file
+          named after the process id in
+        """
+        path = Path(path)
+        if path.is_dir():
+            path = path / f'colcon_cargo_events_{os.getpid()}.jsonl'
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self._fd = os.open(
+            str(path), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+
+    def write(self, event, **fields):
+        """
+        Append an event.
+
+        :param str event: The type of the event
+        :param fields: The JSON serializable data of the event
+        """
+        record = {'time': time.time(), 'pid': os.getpid(), 'event': event}
+        record.update(fields)
+        os.write(self._fd, (json.dumps(record) + '\n').encode())
+
+    def close(self):
+        """Close the log."""
+        os.close(self._fd)
+
+
+def get_event_log():
+    """
+    Get the event log of the current process.
+
+    The event log is enabled by setting the environment variable
+    `COLCON_CARGO_EVENT_LOG`.
+
+    :returns: The event log, or None if it isn't enabled
+    :rtype: EventLog
+    """
+    global _event_log
+    if _event_log is _UNSET:
+        with _event_log_lock:
+            if _event_log is _UNSET:
+                path = os.environ.get(EVENT_LOG_ENVIRONMENT_VARIABLE.name)
+                _event_log = None
+                if path:
+                    _event_log = EventLog(path)
+                    atexit.register(_event_log.close)
+    return _event_log
+
+
+def log_event(event, **fields):
+    """
+    Append an event to the event log if it is enabled.
+
+    :param str event: The type of the event
+    :param fields: The JSON serializable data of the event
+    """
+    event_log = get_event_log()
+    if event_log is not None:
+        event_log.write(event, **fields)
+
+
+def logged_task(task_name):
+    """
+    Decorate the coroutine of a task to log when it starts and finishes.
+
+    :param str task_name: The name of the task, e.g. `build`
+    """
+    def decorator(function):
+        @functools.wraps(function)
+        async def wrapper(self, *args, **kwargs):
+            if get_event_log() is None:
+                return await function(self, *args, **kwargs)
+            package = self.context.pkg.name
+            log_event('start', package=package, task=task_name)
+            start = time.monotonic()
+            returncode = None
+            try:
+                rc = await function(self, *args, **kwargs)
+                returncode = rc or 0
+                return rc
+            finally:
+                # the return code is None if the task raised an exception
+                log_event(
+                    'finish', package=package, task=task_name,
+                    duration=time.monotonic() - start, returncode=returncode)
+        return wrapper
+    return decorator
+
+
+async def logged_command(package, cmd, coroutine):
+    """
+    Await a subprocess and log its duration if the event log is enabled.
+
+    :param str package: The package name
+    :param list cmd: The command, starting with the executable and the
+      subcommand
+    :param coroutine: The awaitable running the command
+    :returns: The result of the awaitable
+    """
+    if get_event_log() is None:
+        return await coroutine
+    start = time.monotonic()
+    completed = None
+    try:
+        completed = await coroutine
+    finally:
+        log_event(
+            'command', package=package,
+            command=[os.path.basename(str(cmd[0]))] + list(cmd[1:2]),
+            duration=time.monotonic() - start,
+            returncode=getattr(completed, 'returncode', None))
+    return completed
+
+
+def count_test_results(output):
+    """
+    Count the tests in the output of the libtest harness.
+
+    :param str output: The output of `cargo test`
+    :returns: The number of passed, failed and ignored tests of all test
+      binaries
+    :rtype: dict
+    """
+    counts = {'passed': 0, 'failed': 0, 'ignored': 0}
+    for match in TEST_RESULT_PATTERN.finditer(output):
+        for key in counts:
+            counts[key] += int(match.group(key))
+    return counts
+
+
+class ArtifactCounter:
+    """Count the crates cargo compiled or found fresh during a build."""
+
+    def __init__(self, manifest_path):
+        """
+        Create a counter.
+
+        :param manifest_path: The manifest of the package whose artifact
+          sizes are summed up
+        """
+        self.manifest_path = os.path.realpath(str(manifest_path))
+        self.fresh = 0
+        self.compiled = 0
+        self.artifact_bytes = 0
+
+    def add_message(self, message):
+        """
+        Process a JSON message emitted by cargo.
+
+        :param dict message: The message
+        """
+        if message.get('reason') != 'compiler-artifact':
+            return
+        if message.get('fresh'):
+            self.fresh += 1
+        else:
+            self.compiled += 1
+        if message.get('manifest_path') and os.path.realpath(
+            message['manifest_path']
+        ) == self.manifest_path:
+            for filename in message.get('filenames') or ():
+                try:
+                    self.artifact_bytes += os.path.getsize(filename)
+                except OSError:
+                    pass
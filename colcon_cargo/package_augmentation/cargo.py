@@ -3,6 +3,8 @@
 
 from pathlib import Path
 
+from colcon_cargo.argcomplete_completer.completion_index \
+    import record_package
 from colcon_cargo.package_identification.cargo import read_cargo_toml
 from colcon_core.dependency_descriptor import DependencyDescriptor
 from colcon_core.package_augmentation \
@@ -63,6 +65,8 @@ class CargoPackageAugmentation(PackageAugmentationExtensionPoint):
             metadata.metadata.setdefault('maintainers', [])
             metadata.metadata['maintainers'] += authors
 
+        record_package(metadata.path, content)
+
 
 def extract_dependencies(package_name, content, path):
     """
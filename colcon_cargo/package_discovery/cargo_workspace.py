@@ -1,6 +1,8 @@
 # Copyright 2025 Open Source Robotics Foundation, Inc.
 # Licensed under the Apache License, Version 2.0
 
+import os
+
 from colcon_cargo.package_identification.cargo_workspace \
     import CargoWorkspaceIdentification
 from colcon_core.package_discovery import PackageDiscoveryExtensionPoint
@@ -26,19 +28,33 @@ class CargoWorkspacePackageDiscovery(PackageDiscoveryExtensionPoint):
         return None
 
     def discover(self, *, args, identification_extensions):  # noqa: D102
-        # Nested workspaces are not currently supported by cargo. If they ever
-        # are, this code should be updated to run the whole process again until
-        # no additional member package paths are found.
-
-        paths = set()
-        for extensions_same_prio in identification_extensions.values():
-            for extension in extensions_same_prio.values():
-                if isinstance(extension, CargoWorkspaceIdentification):
-                    paths.update(extension.workspace_package_paths)
-                    extension.workspace_package_paths.clear()
+        # Identifying a workspace member can uncover another workspace, e.g.
+        # a standalone workspace listed in `additional-packages`. Newly found
+        # paths are appended to the worklist so that every workspace is only
+        # processed once, no matter how deeply it is nested.
+        workspace_extensions = [
+            extension
+            for extensions_same_prio in identification_extensions.values()
+            for extension in extensions_same_prio.values()
+            if isinstance(extension, CargoWorkspaceIdentification)
+        ]
 
+        worklist = []
+        visited = set()
         descs = set()
-        for path in paths:
+        while True:
+            for extension in workspace_extensions:
+                worklist.extend(extension.workspace_package_paths)
+                extension.workspace_package_paths.clear()
+            if not worklist:
+                break
+
+            path = worklist.pop()
+            real_path = os.path.realpath(str(path))
+            if real_path in visited:
+                continue
+            visited.add(real_path)
+
             try:
                 result = identify(identification_extensions, path)
             except IgnoreLocationException:
@@ -1,23 +1,14 @@
 # Copyright 2018 Easymov Robotics
 # Licensed under the Apache License, Version 2.0
 
+import functools
+
+from colcon_cargo.profiling import profiled
 from colcon_core.logging import colcon_logger
 from colcon_core.package_identification \
     import PackageIdentificationExtensionPoint
 from colcon_core.plugin_system import satisfies_version
 
-try:
-    # Python 3.11+
-    from tomllib import loads as toml_loads
-    from tomllib import TOMLDecodeError
-except ImportError:
-    try:
-        from tomli import loads as toml_loads
-        from tomli import TOMLDecodeError
-    except ImportError:
-        from toml import loads as toml_loads
-        from toml import TomlDecodeError as TOMLDecodeError
-
 logger = colcon_logger.getChild(__name__)
 
 
@@ -53,6 +44,7 @@ class CargoPackageIdentification(PackageIdentificationExtensionPoint):
             metadata.name = name
 
 
+@profiled('read_cargo_toml')
 def read_cargo_toml(cargo_toml):
     """
     Read the contents of a Cargo.toml file.
@@ -61,9 +53,27 @@ def read_cargo_toml(cargo_toml):
     :returns: Dictionary containing the processed content of the Cargo.toml
     :raises ValueError: if the content of Cargo.toml is not valid
     """
+    toml_loads, toml_decode_error = _get_toml_parser()
     try:
         with cargo_toml.open('rb') as f:
             return toml_loads(f.read().decode())
-    except TOMLDecodeError as e:
+    except toml_decode_error as e:
         raise ValueError(
             f"Failed to parse Cargo.toml file at '{cargo_toml}'") from e
+
+
+# The TOML parser is only imported once the first Cargo.toml file is read
+@functools.lru_cache(maxsize=None)
+def _get_toml_parser():
+    try:
+        # Python 3.11+
+        from tomllib import loads as toml_loads
+        from tomllib import TOMLDecodeError
+    except ImportError:
+        try:
+            from tomli import loads as toml_loads
+            from tomli import TOMLDecodeError
+        except ImportError:
+            from toml import loads as toml_loads
+            from toml import TomlDecodeError as TOMLDecodeError
+    return toml_loads, TOMLDecodeError
@@ -1,12 +1,23 @@
 # Copyright 2025 Open Source Robotics Foundation, Inc.
 # Licensed under the Apache License, Version 2.0
 
+import fnmatch
+import functools
+import os
+from pathlib import Path
+import re
+
 from colcon_cargo.package_identification.cargo import read_cargo_toml
 from colcon_core.package_identification import IgnoreLocationException
 from colcon_core.package_identification \
     import PackageIdentificationExtensionPoint
+from colcon_core.package_identification.ignore import IGNORE_MARKER
 from colcon_core.plugin_system import satisfies_version
 
+# Directory names which are never descended into by a wildcard, since they
+# can't contain workspace members but may contain a huge number of entries
+PRUNED_DIRECTORY_NAMES = frozenset(('.git', 'target'))
+
 
 class CargoWorkspaceIdentification(PackageIdentificationExtensionPoint):
     """
@@ -38,28 +49,167 @@ class CargoWorkspaceIdentification(PackageIdentificationExtensionPoint):
         if 'workspace' not in content:
             return
 
-        ws_members = {
-            member
-            for pattern in content['workspace'].get('members', ())
-            for member in metadata.path.glob(pattern)
-        }
-        ws_members.difference_update(
-            exclude
-            for pattern in content['workspace'].get('exclude', ())
-            for exclude in metadata.path.glob(pattern)
-        )
-        self.workspace_package_paths.update(ws_members)
-
+        members = tuple(content['workspace'].get('members', ()))
+        excludes = tuple(content['workspace'].get('exclude', ()))
         workspace_metadata = content['workspace'].get('metadata', {})
         colcon_metadata = workspace_metadata.get('colcon', {})
-        self.workspace_package_paths.update(
-            member
-            for pattern in colcon_metadata.get('additional-packages', ())
-            for member in metadata.path.glob(pattern)
-        )
+        additional = tuple(colcon_metadata.get('additional-packages', ()))
+
+        # expand all patterns of the workspace with a single directory walk
+        patterns = members + excludes + additional
+        matches = dict(zip(
+            patterns, expand_workspace_patterns(metadata.path, patterns)))
+
+        ws_members = set()
+        for pattern in members:
+            ws_members.update(matches[pattern])
+        for pattern in excludes:
+            ws_members.difference_update(matches[pattern])
+        self.workspace_package_paths.update(ws_members)
+
+        for pattern in additional:
+            self.workspace_package_paths.update(matches[pattern])
 
         if 'package' not in content:
             # Prevent any further attempts to discover packages in this
             # directory and let the workspace dictate where to look for
             # packages later on
             raise IgnoreLocationException()
+
+
+def expand_workspace_patterns(path, patterns):
+    """
+    Expand glob patterns relative to a workspace root.
+
+    All patterns are matched during a single walk of the directory tree.
+    Directories which can't contain workspace members, like `.git`, cargo
+    target directories and colcon build bases, are not descended into by
+    wildcards.
+    The result is memoized for the lifetime of the process.
+
+    :param path: The root directory of the workspace
+    :param patterns: The glob patterns, relative to the workspace root
+    :returns: A tuple with a set of matched directories for each pattern
+    :rtype: tuple(set(Path))
+    """
+    matches = _expand_workspace_patterns(str(path), tuple(patterns))
+    return tuple(
+        {path / relative_path for relative_path in pattern_matches}
+        for pattern_matches in matches)
+
+
+@functools.lru_cache(maxsize=None)
+def _expand_workspace_patterns(root, patterns):
+    matches = [set() for _ in patterns]
+    compiled = {}
+    for index, pattern in enumerate(patterns):
+        components = _compile_pattern(pattern)
+        if components is None:
+            # patterns escaping the workspace root can't be matched while
+            # walking the tree below it
+            matches[index].update(
+                Path(os.path.relpath(str(p), root))
+                for p in Path(root).glob(pattern) if p.is_dir())
+            continue
+        compiled[index] = components
+
+    # each state is a tuple of the pattern index and the position of the
+    # next path component which needs to be matched
+    pending = [(
+        (),
+        _advance(compiled, {(index, 0) for index in compiled}),
+    )]
+    while pending:
+        relative_parts, states = pending.pop()
+        literals = {}
+        wildcard_states = []
+        for index, position in states:
+            components = compiled[index]
+            if position == len(components):
+                matches[index].add(Path(*relative_parts))
+                continue
+            component = components[position]
+            if isinstance(component, str):
+                literals.setdefault(component, set()).add(
+                    (index, position + 1))
+            else:
+                wildcard_states.append((index, position, component))
+
+        current = os.path.join(root, *relative_parts)
+        if not wildcard_states:
+            # only literal components, which don't require listing the
+            # directory content
+            for name, next_states in literals.items():
+                if os.path.isdir(os.path.join(current, name)):
+                    pending.append((
+                        relative_parts + (name,),
+                        _advance(compiled, next_states)))
+            continue
+
+        try:
+            entries = list(os.scandir(current))
+        except OSError:
+            continue
+        for entry in entries:
+            try:
+                if not entry.is_dir():
+                    continue
+            except OSError:
+                continue
+            next_states = set(literals.get(entry.name, ()))
+            if not _is_pruned(entry):
+                for index, position, component in wildcard_states:
+                    if component is _RECURSIVE:
+                        if not entry.is_symlink():
+                            next_states.add((index, position))
+                    elif component.match(entry.name):
+                        next_states.add((index, position + 1))
+            if next_states:
+                pending.append((
+                    relative_parts + (entry.name,),
+                    _advance(compiled, next_states)))
+
+    return tuple(matches)
+
+
+# Marker for the recursive wildcard `**`
+_RECURSIVE = object()
+
+
+def _compile_pattern(pattern):
+    parts = []
+    for part in Path(pattern).parts:
+        if part in ('', '.'):
+            continue
+        if part == '..' or Path(part).is_absolute():
+            return None
+        if part == '**':
+            if not parts or parts[-1] is not _RECURSIVE:
+                parts.append(_RECURSIVE)
+        elif any(c in part for c in '*?['):
+            parts.append(re.compile(fnmatch.translate(part)))
+        else:
+            parts.append(part)
+    return parts
+
+
+def _advance(compiled, states):
+    # a recursive wildcard also matches zero directories
+    states = set(states)
+    pending = list(states)
+    while pending:
+        index, position = pending.pop()
+        components = compiled[index]
+        if position < len(components) and \
+                components[position] is _RECURSIVE:
+            state = (index, position + 1)
+            if state not in states:
+                states.add(state)
+                pending.append(state)
+    return states
+
+
+def _is_pruned(entry):
+    if entry.name in PRUNED_DIRECTORY_NAMES:
+        return True
+    return os.path.exists(os.path.join(entry.path, IGNORE_MARKER))
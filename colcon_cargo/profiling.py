@@ -0,0 +1,169 @@
+# Copyright 2025 Open Source Robotics Foundation, Inc.
+# Licensed under the Apache License, Version 2.0
+
+import atexit
+from contextlib import contextmanager
+import functools
+import inspect
+import json
+import os
+from pathlib import Path
+import sys
+import threading
+import time
+
+from colcon_core.environment_variable import EnvironmentVariable
+
+"""Environment variable to enable profiling of colcon-cargo itself"""
+PROFILE_ENVIRONMENT_VARIABLE = EnvironmentVariable(
+    'COLCON_CARGO_PROFILE',
+    'Write the time spent in the phases of colcon-cargo to this JSON file, '
+    'or to a file named after the process id if it is a directory')
+
+"""Environment variable to additionally collect cProfile statistics"""
+CPROFILE_ENVIRONMENT_VARIABLE = EnvironmentVariable(
+    'COLCON_CARGO_CPROFILE',
+    'Write cProfile statistics of the whole process to this file')
+
+_UNSET = object()
+_profile = _UNSET
+_profile_lock = threading.Lock()
+
+
+class Profile:
+    """
+    The aggregated time spent in named sections of colcon-cargo.
+
+    For each section only the wall time is recorded.
+    The CPU times of the process can't be attributed to a section since
+    sections run concurrently with the parallel executor.
+    For the CPU time of colcon-cargo itself use the cProfile statistics.
+    """
+
+    def __init__(self, path, *, cprofile_path=None):
+        """
+        Create a profile.
+
+        :param path: The path of the JSON file to write the profile to
+        :param cprofile_path: The path to write cProfile statistics to
+        """
+        self.path = Path(path)
+        self.sections = {}
+        self._lock = threading.Lock()
+        self._start = time.perf_counter()
+        self._cprofile = None
+        self._cprofile_path = cprofile_path
+        if cprofile_path:
+            import cProfile
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+
+    @contextmanager
+    def section(self, name):
+        """
+        Measure the time spent in a section.
+
+        :param str name: The name of the section, the times of all sections
+          with the same name are summed up
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - start
+            with self._lock:
+                section = self.sections.setdefault(
+                    name, {'count': 0, 'wall': 0.0})
+                section['count'] += 1
+                section['wall'] += wall
+
+    def get_report(self):
+        """
+        Get the aggregated profile.
+
+        :returns: The total wall time of the process and of each section
+        :rtype: dict
+        """
+        end = time.perf_counter()
+        with self._lock:
+            sections = {
+                name: dict(section)
+                for name, section in sorted(self.sections.items())}
+        return {
+            'pid': os.getpid(),
+            'argv': sys.argv,
+            'total': {'wall': end - self._start},
+            'sections': sections,
+        }
+
+    def write(self):
+        """Write the profile and the optional cProfile statistics."""
+        path = self.path
+        if path.is_dir():
+            path = path / f'colcon_cargo_profile_{os.getpid()}.json'
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(self.get_report(), indent=2))
+        if self._cprofile is not None:
+            self._cprofile.disable()
+            self._cprofile.dump_stats(str(self._cprofile_path))
+
+
+def get_profile():
+    """
+    Get the profile of the current process.
+
+    Profiling is enabled by setting the environment variable
+    `COLCON_CARGO_PROFILE`, in which case the profile is written when the
+    process exits.
+
+    :returns: The profile, or None if profiling isn't enabled
+    :rtype: Profile
+    """
+    global _profile
+    if _profile is _UNSET:
+        with _profile_lock:
+            if _profile is _UNSET:
+                path = os.environ.get(PROFILE_ENVIRONMENT_VARIABLE.name)
+                _profile = None
+                if path:
+                    _profile = Profile(
+                        path, cprofile_path=os.environ.get(
+                            CPROFILE_ENVIRONMENT_VARIABLE.name))
+                    atexit.register(_profile.write)
+    return _profile
+
+
+@contextmanager
+def profile_section(name):
+    """
+    Measure the time spent in a section if profiling is enabled.
+
+    :param str name: The name of the section
+    """
+    profile = get_profile()
+    if profile is None:
+        yield
+        return
+    with profile.section(name):
+        yield
+
+
+def profiled(name):
+    """
+    Decorate a function or coroutine function to measure its time.
+
+    :param str name: The name of the section
+    """
+    def decorator(function):
+        if inspect.iscoroutinefunction(function):
+            @functools.wraps(function)
+            async def wrapper(*args, **kwargs):
+                with profile_section(name):
+                    return await function(*args, **kwargs)
+        else:
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                with profile_section(name):
+                    return function(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -1,7 +1,9 @@
 # Copyright 2018 Easymov Robotics
 # Licensed under the Apache License, Version 2.0
 
+import functools
 import os
+from pathlib import Path
 import shutil
 
 from colcon_core.environment_variable import EnvironmentVariable
@@ -10,6 +12,19 @@ from colcon_core.environment_variable import EnvironmentVariable
 CARGO_COMMAND_ENVIRONMENT_VARIABLE = EnvironmentVariable(
     'CARGO_COMMAND', 'The full path to the Cargo executable')
 
+"""Environment variable to override the Rust compiler executable"""
+RUSTC_COMMAND_ENVIRONMENT_VARIABLE = EnvironmentVariable(
+    'RUSTC', 'The full path to the Rust compiler executable')
+
+"""Environment variable to override the sccache executable"""
+SCCACHE_COMMAND_ENVIRONMENT_VARIABLE = EnvironmentVariable(
+    'SCCACHE_COMMAND', 'The full path to the sccache executable')
+
+"""Environment variable to override the colcon-cargo cache directory"""
+CACHE_PATH_ENVIRONMENT_VARIABLE = EnvironmentVariable(
+    'COLCON_CARGO_CACHE_PATH',
+    'The directory where colcon-cargo persists data between invocations')
+
 
 def which_executable(environment_variable, executable_name):
     """
@@ -27,5 +42,65 @@ def which_executable(environment_variable, executable_name):
     return shutil.which(executable_name)
 
 
-CARGO_EXECUTABLE = which_executable(
-    CARGO_COMMAND_ENVIRONMENT_VARIABLE.name, 'cargo')
+@functools.lru_cache(maxsize=None)
+def get_cargo_executable():
+    """
+    Determine the path of the Cargo executable.
+
+    The lookup is deferred until the executable is actually needed and the
+    result is memoized for the lifetime of the process.
+    :rtype: str
+    """
+    return which_executable(CARGO_COMMAND_ENVIRONMENT_VARIABLE.name, 'cargo')
+
+
+def get_cache_path(*subdirectories):
+    """
+    Get the path of a directory for data persisted between invocations.
+
+    The location can be overridden with an environment variable, otherwise
+    the platform specific cache directory of the user is used.
+    The directory isn't created by this function.
+    :param subdirectories: The names of nested subdirectories
+    :rtype: Path
+    """
+    value = os.getenv(CACHE_PATH_ENVIRONMENT_VARIABLE.name)
+    if value:
+        path = Path(value)
+    elif os.name == 'nt' and os.getenv('LOCALAPPDATA'):
+        path = Path(os.getenv('LOCALAPPDATA')) / 'colcon-cargo'
+    elif os.getenv('XDG_CACHE_HOME'):
+        path = Path(os.getenv('XDG_CACHE_HOME')) / 'colcon-cargo'
+    else:
+        path = Path.home() / '.cache' / 'colcon-cargo'
+    return path.joinpath(*subdirectories)
+
+
+def parse_size(value):
+    """
+    Parse a size in bytes with an optional binary unit suffix.
+
+    :param str value: The size, e.g. `1024`, `512M` or `10G`
+    :returns: The size in bytes
+    :rtype: int
+    :raises ValueError: if the value isn't a valid size
+    """
+    units = {'K': 1 << 10, 'M': 1 << 20, 'G': 1 << 30, 'T': 1 << 40}
+    value = value.strip().upper()
+    if value.endswith('B'):
+        value = value[:-1]
+    factor = 1
+    if value and value[-1] in units:
+        factor = units[value[-1]]
+        value = value[:-1]
+    size = float(value)
+    if size < 0:
+        raise ValueError('The size must not be negative')
+    return int(size * factor)
+
+
+def __getattr__(name):
+    # Resolve CARGO_EXECUTABLE on first access rather than at import time
+    if name == 'CARGO_EXECUTABLE':
+        return get_cargo_executable()
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
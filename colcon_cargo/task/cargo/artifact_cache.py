@@ -0,0 +1,371 @@
+# Copyright 2025 Open Source Robotics Foundation, Inc.
+# Licensed under the Apache License, Version 2.0
+
+import hashlib
+import json
+import os
+from pathlib import Path
+import shutil
+import time
+import uuid
+
+from colcon_cargo import __version__
+from colcon_cargo.package_identification.cargo import read_cargo_toml
+from colcon_cargo.package_identification.cargo_workspace \
+    import PRUNED_DIRECTORY_NAMES
+from colcon_core.logging import colcon_logger
+from colcon_core.package_identification.ignore import IGNORE_MARKER
+
+logger = colcon_logger.getChild(__name__)
+
+# Environment variables which affect the artifacts produced by cargo
+BUILD_ENVIRONMENT_VARIABLES = (
+    'CARGO_BUILD_TARGET',
+    'CARGO_ENCODED_RUSTFLAGS',
+    'CARGO_PROFILE_DEV_OPT_LEVEL',
+    'CARGO_PROFILE_RELEASE_OPT_LEVEL',
+    'RUSTFLAGS',
+)
+
+DEPENDENCY_TABLES = ('dependencies', 'build-dependencies', 'dev-dependencies')
+
+ENTRY_METADATA_FILE = 'entry.json'
+
+
+class ArtifactCache:
+    """
+    A content-addressed cache of installed cargo packages.
+
+    Each entry is a copy of an install prefix, stored in a directory named
+    after a key which is derived from all inputs of the build.
+    Entries are published with an atomic rename, so the cache directory can
+    be shared between concurrent processes, e.g. on a network file system.
+    """
+
+    def __init__(self, path, *, max_size=None, max_age=None):
+        """
+        Create a cache.
+
+        :param path: The directory of the cache
+        :param int max_size: The maximum size of all entries in bytes
+        :param float max_age: The maximum time in seconds since an entry was
+          last used
+        """
+        self.path = Path(path)
+        self.max_size = max_size
+        self.max_age = max_age
+
+    def restore(self, key, install_base):
+        """
+        Restore an install prefix from the cache.
+
+        :param str key: The key of the entry
+        :param install_base: The install prefix to restore into
+        :returns: True if the entry was found and restored, otherwise False
+        :rtype: bool
+        """
+        entry = self._get_entry_path(key)
+        files = entry / 'files'
+        if not files.is_dir():
+            return False
+
+        install_base = Path(install_base)
+        try:
+            if install_base.exists():
+                shutil.rmtree(str(install_base))
+            _copy_tree(files, install_base)
+            # mark the entry as recently used
+            os.utime(str(entry / ENTRY_METADATA_FILE))
+        except OSError as e:
+            # the entry might have been evicted concurrently
+            logger.warning(
+                f"Failed to restore '{install_base}' from artifact cache: "
+                f'{e}')
+            return False
+        return True
+
+    def store(self, key, install_base):
+        """
+        Store an install prefix in the cache.
+
+        :param str key: The key of the entry
+        :param install_base: The install prefix to store
+        """
+        entry = self._get_entry_path(key)
+        if entry.is_dir():
+            return
+
+        temp_entry = self.path / 'tmp' / uuid.uuid4().hex
+        try:
+            size = _copy_tree(Path(install_base), temp_entry / 'files')
+            (temp_entry / ENTRY_METADATA_FILE).write_text(json.dumps({
+                'created': time.time(),
+                'size': size,
+            }))
+            entry.parent.mkdir(parents=True, exist_ok=True)
+            os.rename(str(temp_entry), str(entry))
+        except OSError as e:
+            # another process might have stored the same entry concurrently
+            if not entry.is_dir():
+                logger.warning(
+                    f"Failed to store '{install_base}' in artifact cache: "
+                    f'{e}')
+            shutil.rmtree(str(temp_entry), ignore_errors=True)
+
+    def evict(self):
+        """Remove entries exceeding the maximum age or size of the cache."""
+        entries = []
+        now = time.time()
+        for entry in self.path.glob('entries/*/*'):
+            try:
+                metadata_file = entry / ENTRY_METADATA_FILE
+                last_used = metadata_file.stat().st_mtime
+                size = json.loads(metadata_file.read_text())['size']
+            except (OSError, ValueError, KeyError):
+                continue
+            if self.max_age is not None and now - last_used > self.max_age:
+                self._remove_entry(entry)
+                continue
+            entries.append((last_used, size, entry))
+
+        if self.max_size is None:
+            return
+        total_size = sum(size for _, size, _ in entries)
+        # remove the least recently used entries first
+        for _, size, entry in sorted(entries, key=lambda e: e[0]):
+            if total_size <= self.max_size:
+                break
+            self._remove_entry(entry)
+            total_size -= size
+
+    def _get_entry_path(self, key):
+        return self.path / 'entries' / key[:2] / key
+
+    def _remove_entry(self, entry):
+        # move the entry aside first so that it disappears atomically
+        temp_entry = self.path / 'tmp' / uuid.uuid4().hex
+        try:
+            temp_entry.parent.mkdir(parents=True, exist_ok=True)
+            os.rename(str(entry), str(temp_entry))
+        except OSError:
+            return
+        shutil.rmtree(str(temp_entry), ignore_errors=True)
+
+
+def get_cache_key(
+    pkg, *, cargo_args, toolchain_fingerprint, dependencies, env,
+    variant=None,
+):
+    """
+    Compute the key identifying all inputs of a package build.
+
+    :param pkg: The package descriptor
+    :param list cargo_args: The additional arguments passed to cargo
+    :param str toolchain_fingerprint: The fingerprint of the toolchain
+    :param dependencies: The ordered dictionary mapping dependency names to
+      their install prefixes
+    :param env: The environment cargo is invoked in
+    :param variant: Additional information distinguishing builds of the same
+      inputs, e.g. the task implementation
+    :returns: A hex digest
+    :rtype: str
+    """
+    h = hashlib.sha256()
+
+    def update(*values):
+        h.update(json.dumps(values).encode())
+        h.update(b'\0')
+
+    update('colcon-cargo', __version__, variant)
+    update('package', pkg.name, cargo_args, toolchain_fingerprint)
+    update('env', [(n, env.get(n)) for n in BUILD_ENVIRONMENT_VARIABLES])
+
+    pkg_path = Path(os.path.realpath(str(pkg.path)))
+    for path in _get_source_paths(pkg_path):
+        update('source', os.path.relpath(str(path), str(pkg_path)))
+        _update_source_fingerprint(h, path)
+
+    lockfile = _find_upwards(pkg_path, 'Cargo.lock')
+    if lockfile is not None:
+        update('lockfile')
+        h.update(lockfile.read_bytes())
+
+    for name, prefix in sorted((dependencies or {}).items()):
+        update('dependency', name, _get_install_fingerprint(name, prefix))
+
+    return h.hexdigest()
+
+
+def _get_source_paths(pkg_path):
+    # the package itself, its transitive path dependencies, including those
+    # inherited from a workspace, and the roots of the workspaces they are
+    # part of
+    paths = []
+    manifests = {}
+    pending = [pkg_path]
+    while pending:
+        path = pending.pop()
+        if path in paths:
+            continue
+        paths.append(path)
+        content = _read_manifest(manifests, path / 'Cargo.toml')
+        if content is None:
+            continue
+        workspace_manifest = _find_workspace_manifest(
+            manifests, path, content)
+        inherited = {}
+        if workspace_manifest is not None:
+            if workspace_manifest.parent != path and \
+                    workspace_manifest not in paths:
+                paths.append(workspace_manifest)
+            inherited = manifests[workspace_manifest]['workspace'].get(
+                'dependencies', {})
+        tables = [content] + list(content.get('target', {}).values())
+        for table in tables:
+            for key in DEPENDENCY_TABLES:
+                for name, constraints in table.get(key, {}).items():
+                    base = path
+                    if isinstance(constraints, dict) and \
+                            constraints.get('workspace') is True and \
+                            workspace_manifest is not None:
+                        # paths in the workspace are relative to its root
+                        constraints = inherited.get(name)
+                        base = workspace_manifest.parent
+                    if isinstance(constraints, dict) and \
+                            constraints.get('path'):
+                        dep_path = base / constraints['path']
+                        pending.append(
+                            Path(os.path.realpath(str(dep_path))))
+    return paths
+
+
+def _find_workspace_manifest(manifests, path, content):
+    if 'workspace' in content:
+        return path / 'Cargo.toml'
+    explicit = content.get('package', {}).get('workspace')
+    if explicit:
+        manifest = Path(os.path.realpath(str(path / explicit))) / \
+            'Cargo.toml'
+        workspace = _read_manifest(manifests, manifest)
+        return manifest if workspace and 'workspace' in workspace else None
+    manifest = _find_upwards(path.parent, 'Cargo.toml')
+    while manifest is not None:
+        workspace = _read_manifest(manifests, manifest)
+        if workspace and 'workspace' in workspace:
+            return manifest
+        manifest = _find_upwards(manifest.parent.parent, 'Cargo.toml')
+    return None
+
+
+def _read_manifest(manifests, manifest):
+    if manifest not in manifests:
+        try:
+            manifests[manifest] = read_cargo_toml(manifest)
+        except (OSError, ValueError):
+            manifests[manifest] = None
+    return manifests[manifest]
+
+
+def _find_upwards(path, name):
+    for directory in (path, *path.parents):
+        candidate = directory / name
+        if candidate.is_file():
+            return candidate
+    return None
+
+
+def _update_source_fingerprint(h, path):
+    if path.is_file():
+        h.update(path.read_bytes())
+        return
+    for dirpath, dirnames, filenames in os.walk(str(path)):
+        # don't descend into target directories, VCS metadata or build bases
+        dirnames[:] = sorted(
+            d for d in dirnames
+            if d not in PRUNED_DIRECTORY_NAMES and
+            not os.path.exists(os.path.join(dirpath, d, IGNORE_MARKER)))
+        for filename in sorted(filenames):
+            file_path = os.path.join(dirpath, filename)
+            h.update(os.path.relpath(file_path, str(path)).encode())
+            h.update(b'\0')
+            _update_file_fingerprint(h, file_path)
+
+
+_install_fingerprints = {}
+
+
+def forget_install_fingerprint(name=None):
+    """
+    Forget the fingerprint of a package's install prefix.
+
+    The fingerprints are memoized for the lifetime of the process, so they
+    need to be forgotten whenever the package is built again, e.g. by a
+    long-running process rebuilding packages on changes.
+
+    :param str name: The package name, or None to forget the fingerprints
+      of all packages
+    """
+    # the keys are copied at once since cache keys are computed in threads
+    for key in list(_install_fingerprints):
+        if name is None or key[0] == name:
+            _install_fingerprints.pop(key, None)
+
+
+def _get_install_fingerprint(name, prefix):
+    # Install prefixes of dependencies don't change while dependent packages
+    # are being built, so the fingerprints are computed once per build of
+    # the dependency
+    key = (name, str(prefix))
+    if key not in _install_fingerprints:
+        prefix = Path(prefix)
+        if prefix.name == name:
+            # isolated install prefix containing only this package
+            paths = [prefix]
+        else:
+            # merged install prefix, only consider the package's resources
+            paths = [
+                prefix / 'share' / name,
+                prefix / 'share' / 'colcon-core' / 'packages' / name,
+            ]
+        h = hashlib.sha256()
+        for path in paths:
+            if path.exists():
+                _update_source_fingerprint(h, path)
+        _install_fingerprints[key] = h.hexdigest()
+    return _install_fingerprints[key]
+
+
+def _update_file_fingerprint(h, file_path):
+    if os.path.islink(file_path):
+        h.update(os.readlink(file_path).encode())
+        return
+    try:
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                h.update(chunk)
+    except OSError:
+        pass
+
+
+def _copy_tree(src, dst):
+    # copy a directory tree preserving symlinks, returning the total size
+    size = 0
+    for dirpath, dirnames, filenames in os.walk(str(src)):
+        relative = os.path.relpath(dirpath, str(src))
+        target_dir = os.path.normpath(os.path.join(str(dst), relative))
+        os.makedirs(target_dir, exist_ok=True)
+        for name in list(dirnames):
+            source_path = os.path.join(dirpath, name)
+            if os.path.islink(source_path):
+                os.symlink(
+                    os.readlink(source_path), os.path.join(target_dir, name))
+                dirnames.remove(name)
+        for name in filenames:
+            source_path = os.path.join(dirpath, name)
+            target_path = os.path.join(target_dir, name)
+            if os.path.islink(source_path):
+                os.symlink(os.readlink(source_path), target_path)
+                continue
+            shutil.copy2(source_path, target_path)
+            size += os.path.getsize(target_path)
+    return size
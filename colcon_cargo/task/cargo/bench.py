@@ -0,0 +1,102 @@
+# Copyright 2025 Open Source Robotics Foundation, Inc.
+# Licensed under the Apache License, Version 2.0
+
+import json
+import os
+import re
+
+# The result line of a benchmark of the libtest harness, e.g.
+# `test tests::fib ... bench:       1,234.56 ns/iter (+/- 78.90)`
+LIBTEST_PATTERN = re.compile(
+    r'^test (?P<name>\S+)\s+\.\.\. bench:\s+(?P<value>[\d,.]+) ns/iter')
+
+# The timing line of a benchmark of criterion, e.g.
+# `fib 20    time:   [26.029 µs 26.251 µs 26.505 µs]`, where long names are
+# printed on a line of their own
+CRITERION_PATTERN = re.compile(
+    r'^(?P<name>.*?)\s*time:\s+\[\S+ \S+ (?P<value>[\d.]+) (?P<unit>\S+) ')
+
+# The factors to convert criterion's units to nanoseconds
+CRITERION_UNITS = {
+    'ps': 1e-3, 'ns': 1, 'us': 1e3, 'µs': 1e3, 'ms': 1e6, 's': 1e9,
+}
+
+
+def parse_bench_output(output):
+    """
+    Parse the timings from the output of `cargo bench`.
+
+    Both the libtest bench harness and criterion are supported.
+
+    :param str output: The output of the benchmarks
+    :returns: The dictionary mapping benchmark names to the estimated time of
+      an iteration in nanoseconds
+    :rtype: dict
+    """
+    results = {}
+    previous_line = ''
+    for line in output.splitlines():
+        line = line.rstrip()
+        match = LIBTEST_PATTERN.match(line)
+        if match:
+            results[match.group('name')] = float(
+                match.group('value').replace(',', ''))
+            continue
+        match = CRITERION_PATTERN.match(line)
+        if match and match.group('unit') in CRITERION_UNITS:
+            name = match.group('name') or previous_line.strip()
+            results[name] = float(match.group('value')) * \
+                CRITERION_UNITS[match.group('unit')]
+        previous_line = line
+    return results
+
+
+def find_regressions(results, baseline, threshold):
+    """
+    Find benchmarks which got slower compared to a baseline.
+
+    Benchmarks which aren't part of the baseline are ignored.
+
+    :param dict results: The current timings
+    :param dict baseline: The timings of the baseline
+    :param float threshold: The relative slowdown considered a regression,
+      e.g. 0.1 for 10%
+    :returns: The dictionary mapping the names of regressed benchmarks to a
+      tuple of the baseline and the current timing
+    :rtype: dict
+    """
+    regressions = {}
+    for name, value in results.items():
+        reference = baseline.get(name)
+        if reference and value > reference * (1 + threshold):
+            regressions[name] = (reference, value)
+    return regressions
+
+
+def load_results(path):
+    """
+    Load the benchmark timings stored in a file.
+
+    :param path: The path of the file
+    :returns: The timings, or None if the file doesn't exist or is invalid
+    :rtype: dict
+    """
+    try:
+        with open(path) as f:
+            return json.load(f)['results']
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def save_results(path, results):
+    """
+    Store benchmark timings in a file.
+
+    :param path: The path of the file
+    :param dict results: The timings
+    """
+    temp_path = f'{path}.{os.getpid()}.tmp'
+    with open(temp_path, 'w') as f:
+        json.dump(
+            {'unit': 'ns', 'results': results}, f, indent=2, sort_keys=True)
+    os.replace(temp_path, str(path))
@@ -1,20 +1,66 @@
 # Copyright 2018 Easymov Robotics
 # Licensed under the Apache License, Version 2.0
 
+import asyncio
+import functools
 import json
+import os
 from pathlib import Path
-import shutil
 
-from colcon_cargo.task.cargo import CARGO_EXECUTABLE
+from colcon_cargo.event_log import ArtifactCounter
+from colcon_cargo.event_log import get_event_log
+from colcon_cargo.event_log import log_event
+from colcon_cargo.event_log import logged_command
+from colcon_cargo.event_log import logged_task
+from colcon_cargo.profiling import profile_section
+from colcon_cargo.profiling import profiled
+from colcon_cargo.task.cargo import get_cache_path
+from colcon_cargo.task.cargo import get_cargo_executable
+from colcon_cargo.task.cargo import parse_size
+from colcon_cargo.task.cargo.artifact_cache import ArtifactCache
+from colcon_cargo.task.cargo.artifact_cache \
+    import forget_install_fingerprint
+from colcon_cargo.task.cargo.artifact_cache import get_cache_key
+from colcon_cargo.task.cargo.command_environment \
+    import get_cached_command_environment
+from colcon_cargo.task.cargo.compiler_cache \
+    import configure_environment as configure_compiler_cache
+from colcon_cargo.task.cargo.compiler_cache import find_compiler_cache
+from colcon_cargo.task.cargo.compiler_cache import get_configured_wrapper
+from colcon_cargo.task.cargo.compiler_cache import start_session
+from colcon_cargo.task.cargo.environment_hooks \
+    import generate_unless_unchanged
+from colcon_cargo.task.cargo.link_throttle \
+    import configure_environment as configure_link_throttle
+from colcon_cargo.task.cargo.link_throttle import create_wrapper
+from colcon_cargo.task.cargo.link_throttle import get_available_memory
+from colcon_cargo.task.cargo.message import add_message_format
+from colcon_cargo.task.cargo.message import run_with_messages
+from colcon_cargo.task.cargo.target_gc import collect_garbage
+from colcon_cargo.task.cargo.target_gc import find_target_directories
+from colcon_cargo.task.cargo.target_gc import UnitReferences
+from colcon_cargo.task.cargo.target_tmpfs import create_staging_directory
+from colcon_cargo.task.cargo.target_tmpfs import get_staging_directory
+from colcon_cargo.task.cargo.target_tmpfs import has_capacity
+from colcon_cargo.task.cargo.target_tmpfs import SpaceExhaustion
+from colcon_cargo.task.cargo.target_tmpfs import sync_snapshot
+from colcon_cargo.task.cargo.target_tmpfs import write_marker
+from colcon_cargo.task.cargo.trash import empty_trash
+from colcon_cargo.task.cargo.trash import move_to_trash
+from colcon_cargo.task.cargo.trash import TRASH_DIRECTORY_NAME
 from colcon_core.environment import create_environment_scripts
 from colcon_core.logging import colcon_logger
 from colcon_core.plugin_system import satisfies_version
-from colcon_core.shell import create_environment_hook, get_command_environment
+from colcon_core.shell import create_environment_hook
 from colcon_core.task import run
 from colcon_core.task import TaskExtensionPoint
 
 logger = colcon_logger.getChild(__name__)
 
+# The output of `cargo metadata` for each package, which is reused as long as
+# the manifest of the package is unchanged, e.g. by long running verbs
+_metadata_cache = {}
+
 
 class CargoBuildTask(TaskExtensionPoint):
     """Build Cargo packages."""
@@ -22,6 +68,13 @@ class CargoBuildTask(TaskExtensionPoint):
     def __init__(self):  # noqa: D107
         super().__init__()
         satisfies_version(TaskExtensionPoint.EXTENSION_POINT_VERSION, '^1.0')
+        self.toolchain = None
+        # the target directory, if it differs from the build directory
+        self.target_dir = None
+        # callables invoked with every JSON message emitted by cargo
+        self.message_callbacks = []
+        # callables invoked with every line cargo writes to stderr
+        self.stderr_callbacks = []
 
     def add_arguments(self, *, parser):  # noqa: D102
         parser.add_argument(
@@ -34,7 +87,108 @@ class CargoBuildTask(TaskExtensionPoint):
             '--clean-build',
             action='store_true',
             help='Remove old build dir before the build.')
+        parser.add_argument(
+            '--cargo-artifact-cache',
+            metavar='PATH',
+            help='Restore the install prefix of a package from a '
+            'content-addressed cache in the given directory if all inputs '
+            'of the build are unchanged, and store it there otherwise')
+        parser.add_argument(
+            '--cargo-artifact-cache-max-size',
+            type=parse_size, default=parse_size('10G'), metavar='SIZE',
+            help='Evict the least recently used entries of the artifact '
+            'cache beyond this size (default: 10G)')
+        parser.add_argument(
+            '--cargo-artifact-cache-max-age',
+            type=float, default=30, metavar='DAYS',
+            help='Evict entries of the artifact cache which have not been '
+            'used for this many days (default: 30)')
+        parser.add_argument(
+            '--cargo-gc',
+            action='store_true',
+            help='After the build, remove artifacts from the target '
+            'directory which are not used by the current build')
+        parser.add_argument(
+            '--cargo-gc-min-age',
+            type=float, default=24, metavar='HOURS',
+            help='Only remove unused artifacts which have not been modified '
+            'for this many hours, e.g. artifacts of tests (default: 24)')
+        parser.add_argument(
+            '--cargo-gc-max-size',
+            type=parse_size, metavar='SIZE',
+            help='Remove unused artifacts in least recently used order until '
+            'the target directories are smaller than this size, e.g. 20G')
+        parser.add_argument(
+            '--cargo-gc-scope',
+            choices=('package', 'global'), default='package',
+            help='Apply the size limit to the target directory of each '
+            'package or to the target directories of all packages together '
+            '(default: package)')
+        parser.add_argument(
+            '--cargo-link-throttle',
+            action='store_true',
+            help='Limit the number of concurrent links of binaries across '
+            'all packages based on their memory usage observed in previous '
+            'builds (POSIX only)')
+        parser.add_argument(
+            '--cargo-link-memory',
+            type=parse_size, metavar='SIZE',
+            help='The memory available to concurrent links, e.g. 16G '
+            '(default: the memory available when the build starts)')
+        parser.add_argument(
+            '--cargo-compiler-cache',
+            action='store_true',
+            help='Cache the compilation of crates across target directories '
+            'using sccache if it is available')
+        parser.add_argument(
+            '--cargo-compiler-cache-dir',
+            metavar='PATH',
+            help='The directory of the compiler cache (default: a directory '
+            'in the colcon-cargo cache path)')
+        parser.add_argument(
+            '--cargo-compiler-cache-max-size',
+            type=parse_size, default=parse_size('10G'), metavar='SIZE',
+            help='The maximum size of the compiler cache (default: 10G)')
+        parser.add_argument(
+            '--cargo-check',
+            action='store_true',
+            help='Only check that the packages compile using `cargo check` '
+            'without generating code, linking or installing binaries')
+        parser.add_argument(
+            '--cargo-check-all-targets',
+            action='store_true',
+            help='Also check tests, examples and benchmarks with '
+            '--cargo-check')
+        parser.add_argument(
+            '--cargo-variants',
+            nargs='+', type=parse_variant, metavar='PROFILE[:TARGET]',
+            help='Build all of these combinations of a profile and an '
+            'optional target triple, e.g. `dev release '
+            'release:aarch64-unknown-linux-gnu`. All targets of a profile '
+            'are built by a single cargo invocation sharing build scripts '
+            'and proc-macros. The first variant is installed into the '
+            'install prefix, the others into `lib/<package>/<variant>` '
+            'within it')
+        parser.add_argument(
+            '--cargo-target-tmpfs',
+            nargs='?', const='/dev/shm', metavar='PATH',
+            help='Place the target directory on a memory backed file system '
+            'in the given directory (default: /dev/shm) and sync the '
+            'fingerprints to the build directory after the build for '
+            'inspection')
+        parser.add_argument(
+            '--cargo-target-tmpfs-min-free',
+            type=parse_size, default=parse_size('2G'), metavar='SIZE',
+            help='Build on disk if less space is available on the memory '
+            'backed file system (default: 2G)')
+        parser.add_argument(
+            '--cargo-fast-link',
+            action='store_true',
+            help='Link with mold or lld if available and split the debuginfo '
+            'out of the linked artifacts if supported by the toolchain')
 
+    @profiled('build')
+    @logged_task('build')
     async def build(  # noqa: D102
         self, *, additional_hooks=None, skip_hook_creation=False
     ):
@@ -44,81 +198,496 @@ class CargoBuildTask(TaskExtensionPoint):
 
         logger.info(
             "Building Cargo package in '{args.path}'".format_map(locals()))
+        # the install prefix is about to change, dependents built later by
+        # the same process need to fingerprint it again
+        forget_install_fingerprint(self.context.pkg.name)
 
         try:
-            env = await get_command_environment(
-                'build', args.build_base, self.context.dependencies)
+            with profile_section('build.environment'):
+                env = await get_cached_command_environment(
+                    'build', args.build_base, self.context.dependencies)
         except RuntimeError as e:
             logger.error(str(e))
             return 1
 
-        self.progress('prepare')
-        rc = self._prepare(env, additional_hooks)
-        if rc:
-            return rc
-
         # Clean up the build dir
         build_dir = Path(args.build_base)
+        # remove leftovers of interrupted clean builds
+        empty_trash(build_dir.parent / TRASH_DIRECTORY_NAME)
         if args.clean_build:
             if build_dir.is_symlink():
                 build_dir.unlink()
             elif build_dir.exists():
-                shutil.rmtree(build_dir)
+                # Deleting many small files can take minutes, don't let the
+                # build wait for it
+                move_to_trash(build_dir)
+
+        if getattr(args, 'cargo_target_tmpfs', None):
+            self._stage_target_dir(args.cargo_target_tmpfs)
+        else:
+            write_marker(build_dir, None)
 
-        if CARGO_EXECUTABLE is None:
+        if _get_cargo_executable() is None:
             raise RuntimeError("Could not find 'cargo' executable")
 
-        # Get package metadata
-        metadata = await self._get_metadata(env)
+        # Record the toolchain used for the build, the module is only
+        # imported once a package is actually built
+        from colcon_cargo.task.cargo import toolchain
+        with profile_section('build.toolchain'):
+            self.toolchain = await toolchain.try_get_toolchain_async(
+                cargo_executable=_get_cargo_executable(), env=env,
+                cwd=args.path)
+        if self.toolchain is not None:
+            build_dir.mkdir(parents=True, exist_ok=True)
+            (build_dir / 'cargo_toolchain.json').write_text(
+                json.dumps(self.toolchain, indent=2, sort_keys=True))
 
         cargo_args = args.cargo_args
         if cargo_args is None:
             cargo_args = []
-        # Invoke build step
-        cmd = self._build_cmd(cargo_args)
+        fast_link_args = []
+        if getattr(args, 'cargo_fast_link', False):
+            if self.toolchain is None:
+                logger.warning(
+                    'Fast linking requires the toolchain information')
+            else:
+                fast_link_args = toolchain.get_fast_link_args(
+                    self.toolchain, env=env, cwd=args.path)
+        # the overrides are part of the arguments so that they apply to both
+        # the build and the install command, and they are recorded so that
+        # the test task doesn't invalidate the artifacts by omitting them
+        cargo_args = fast_link_args + cargo_args
+        toolchain.save_fast_link_args(build_dir, fast_link_args)
 
-        self.progress('build')
+        variants = getattr(args, 'cargo_variants', None)
+        if variants:
+            try:
+                builds, installs = self._get_variant_args(
+                    variants, cargo_args)
+            except ValueError as e:
+                logger.error(str(e))
+                return 1
+        else:
+            builds, installs = [cargo_args], [(cargo_args, None)]
 
         pkg = self.context.pkg
-        rc = await run(
-            self.context, cmd, cwd=pkg.path, env=env)
-        if rc and rc.returncode:
-            return rc.returncode
+        artifact_cache, cache_key = await self._get_artifact_cache(
+            env, cargo_args)
+        # the restored install prefix replaces the previous one, so the
+        # environment hooks are only generated after it
+        restored = cache_key is not None and \
+            artifact_cache.restore(cache_key, args.install_base)
+
+        self.progress('prepare')
+        rc = self._prepare(env, additional_hooks)
+        if rc:
+            return rc
+
+        if restored:
+            log_event('artifact_cache', package=pkg.name, hit=True)
+            logger.info(
+                f"Restored '{pkg.name}' from artifact cache '{cache_key}'")
+            if not skip_hook_creation:
+                self._create_environment_scripts(additional_hooks)
+            return
+        if cache_key is not None:
+            log_event('artifact_cache', package=pkg.name, hit=False)
+
+        if getattr(args, 'cargo_compiler_cache', False):
+            await self._configure_compiler_cache(env)
+
+        if getattr(args, 'cargo_check', False):
+            self.progress('check')
+            rc = await self._check(cargo_args, env)
+            if rc:
+                return rc
+            if not skip_hook_creation:
+                self._create_environment_scripts(additional_hooks)
+            return
+
+        # Get package metadata
+        metadata = await self._get_metadata(env)
+
+        if getattr(args, 'cargo_link_throttle', False):
+            self._throttle_links(env)
+
+        references = None
+        if getattr(args, 'cargo_gc', False):
+            references = UnitReferences()
+            self.message_callbacks.append(references.add_message)
+        artifacts = None
+        if get_event_log() is not None:
+            artifacts = ArtifactCounter(Path(pkg.path) / 'Cargo.toml')
+            self.message_callbacks.append(artifacts.add_message)
+
+        space_exhaustion = None
+        if self.target_dir is not None:
+            space_exhaustion = SpaceExhaustion()
+            self.message_callbacks.append(space_exhaustion.add_message)
+            self.stderr_callbacks.append(space_exhaustion.add_line)
+
+        # Invoke build step
+        self.progress('build')
+        rc = await self._run_builds(builds, env)
+        if rc and self._move_exhausted_target_dir_to_disk(space_exhaustion):
+            rc = await self._run_builds(builds, env)
+        if rc:
+            return rc
 
         # colcon-ros-cargo overrides install command to return None.
         # We also need to check if the package has any binaries, because if it
         # has no binaries then cargo install will return an error.
-        cmd = self._install_cmd(cargo_args)
-        if cmd is not None and self._has_binaries(metadata, pkg.name):
+        for install_args, root in installs:
+            cmd = self._install_cmd(install_args) if root is None \
+                else self._install_cmd(install_args, root=root)
+            if cmd is None or not self._has_binaries(metadata, pkg.name):
+                break
             self.progress('install')
-            rc = await run(
-                self.context, cmd, cwd=pkg.path, env=env)
+            rc = await self._run_cargo(cmd, env)
             if rc and rc.returncode:
                 return rc.returncode
 
+        if self.target_dir is not None:
+            with profile_section('build.target_snapshot'):
+                sync_snapshot(self.target_dir, args.build_base)
+
+        if artifacts is not None:
+            log_event(
+                'artifacts', package=pkg.name, fresh=artifacts.fresh,
+                compiled=artifacts.compiled,
+                artifact_bytes=artifacts.artifact_bytes,
+                installed_bytes=self._get_installed_size())
+
+        if references is not None:
+            self.progress('gc')
+            self._collect_garbage(references)
+
         if not skip_hook_creation:
-            create_environment_scripts(
-                pkg, args, additional_hooks=additional_hooks)
+            self._create_environment_scripts(additional_hooks)
+
+        if cache_key is not None:
+            with profile_section('build.artifact_cache'):
+                artifact_cache.store(cache_key, args.install_base)
+                artifact_cache.evict()
+
+    @profiled('build.environment_scripts')
+    def _create_environment_scripts(self, additional_hooks):
+        pkg = self.context.pkg
+        args = self.context.args
+        generate_unless_unchanged(
+            args.build_base, args.install_base, pkg.name, 'scripts', {
+                'hooks': [str(h) for h in pkg.hooks],
+                'additional_hooks': [str(h) for h in additional_hooks],
+                'run_dependencies': sorted(
+                    str(d) for d in pkg.dependencies.get('run', ())),
+            },
+            lambda: create_environment_scripts(
+                pkg, args, additional_hooks=additional_hooks))
+
+    async def _run_builds(self, builds, env):
+        for build_args in builds:
+            cmd = self._build_cmd(build_args)
+            rc = await self._run_cargo(cmd, env)
+            if rc and rc.returncode:
+                return rc.returncode
+        return 0
+
+    def _stage_target_dir(self, root):
+        args = self.context.args
+        staging = get_staging_directory(root, args.build_base)
+        if args.clean_build and staging.exists():
+            move_to_trash(staging)
+        min_free = getattr(args, 'cargo_target_tmpfs_min_free', None) or 0
+        if not has_capacity(staging, min_free):
+            logger.warning(
+                f"Not enough space in '{root}', building "
+                f"'{self.context.pkg.name}' on disk")
+        elif create_staging_directory(staging):
+            self.target_dir = str(staging)
+            write_marker(args.build_base, self.target_dir)
+            return
+        write_marker(args.build_base, None)
+
+    def _move_exhausted_target_dir_to_disk(self, space_exhaustion):
+        # a build which failed because the staged target directory ran out
+        # of space is repeated on disk, other failures are reported as is
+        args = self.context.args
+        if self.target_dir is None or not space_exhaustion.detected:
+            return False
+        logger.warning(
+            f"The space in '{self.target_dir}' ran out, building "
+            f"'{self.context.pkg.name}' on disk")
+        move_to_trash(self.target_dir)
+        self.target_dir = None
+        write_marker(args.build_base, None)
+        return True
+
+    @profiled('build.cargo')
+    async def _run_cargo(self, cmd, env):
+        # Request JSON messages from cargo only if anything consumes them
+        if not self.message_callbacks and not self.stderr_callbacks:
+            return await logged_command(self.context.pkg.name, cmd, run(
+                self.context, cmd, cwd=self.context.pkg.path, env=env))
+
+        def message_callback(message):
+            for callback in self.message_callbacks:
+                callback(message)
+
+        def stderr_callback(line):
+            for callback in self.stderr_callbacks:
+                callback(line)
+
+        return await logged_command(
+            self.context.pkg.name, cmd, run_with_messages(
+                self.context, add_message_format(cmd), message_callback,
+                stderr_callback=stderr_callback,
+                cwd=self.context.pkg.path, env=env))
+
+    def progress(self, message):  # noqa: D102
+        log_event(
+            'phase', package=self.context.pkg.name, task='build',
+            phase=message)
+        super().progress(message)
+
+    def _get_installed_size(self):
+        args = self.context.args
+        if getattr(args, 'merge_install', False):
+            # the prefix contains the files of other packages as well
+            return None
+        size = 0
+        for dirpath, _, filenames in os.walk(args.install_base):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                if not os.path.islink(path):
+                    size += os.path.getsize(path)
+        return size
+
+    @profiled('build.check')
+    async def _check(self, cargo_args, env):
+        args = self.context.args
+        diagnostics = {}
+
+        def message_callback(message):
+            for callback in self.message_callbacks:
+                callback(message)
+            if message.get('reason') == 'compiler-message':
+                level = message.get('message', {}).get('level')
+                diagnostics[level] = diagnostics.get(level, 0) + 1
+
+        cmd = add_message_format(self._check_cmd(cargo_args), 'json')
+        rc = await run_with_messages(
+            self.context, cmd, message_callback,
+            cwd=self.context.pkg.path, env=env)
+
+        # record the result of the check in place of the build artifacts
+        build_dir = Path(args.build_base)
+        build_dir.mkdir(parents=True, exist_ok=True)
+        (build_dir / 'cargo_check.json').write_text(json.dumps({
+            'returncode': rc.returncode,
+            'diagnostics': diagnostics,
+        }, indent=2, sort_keys=True))
+        if diagnostics:
+            summary = ', '.join(
+                f'{count} {level}' for level, count in sorted(
+                    diagnostics.items()))
+            logger.info(
+                f"Checked '{self.context.pkg.name}' with {summary}")
+        return rc.returncode
+
+    def _check_cmd(self, cargo_args):
+        args = self.context.args
+        pkg = self.context.pkg
+        cmd = [
+            _get_cargo_executable(),
+            'check',
+            '--quiet',
+            '--package', pkg.name,
+            '--target-dir', self.target_dir or args.build_base,
+        ]
+        if getattr(args, 'cargo_check_all_targets', False):
+            cmd.append('--all-targets')
+        if not any(
+            arg == '--profile' or arg.startswith('--profile=')
+            for arg in cargo_args
+        ):
+            cmd += ['--profile', 'dev']
+        return cmd + cargo_args
+
+    async def _configure_compiler_cache(self, env):
+        args = self.context.args
+        executable = find_compiler_cache()
+        if executable is None:
+            logger.warning(
+                "Could not find 'sccache' executable, the compiler cache is "
+                'not used')
+            return None
+        wrapper = get_configured_wrapper(env, executable)
+        if wrapper is not None:
+            logger.warning(
+                f"The rustc wrapper '{wrapper}' is already configured, the "
+                'compiler cache is not used')
+            return None
+        cache_dir = getattr(args, 'cargo_compiler_cache_dir', None) or \
+            get_cache_path('sccache')
+        configure_compiler_cache(
+            env, executable, cache_dir=cache_dir,
+            max_size=getattr(
+                args, 'cargo_compiler_cache_max_size', None) or
+            parse_size('10G'))
+        # the statistics of the shared server are reported for all builds
+        # of the invocation when the process exits
+        await start_session(self.context, executable, env)
+
+    def _throttle_links(self, env):
+        if os.name == 'nt':
+            logger.warning('Link throttling is not supported on Windows')
+            return
+        args = self.context.args
+        budget = getattr(args, 'cargo_link_memory', None)
+        if budget is None:
+            budget = get_available_memory()
+        if budget is None:
+            logger.warning(
+                'Failed to determine the available memory, links are not '
+                'throttled')
+            return
+        wrapper = Path(args.build_base) / 'colcon_cargo_rustc_wrapper'
+        create_wrapper(wrapper)
+        configure_link_throttle(env, wrapper, budget)
+
+    @profiled('build.gc')
+    def _collect_garbage(self, references):
+        args = self.context.args
+        target_dir = Path(self.target_dir or args.build_base)
+        references.resolve(target_dir)
+        references.save(target_dir)
+
+        other_target_dirs = ()
+        if getattr(args, 'cargo_gc_scope', None) == 'global':
+            other_target_dirs = find_target_directories(target_dir)
+        min_age = getattr(args, 'cargo_gc_min_age', None) or 0
+        removed = collect_garbage(
+            target_dir, references,
+            min_age=min_age * 60 * 60,
+            max_size=getattr(args, 'cargo_gc_max_size', None),
+            other_target_dirs=other_target_dirs)
+        if removed:
+            logger.info(
+                f'Removed {removed} bytes of unused artifacts for '
+                f"'{self.context.pkg.name}'")
+
+    @profiled('build.artifact_cache')
+    async def _get_artifact_cache(self, env, cargo_args):
+        args = self.context.args
+        path = getattr(args, 'cargo_artifact_cache', None)
+        if not path or getattr(args, 'cargo_check', False):
+            return None, None
+        if getattr(args, 'merge_install', False):
+            logger.warning(
+                'The artifact cache is not supported with a merged install '
+                'prefix')
+            return None, None
+        if self.toolchain is None:
+            return None, None
+
+        from colcon_cargo.task.cargo.toolchain import get_toolchain_fingerprint
+        max_age = getattr(args, 'cargo_artifact_cache_max_age', None)
+        artifact_cache = ArtifactCache(
+            path,
+            max_size=getattr(args, 'cargo_artifact_cache_max_size', None),
+            max_age=max_age * 24 * 60 * 60 if max_age is not None else None)
+        # hashing the sources mustn't block the builds of other packages
+        cache_key = await asyncio.get_event_loop().run_in_executor(
+            None, functools.partial(
+                get_cache_key,
+                self.context.pkg,
+                cargo_args=cargo_args,
+                toolchain_fingerprint=get_toolchain_fingerprint(
+                    self.toolchain),
+                dependencies=self.context.dependencies,
+                env=env,
+                variant=[
+                    type(self).__module__, type(self).__qualname__,
+                    self._install_cmd([]) is None,
+                ] + [
+                    list(v)
+                    for v in getattr(args, 'cargo_variants', None) or ()
+                ]))
+        return artifact_cache, cache_key
+
+    def _get_variant_args(self, variants, cargo_args):
+        if any(
+            arg in ('--profile', '--release', '--target') or
+            arg.startswith(('--profile=', '--target='))
+            for arg in cargo_args
+        ):
+            raise ValueError(
+                'The Cargo arguments must not select a profile or target '
+                'when building variants')
+        host = (self.toolchain or {}).get('host')
+
+        # all targets of a profile are built by a single invocation, which
+        # requires the host target to be passed explicitly if it is combined
+        # with other targets
+        targets = {}
+        for profile, target in variants:
+            targets.setdefault(profile, [])
+            if target not in targets[profile]:
+                targets[profile].append(target)
+        for profile, profile_targets in targets.items():
+            if None in profile_targets and len(profile_targets) > 1:
+                if host is None:
+                    raise ValueError(
+                        'Building the host target together with other '
+                        'targets requires the toolchain information')
+                targets[profile] = list(dict.fromkeys(
+                    host if t is None else t for t in profile_targets))
+
+        builds = []
+        for profile, profile_targets in targets.items():
+            build_args = ['--profile', profile]
+            for target in profile_targets:
+                if target is not None:
+                    build_args += ['--target', target]
+            builds.append(cargo_args + build_args)
+
+        installs = []
+        install_base = Path(self.context.args.install_base)
+        for i, (profile, target) in enumerate(variants):
+            if target is None and None not in targets[profile]:
+                target = host
+            install_args = ['--profile', profile]
+            if target is not None:
+                install_args += ['--target', target]
+            root = None
+            if i:
+                root = str(
+                    install_base / 'lib' / self.context.pkg.name /
+                    get_variant_name(*variants[i]))
+            installs.append((cargo_args + install_args, root))
+        return builds, installs
 
     # Overridden by colcon-ros-cargo
     def _prepare(self, env, additional_hooks):
         pkg = self.context.pkg
-        additional_hooks += create_environment_hook(
-            'cargo_{}_path'.format(pkg.name),
-            Path(self.context.args.install_base), pkg.name,
-            'PATH', 'bin'
-        )
+        args = self.context.args
+        hook_name = 'cargo_{}_path'.format(pkg.name)
+        additional_hooks += generate_unless_unchanged(
+            args.build_base, args.install_base, pkg.name, hook_name,
+            ['PATH', 'bin'],
+            lambda: create_environment_hook(
+                hook_name, Path(args.install_base), pkg.name, 'PATH', 'bin'))
 
     # Overridden by colcon-ros-cargo
     def _build_cmd(self, cargo_args):
         args = self.context.args
         pkg = self.context.pkg
         cmd = [
-            CARGO_EXECUTABLE,
+            _get_cargo_executable(),
             'build',
             '--quiet',
             '--package', pkg.name,
-            '--target-dir', args.build_base,
+            '--target-dir', self.target_dir or args.build_base,
         ]
         if not any(
             arg == '--profile' or arg.startswith('--profile=')
@@ -128,17 +697,17 @@ class CargoBuildTask(TaskExtensionPoint):
         return cmd + cargo_args
 
     # Overridden by colcon-ros-cargo
-    def _install_cmd(self, cargo_args):
+    def _install_cmd(self, cargo_args, *, root=None):
         args = self.context.args
         cmd = [
-            CARGO_EXECUTABLE,
+            _get_cargo_executable(),
             'install',
             '--force',
             '--quiet',
             '--locked',
             '--path', '.',
-            '--root', args.install_base,
-            '--target-dir', args.build_base,
+            '--root', root or args.install_base,
+            '--target-dir', self.target_dir or args.build_base,
             '--no-track',
         ]
         if not any(
@@ -148,9 +717,19 @@ class CargoBuildTask(TaskExtensionPoint):
             cmd += ['--profile', 'dev']
         return cmd + cargo_args
 
+    @profiled('build.metadata')
     async def _get_metadata(self, env):
+        manifest = Path(self.context.pkg.path) / 'Cargo.toml'
+        try:
+            stat = manifest.stat()
+            cache_key = (str(manifest), stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            cache_key = None
+        if cache_key in _metadata_cache:
+            return _metadata_cache[cache_key]
+
         cmd = [
-            CARGO_EXECUTABLE,
+            _get_cargo_executable(),
             'metadata',
             '--no-deps',
             '--format-version', '1',
@@ -159,13 +738,13 @@ class CargoBuildTask(TaskExtensionPoint):
         # TODO: The reported target_directory is wrong. Does it matter here?
         #       We could maybe override it with --config
 
-        rc = await run(
+        rc = await logged_command(self.context.pkg.name, cmd, run(
             self.context,
             cmd,
             cwd=self.context.pkg.path,
             capture_output=True,
             env=env
-        )
+        ))
         if rc is None or rc.returncode != 0:
             raise RuntimeError(
                 "Could not inspect package using 'cargo metadata'"
@@ -176,7 +755,10 @@ class CargoBuildTask(TaskExtensionPoint):
                 "Failed to capture stdout from 'cargo metadata'"
             )
 
-        return json.loads(rc.stdout)
+        metadata = json.loads(rc.stdout)
+        if cache_key is not None:
+            _metadata_cache[cache_key] = metadata
+        return metadata
 
     # Identify if there are any binaries to install for the current package
     @staticmethod
@@ -197,3 +779,46 @@ class CargoBuildTask(TaskExtensionPoint):
         # If no binary target exists in the whole package, then skip running
         # cargo install because it would produce an error.
         return False
+
+
+def parse_variant(value):
+    """
+    Parse a build variant.
+
+    :param str value: The profile, optionally followed by a colon and a target
+      triple, e.g. `release:aarch64-unknown-linux-gnu`
+    :returns: The profile and the target triple or None
+    :rtype: tuple
+    :raises ValueError: if the profile is empty
+    """
+    profile, _, target = value.partition(':')
+    if not profile:
+        raise ValueError('The profile of a variant must not be empty')
+    return profile, target or None
+
+
+def get_variant_name(profile, target):
+    """
+    Get the name of a build variant used for its install prefix.
+
+    :param str profile: The profile
+    :param str target: The target triple or None
+    :rtype: str
+    """
+    return profile if target is None else f'{profile}-{target}'
+
+
+def _get_cargo_executable():
+    # a value assigned to CARGO_EXECUTABLE of this module, e.g. by packages
+    # extending the task, takes precedence over the lookup
+    try:
+        return globals()['CARGO_EXECUTABLE']
+    except KeyError:
+        return get_cargo_executable()
+
+
+def __getattr__(name):
+    # Resolve CARGO_EXECUTABLE on first access rather than at import time
+    if name == 'CARGO_EXECUTABLE':
+        return get_cargo_executable()
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
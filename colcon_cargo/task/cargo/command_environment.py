@@ -0,0 +1,181 @@
+# Copyright 2025 Open Source Robotics Foundation, Inc.
+# Licensed under the Apache License, Version 2.0
+
+from collections import OrderedDict
+import hashlib
+import json
+import os
+from pathlib import Path
+import sys
+
+from colcon_cargo import __version__
+from colcon_cargo.task.cargo import get_cache_path
+from colcon_core.environment_variable import EnvironDict
+from colcon_core.environment_variable import EnvironmentVariable
+from colcon_core.logging import colcon_logger
+from colcon_core.shell import get_command_environment
+from colcon_core.shell import get_shell_extensions
+
+logger = colcon_logger.getChild(__name__)
+
+"""Environment variable to disable the command environment cache"""
+NO_ENVIRONMENT_CACHE_ENVIRONMENT_VARIABLE = EnvironmentVariable(
+    'COLCON_CARGO_NO_ENVIRONMENT_CACHE',
+    'Source the hooks of all dependencies for every build and test instead '
+    'of reusing the command environment of identical dependency sets')
+
+# The command environments computed by this process, keyed like the entries
+# of the cache directory
+_environments = {}
+
+
+async def get_cached_command_environment(
+    task_name, build_base, dependencies
+):
+    """
+    Get the environment variables to invoke commands, reusing earlier results.
+
+    Sourcing the hooks of all dependencies takes a shell invocation per
+    package, while the resulting environment only depends on the hook files,
+    the environment of the process and the platform.
+    The environment is therefore memoized in memory and in the cache
+    directory under a key derived from these inputs, so it is shared between
+    the build and the test task as well as between invocations.
+    On a cache hit the shell scripts for debugging, which
+    `get_command_environment` writes to the build base, aren't updated.
+
+    :param str task_name: The task name identifying a group of task extensions
+    :param str build_base: The path of the build base
+    :param dependencies: The ordered dictionary mapping dependency names to
+      their paths
+    :returns: The environment, which the caller is free to modify
+    :rtype: dict
+    """
+    if os.environ.get(NO_ENVIRONMENT_CACHE_ENVIRONMENT_VARIABLE.name):
+        return await get_command_environment(
+            task_name, build_base, dependencies)
+
+    key = get_environment_key(dependencies)
+    if key is None:
+        # let the shell extensions report the missing dependencies
+        return await get_command_environment(
+            task_name, build_base, dependencies)
+
+    difference = _environments.get(key)
+    path = get_cache_path('command-environment', key[:2], key + '.json')
+    if difference is None:
+        difference = _load_difference(path)
+    if difference is None:
+        # the shell extensions remove dependencies which are already part of
+        # the environment, which mustn't depend on hitting the cache
+        env = await get_command_environment(
+            task_name, build_base, OrderedDict(dependencies or {}))
+        difference = _get_difference(os.environ, env)
+        _save_difference(path, difference)
+    else:
+        logger.debug(
+            f"Reusing the command environment '{key}' for '{build_base}'")
+    _environments[key] = difference
+    return _apply_difference(os.environ, difference)
+
+
+def clear_memo():
+    """Forget the command environments computed by this process."""
+    _environments.clear()
+
+
+def get_environment_key(dependencies):
+    """
+    Compute the key identifying all inputs of a command environment.
+
+    The hook files of the dependencies are only considered by their names,
+    sizes and modification times.
+
+    :param dependencies: The ordered dictionary mapping dependency names to
+      their install prefixes
+    :returns: A hex digest, or None if the resources of a dependency are
+      missing
+    :rtype: str
+    """
+    h = hashlib.sha256()
+
+    def update(*values):
+        h.update(json.dumps(values).encode())
+        h.update(b'\0')
+
+    update('colcon-cargo', __version__, sys.platform, os.name)
+    update('shells', sorted(
+        name
+        for extensions in get_shell_extensions().values()
+        for name in extensions.keys()))
+    update('environ', sorted(os.environ.items()))
+    for name, prefix in (dependencies or {}).items():
+        share = Path(prefix) / 'share' / name
+        if not share.is_dir():
+            return None
+        update('dependency', name, str(prefix))
+        for path in (
+            share, Path(prefix) / 'share' / 'colcon-core' / 'packages' / name,
+        ):
+            for stat in _get_file_stats(path):
+                update(*stat)
+    return h.hexdigest()
+
+
+def _get_file_stats(path):
+    stats = []
+    for dirpath, dirnames, filenames in os.walk(str(path)):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            file_path = os.path.join(dirpath, filename)
+            try:
+                stat = os.stat(file_path)
+            except OSError:
+                continue
+            stats.append((file_path, stat.st_size, stat.st_mtime_ns))
+    if not stats and path.is_file():
+        stat = path.stat()
+        stats.append((str(path), stat.st_size, stat.st_mtime_ns))
+    return stats
+
+
+def _get_difference(base, env):
+    # only the changes are persisted, not the whole environment of the user
+    return {
+        'set': {
+            name: value for name, value in env.items()
+            if base.get(name) != value},
+        'unset': sorted(name for name in base.keys() if name not in env),
+    }
+
+
+def _apply_difference(base, difference):
+    env = EnvironDict(base)
+    env.update(difference['set'])
+    for name in difference['unset']:
+        env.pop(name, None)
+    return env
+
+
+def _load_difference(path):
+    try:
+        with open(str(path)) as f:
+            difference = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(difference, dict) or \
+            not isinstance(difference.get('set'), dict) or \
+            not isinstance(difference.get('unset'), list):
+        return None
+    return difference
+
+
+def _save_difference(path, difference):
+    temp_path = path.parent / f'{path.name}.{os.getpid()}.tmp'
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(str(temp_path), 'w') as f:
+            json.dump(difference, f, sort_keys=True)
+        os.replace(str(temp_path), str(path))
+    except OSError as e:
+        logger.debug(f'Failed to cache the command environment: {e}')
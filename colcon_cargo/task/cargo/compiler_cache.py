@@ -0,0 +1,216 @@
+# Copyright 2025 Open Source Robotics Foundation, Inc.
+# Licensed under the Apache License, Version 2.0
+
+import asyncio
+import atexit
+import json
+import os
+import shutil
+import subprocess
+
+from colcon_cargo.event_log import log_event
+from colcon_cargo.task.cargo import SCCACHE_COMMAND_ENVIRONMENT_VARIABLE
+from colcon_cargo.task.cargo import which_executable
+from colcon_core.logging import colcon_logger
+from colcon_core.task import run
+
+logger = colcon_logger.getChild(__name__)
+
+# The statistics before the first build of this process using the cache
+_session = None
+
+
+def find_compiler_cache():
+    """
+    Find a compiler cache which can be used as a rustc wrapper.
+
+    :returns: The path of the sccache executable, or None if it isn't
+      available
+    :rtype: str
+    """
+    return which_executable(
+        SCCACHE_COMMAND_ENVIRONMENT_VARIABLE.name, 'sccache')
+
+
+def get_configured_wrapper(env, executable):
+    """
+    Get a rustc wrapper configured by the user other than the compiler cache.
+
+    :param dict env: The environment
+    :param str executable: The path of the sccache executable
+    :returns: The configured wrapper, or None if no other wrapper is set
+    :rtype: str
+    """
+    for name in ('RUSTC_WRAPPER', 'CARGO_BUILD_RUSTC_WRAPPER'):
+        wrapper = env.get(name)
+        if not wrapper:
+            continue
+        path = shutil.which(wrapper, path=env.get('PATH')) or wrapper
+        if os.path.realpath(path) != os.path.realpath(executable):
+            return wrapper
+    return None
+
+
+def configure_environment(env, executable, *, cache_dir, max_size):
+    """
+    Let cargo invoke rustc through the compiler cache.
+
+    The cache uses the local disk, a directory or size configured by the
+    user in the environment takes precedence.
+    The caller must ensure that the user didn't configure another rustc
+    wrapper, see `get_configured_wrapper`.
+
+    :param dict env: The environment to modify
+    :param str executable: The path of the sccache executable
+    :param cache_dir: The directory of the cache
+    :param int max_size: The maximum size of the cache in bytes
+    """
+    env['RUSTC_WRAPPER'] = executable
+    env.setdefault('SCCACHE_DIR', str(cache_dir))
+    env.setdefault('SCCACHE_CACHE_SIZE', format_size(max_size))
+
+
+def format_size(size):
+    """
+    Format a size using the binary unit suffixes sccache accepts.
+
+    :param int size: The size in bytes
+    :returns: The size in the largest unit which represents it exactly, but
+      at least in kilobytes
+    :rtype: str
+    """
+    for suffix, factor in (
+        ('T', 1 << 40), ('G', 1 << 30), ('M', 1 << 20),
+    ):
+        if size >= factor and not size % factor:
+            return f'{size // factor}{suffix}'
+    return f'{max(1, size >> 10)}K'
+
+
+async def start_session(context, executable, env):
+    """
+    Remember the statistics of the compiler cache before the first build.
+
+    The statistics are collected by the sccache server, which is shared by
+    all concurrent builds, so they can't be attributed to a single package.
+    Instead the statistics of all builds of this process are reported by
+    `report_session` when the process exits.
+
+    :param context: The job context of the build
+    :param str executable: The path of the sccache executable
+    :param env: The environment the compiler cache is used in
+    """
+    global _session
+    if _session is None:
+        _session = {
+            'executable': executable,
+            'env': dict(env),
+            'before': asyncio.ensure_future(
+                get_statistics(context, executable, env)),
+        }
+        atexit.register(report_session)
+    # concurrently starting builds wait for the first snapshot
+    await _session['before']
+
+
+def report_session():
+    """
+    Report the statistics of the compiler cache since the first build.
+
+    :returns: The number of `hits`, `misses` and `requests` of all builds of
+      this process, or None if the statistics aren't available
+    :rtype: dict
+    """
+    global _session
+    session, _session = _session, None
+    if session is None or not session['before'].done() or \
+            session['before'].cancelled():
+        return None
+    # the event loop isn't running anymore when the process exits
+    try:
+        output = subprocess.run(
+            [session['executable'], '--show-stats', '--stats-format=json'],
+            env=session['env'], stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL, check=True).stdout
+    except (OSError, subprocess.CalledProcessError) as e:
+        logger.debug(f'Failed to get the compiler cache statistics: {e}')
+        return None
+    statistics = get_statistics_delta(
+        session['before'].result(), _parse_statistics(output))
+    if statistics is None:
+        return None
+    log_event('compiler_cache', **statistics)
+    logger.info(
+        f"Compiler cache: {statistics['hits']} hits, "
+        f"{statistics['misses']} misses")
+    return statistics
+
+
+async def get_statistics(context, executable, env):
+    """
+    Get the number of cache hits and misses of the compiler cache.
+
+    The statistics are collected by the sccache server, which is shared by
+    all concurrent builds and other processes using the same server.
+    Querying them starts the server if it isn't running yet, which the
+    following build would do anyway.
+
+    :param context: The job context of the build
+    :param str executable: The path of the sccache executable
+    :param env: The environment the compiler cache is used in
+    :returns: The number of `hits`, `misses` and `requests`, or None if the
+      statistics aren't available
+    :rtype: dict
+    """
+    try:
+        rc = await run(
+            context, [executable, '--show-stats', '--stats-format=json'],
+            env=env, capture_output=True)
+    except OSError as e:
+        logger.debug(f'Failed to get the compiler cache statistics: {e}')
+        return None
+    if rc.returncode:
+        logger.debug(
+            'Failed to get the compiler cache statistics: '
+            f'return code {rc.returncode}')
+        return None
+    return _parse_statistics(rc.stdout)
+
+
+def _parse_statistics(output):
+    try:
+        stats = json.loads(output)['stats']
+    except (ValueError, KeyError, TypeError) as e:
+        logger.debug(f'Failed to get the compiler cache statistics: {e}')
+        return None
+    return {
+        'hits': _sum_counts(stats.get('cache_hits')),
+        'misses': _sum_counts(stats.get('cache_misses')),
+        'requests': stats.get('compile_requests', 0),
+    }
+
+
+def get_statistics_delta(before, after):
+    """
+    Get the difference between two snapshots of the statistics.
+
+    :param dict before: The statistics before the build
+    :param dict after: The statistics after the build
+    :returns: The statistics of the build, or None if either snapshot is
+      missing
+    :rtype: dict
+    """
+    if before is None or after is None:
+        return None
+    # the counters start from zero if the server was restarted in between
+    return {
+        key: after[key] - before[key] if after[key] >= before[key]
+        else after[key]
+        for key in after}
+
+
+def _sum_counts(counts):
+    # the counts are grouped by language, e.g. {'counts': {'Rust': 42}}
+    if not isinstance(counts, dict):
+        return 0
+    return sum(counts.get('counts', {}).values())
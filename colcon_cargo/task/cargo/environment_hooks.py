@@ -0,0 +1,170 @@
+# Copyright 2025 Open Source Robotics Foundation, Inc.
+# Licensed under the Apache License, Version 2.0
+
+import hashlib
+import json
+import os
+from pathlib import Path
+
+from colcon_cargo import __version__
+from colcon_core.logging import colcon_logger
+from colcon_core.shell import get_shell_extensions
+
+logger = colcon_logger.getChild(__name__)
+
+# The file in the build directory recording the generated environment hooks
+STAMP_FILE = 'cargo_environment_hooks.json'
+
+
+def generate_unless_unchanged(
+    build_base, install_base, pkg_name, name, inputs, generate,
+):
+    """
+    Generate environment hooks or scripts only if their inputs changed.
+
+    The generation is skipped if the digest of the inputs and the files
+    written by the previous generation, compared by size and modification
+    time, are unchanged.
+    Otherwise the files are generated, and the modification times of files
+    whose content turned out to be identical are restored, so that consumers
+    like the command environment cache don't consider them changed.
+
+    :param build_base: The build directory storing the stamp
+    :param install_base: The install prefix of the package
+    :param str pkg_name: The package name
+    :param str name: The name distinguishing generation steps of a package
+    :param inputs: JSON serializable data describing everything the
+      generated content depends on besides the install prefix
+    :param generate: The callable generating the files, returning an
+      iterable of paths
+    :returns: The paths returned by the callable, possibly from the stamp
+    :rtype: list
+    """
+    install_base = Path(install_base)
+    digest = _get_digest(install_base, pkg_name, inputs)
+    stamp_path = Path(build_base) / STAMP_FILE
+    stamps = _load_stamps(stamp_path)
+    stamp = stamps.get(name)
+    if isinstance(stamp, dict) and stamp.get('digest') == digest and \
+            _get_fingerprints(stamp['files']) == stamp['files']:
+        logger.debug(
+            f"Skipping the unchanged environment hooks '{name}' of "
+            f"'{pkg_name}'")
+        return [Path(p) for p in stamp['result']]
+
+    before = _get_contents(install_base, pkg_name)
+    result = [Path(p) for p in (generate() or ())]
+    after = _get_stats(_get_hook_paths(install_base, pkg_name))
+    written = {}
+    for path, stat in after.items():
+        content, old_stat = before.get(path, (None, None))
+        if old_stat is not None and stat[:2] == old_stat[:2]:
+            # not written by the generation
+            continue
+        if content is not None and stat[0] == old_stat[0] and \
+                _read_bytes(path) == content:
+            os.utime(path, ns=(old_stat[2], old_stat[1]))
+            stat = old_stat
+        written[path] = stat
+
+    stamps[name] = {
+        'digest': digest,
+        'files': _get_fingerprints(written.keys()),
+        'result': [str(p) for p in result],
+    }
+    _save_stamps(stamp_path, stamps)
+    return result
+
+
+def _get_digest(install_base, pkg_name, inputs):
+    h = hashlib.sha256()
+
+    def update(*values):
+        h.update(json.dumps(values, default=str).encode())
+        h.update(b'\0')
+
+    update('colcon-cargo', __version__, pkg_name, str(install_base))
+    update('shells', [
+        (priority, sorted(extensions.keys()))
+        for priority, extensions in get_shell_extensions().items()])
+    update('inputs', inputs)
+    # environment extensions generate hooks depending on the installed
+    # files, e.g. if a `bin` or `lib` directory exists
+    for entry in _scandir(install_base):
+        if not entry.is_dir():
+            continue
+        update('entry', entry.name, [
+            child.name for child in _scandir(entry.path)
+            if child.name not in (pkg_name, 'colcon-core')])
+    return h.hexdigest()
+
+
+def _get_hook_paths(install_base, pkg_name):
+    paths = []
+    share = install_base / 'share' / pkg_name
+    for dirpath, dirnames, filenames in os.walk(str(share)):
+        dirnames.sort()
+        paths += [os.path.join(dirpath, f) for f in sorted(filenames)]
+    paths.append(str(
+        install_base / 'share' / 'colcon-core' / 'packages' / pkg_name))
+    return paths
+
+
+def _get_stats(paths):
+    stats = {}
+    for path in paths:
+        try:
+            stat = os.stat(str(path))
+        except OSError:
+            continue
+        stats[str(path)] = (stat.st_size, stat.st_mtime_ns, stat.st_atime_ns)
+    return stats
+
+
+def _get_fingerprints(paths):
+    # the access time changes whenever the hooks are sourced
+    return {
+        path: [size, mtime]
+        for path, (size, mtime, _) in _get_stats(paths).items()}
+
+
+def _get_contents(install_base, pkg_name):
+    contents = {}
+    for path, stat in _get_stats(
+        _get_hook_paths(install_base, pkg_name)
+    ).items():
+        contents[path] = (_read_bytes(path), stat)
+    return contents
+
+
+def _read_bytes(path):
+    try:
+        with open(path, 'rb') as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def _scandir(path):
+    try:
+        with os.scandir(str(path)) as it:
+            return sorted(it, key=lambda entry: entry.name)
+    except OSError:
+        return []
+
+
+def _load_stamps(path):
+    try:
+        with path.open() as f:
+            stamps = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return stamps if isinstance(stamps, dict) else {}
+
+
+def _save_stamps(path, stamps):
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(stamps, indent=2, sort_keys=True))
+    except OSError as e:
+        logger.debug(f'Failed to write the environment hook stamp: {e}')
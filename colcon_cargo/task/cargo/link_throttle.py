@@ -0,0 +1,306 @@
+# Copyright 2025 Open Source Robotics Foundation, Inc.
+# Licensed under the Apache License, Version 2.0
+
+import json
+import os
+from pathlib import Path
+import subprocess
+import sys
+import time
+import uuid
+
+from colcon_cargo.task.cargo import get_cache_path
+
+# The environment variable passing the memory budget to the rustc wrapper
+LINK_MEMORY_ENVIRONMENT_VARIABLE = 'COLCON_CARGO_LINK_MEMORY'
+
+# The environment variable passing a previously configured rustc wrapper to
+# the rustc wrapper, which is invoked in turn
+INNER_WRAPPER_ENVIRONMENT_VARIABLE = 'COLCON_CARGO_INNER_RUSTC_WRAPPER'
+
+# The crate types which are linked into a final artifact
+LINK_CRATE_TYPES = ('bin', 'cdylib', 'dylib')
+
+# The memory reserved for a link without any observed peak memory usage
+DEFAULT_LINK_MEMORY = 2 << 30
+
+# The interval in seconds between attempts to reserve memory
+POLL_INTERVAL = 0.2
+
+WRAPPER_TEMPLATE = """#!{executable}
+import sys
+sys.path.insert(0, {path!r})
+from colcon_cargo.task.cargo.link_throttle import main
+sys.exit(main(sys.argv[1:]))
+"""
+
+
+def create_wrapper(path):
+    """
+    Create a rustc wrapper which limits the memory used by concurrent links.
+
+    Cargo invokes the wrapper with the path of rustc followed by its
+    arguments, see `RUSTC_WRAPPER`.
+
+    :param path: The path of the wrapper script
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    package_path = Path(__file__).resolve().parents[3]
+    path.write_text(WRAPPER_TEMPLATE.format(
+        executable=sys.executable, path=str(package_path)))
+    path.chmod(0o755)
+
+
+def configure_environment(env, wrapper, budget):
+    """
+    Let cargo invoke rustc through the throttling wrapper.
+
+    A rustc wrapper which is already configured, e.g. a compiler cache, is
+    still invoked by the throttling wrapper.
+
+    :param dict env: The environment to modify
+    :param wrapper: The path of the wrapper created by `create_wrapper`
+    :param int budget: The memory in bytes available to concurrent links
+    """
+    if env.get('RUSTC_WRAPPER') and env['RUSTC_WRAPPER'] != str(wrapper):
+        env[INNER_WRAPPER_ENVIRONMENT_VARIABLE] = env['RUSTC_WRAPPER']
+    env['RUSTC_WRAPPER'] = str(wrapper)
+    env[LINK_MEMORY_ENVIRONMENT_VARIABLE] = str(budget)
+
+
+def get_available_memory():
+    """
+    Determine the memory available for starting new processes.
+
+    :returns: The available memory in bytes, or None if it can't be
+      determined
+    :rtype: int
+    """
+    try:
+        with open('/proc/meminfo') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        return os.sysconf('SC_AVPHYS_PAGES') * os.sysconf('SC_PAGE_SIZE')
+    except (AttributeError, OSError, ValueError):
+        return None
+
+
+def is_link_invocation(args):
+    """
+    Check if a rustc invocation links a binary or a dynamic library.
+
+    Build scripts are excluded since linking them is cheap.
+
+    :param list args: The arguments passed to rustc
+    :rtype: bool
+    """
+    crate_types = []
+    crate_name = None
+    emit = None
+    for i, arg in enumerate(args):
+        value = args[i + 1] if i + 1 < len(args) else None
+        if arg.startswith('--crate-type='):
+            crate_types += arg.split('=', 1)[1].split(',')
+        elif arg == '--crate-type' and value:
+            crate_types += value.split(',')
+        elif arg.startswith('--crate-name='):
+            crate_name = arg.split('=', 1)[1]
+        elif arg == '--crate-name':
+            crate_name = value
+        elif arg.startswith('--emit='):
+            emit = arg.split('=', 1)[1].split(',')
+        elif arg == '--emit' and value:
+            emit = value.split(',')
+        elif arg == '--test':
+            crate_types.append('bin')
+        elif arg.startswith('--print'):
+            # cargo probing the capabilities of rustc
+            return False
+    if crate_name is None or crate_name.startswith('build_script_'):
+        return False
+    if emit is not None and not any(e.startswith('link') for e in emit):
+        # e.g. cargo check only emits metadata
+        return False
+    return any(t in LINK_CRATE_TYPES for t in crate_types)
+
+
+def main(argv):
+    """
+    Invoke rustc, waiting for enough memory before linking.
+
+    :param list argv: The path of rustc followed by its arguments
+    :returns: The return code of rustc
+    :rtype: int
+    """
+    cmd = list(argv)
+    inner_wrapper = os.environ.get(INNER_WRAPPER_ENVIRONMENT_VARIABLE)
+    if inner_wrapper:
+        cmd.insert(0, inner_wrapper)
+    if not is_link_invocation(argv[1:]):
+        os.execvp(cmd[0], cmd)
+
+    key = _get_history_key(argv[1:])
+    ledger = LinkLedger(get_cache_path('link-throttle'))
+    budget = int(os.environ.get(LINK_MEMORY_ENVIRONMENT_VARIABLE) or 0)
+    reservation = ledger.reserve(ledger.get_estimate(key), budget)
+    try:
+        returncode, peak = _run_measured(cmd)
+        if peak:
+            ledger.record_peak(key, peak)
+    finally:
+        ledger.release(reservation)
+    return returncode
+
+
+class LinkLedger:
+    """
+    The memory reserved by concurrent links of all processes on the machine.
+
+    The reservations and the observed peak memory usage of previous links are
+    persisted in JSON files which are guarded by a file lock.
+    """
+
+    def __init__(self, path):
+        """
+        Create a ledger.
+
+        :param path: The directory containing the ledger files
+        """
+        self.path = Path(path)
+
+    def get_estimate(self, key):
+        """
+        Get the memory a link is expected to use.
+
+        :param str key: The key identifying the linked crate
+        :returns: The peak memory usage of the previous link of the crate, or
+          a default if it hasn't been linked before
+        :rtype: int
+        """
+        with self._lock():
+            return self._read('history.json').get(key, DEFAULT_LINK_MEMORY)
+
+    def reserve(self, size, budget):
+        """
+        Wait until the memory can be reserved without exceeding the budget.
+
+        A link is always admitted if no other link is in progress, even if it
+        exceeds the budget by itself.
+
+        :param int size: The memory to reserve in bytes
+        :param int budget: The memory available to all links in bytes
+        :returns: The identifier of the reservation
+        :rtype: str
+        """
+        reservation = uuid.uuid4().hex
+        while True:
+            with self._lock():
+                reservations = {
+                    k: v for k, v in self._read('ledger.json').items()
+                    if _is_alive(v['pid'])}
+                reserved = sum(v['size'] for v in reservations.values())
+                if not reservations or reserved + size <= budget:
+                    reservations[reservation] = {
+                        'pid': os.getpid(), 'size': size}
+                    self._write('ledger.json', reservations)
+                    return reservation
+            time.sleep(POLL_INTERVAL)
+
+    def release(self, reservation):
+        """
+        Release a reservation.
+
+        :param str reservation: The identifier returned by `reserve`
+        """
+        with self._lock():
+            reservations = self._read('ledger.json')
+            reservations.pop(reservation, None)
+            self._write('ledger.json', reservations)
+
+    def record_peak(self, key, peak):
+        """
+        Record the observed peak memory usage of a link.
+
+        :param str key: The key identifying the linked crate
+        :param int peak: The peak memory usage in bytes
+        """
+        with self._lock():
+            history = self._read('history.json')
+            history[key] = peak
+            self._write('history.json', history)
+
+    def _lock(self):
+        self.path.mkdir(parents=True, exist_ok=True)
+        return _FileLock(self.path / 'lock')
+
+    def _read(self, name):
+        try:
+            return json.loads((self.path / name).read_text())
+        except (OSError, ValueError):
+            return {}
+
+    def _write(self, name, data):
+        temp_path = self.path / f'{name}.{os.getpid()}.tmp'
+        temp_path.write_text(json.dumps(data))
+        os.replace(str(temp_path), str(self.path / name))
+
+
+class _FileLock:
+
+    def __init__(self, path):
+        self.path = path
+        self.file = None
+
+    def __enter__(self):
+        import fcntl
+        self.file = self.path.open('a')
+        fcntl.flock(self.file, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *args):
+        # closing the file releases the lock
+        self.file.close()
+
+
+def _get_history_key(args):
+    crate_name = None
+    for i, arg in enumerate(args):
+        if arg.startswith('--crate-name='):
+            crate_name = arg.split('=', 1)[1]
+        elif arg == '--crate-name' and i + 1 < len(args):
+            crate_name = args[i + 1]
+    package_name = os.environ.get('CARGO_PKG_NAME')
+    kind = 'test' if '--test' in args else 'link'
+    return f'{package_name}:{crate_name}:{kind}'
+
+
+def _run_measured(cmd):
+    # wait for the process directly to get its peak resident set size, which
+    # includes the linker invoked by rustc, the file descriptors of the
+    # jobserver of cargo need to be inherited
+    process = subprocess.Popen(cmd, close_fds=False)
+    _, status, rusage = os.wait4(process.pid, 0)
+    if os.WIFSIGNALED(status):
+        process.returncode = -os.WTERMSIG(status)
+    else:
+        process.returncode = os.WEXITSTATUS(status)
+    peak = rusage.ru_maxrss
+    if sys.platform != 'darwin':
+        # reported in kilobytes except on macOS
+        peak *= 1024
+    return process.returncode, peak
+
+
+def _is_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        pass
+    return True
@@ -0,0 +1,108 @@
+# Copyright 2025 Open Source Robotics Foundation, Inc.
+# Licensed under the Apache License, Version 2.0
+
+import json
+
+from colcon_core.event.command import Command
+from colcon_core.event.command import CommandEnded
+from colcon_core.event.output import StderrLine
+from colcon_core.event.output import StdoutLine
+from colcon_core.subprocess import run as colcon_core_subprocess_run
+
+# The message format which renders diagnostics to stderr like a normal build
+# while emitting the machine readable messages to stdout
+MESSAGE_FORMAT = 'json-render-diagnostics'
+
+
+def add_message_format(cmd, message_format=MESSAGE_FORMAT):
+    """
+    Add the `--message-format` option to a cargo command.
+
+    The option is inserted right after the cargo subcommand, unless the
+    command already selects a message format.
+
+    :param list cmd: The command, starting with the cargo executable and
+      the subcommand
+    :param str message_format: The message format
+    :returns: The modified command
+    :rtype: list
+    """
+    if any(
+        arg == '--message-format' or arg.startswith('--message-format=')
+        for arg in cmd
+    ):
+        return cmd
+    return cmd[:2] + [f'--message-format={message_format}'] + cmd[2:]
+
+
+async def run_with_messages(
+    context, cmd, message_callback, *, stderr_callback=None, **other_kwargs
+):
+    """
+    Run a cargo command which emits JSON messages on stdout.
+
+    Each JSON message is passed to the callback, while all other output is
+    posted as `StdoutLine` and `StderrLine` events like `colcon_core.task.run`
+    does.
+    Diagnostics which cargo didn't render itself are posted as `StderrLine`
+    events.
+
+    :param context: The task context
+    :param list cmd: The command and its arguments
+    :param message_callback: The callable invoked with every decoded message
+    :param stderr_callback: The callable additionally invoked with every
+      line of stderr
+    :returns: the result of the completed process
+    :rtype: subprocess.CompletedProcess
+    """
+    def stdout_callback(line):
+        message = parse_message(line)
+        if message is None:
+            context.put_event_into_queue(StdoutLine(line))
+            return
+        message_callback(message)
+        if message['reason'] == 'compiler-message':
+            rendered = message.get('message', {}).get('rendered')
+            if rendered:
+                context.put_event_into_queue(StderrLine(rendered.encode()))
+
+    def post_stderr_line(line):
+        if stderr_callback is not None:
+            stderr_callback(line)
+        context.put_event_into_queue(StderrLine(line))
+
+    cwd = other_kwargs.get('cwd', None)
+    env = other_kwargs.get('env', None)
+
+    context.put_event_into_queue(Command(cmd, cwd=cwd, env=env))
+    # a pseudo terminal would interleave stderr with the JSON messages
+    completed = await colcon_core_subprocess_run(
+        cmd, stdout_callback, post_stderr_line, use_pty=False,
+        **other_kwargs)
+    context.put_event_into_queue(
+        CommandEnded(
+            cmd, cwd=cwd, env=env, returncode=completed.returncode))
+    return completed
+
+
+def parse_message(line):
+    """
+    Parse a JSON message emitted by cargo.
+
+    :param line: A line of output
+    :type line: bytes or str
+    :returns: The decoded message, or None if the line isn't a message
+    :rtype: dict
+    """
+    if isinstance(line, bytes):
+        line = line.decode(errors='replace')
+    line = line.strip()
+    if not line.startswith('{'):
+        return None
+    try:
+        message = json.loads(line)
+    except ValueError:
+        return None
+    if not isinstance(message, dict) or 'reason' not in message:
+        return None
+    return message
@@ -0,0 +1,304 @@
+# Copyright 2025 Open Source Robotics Foundation, Inc.
+# Licensed under the Apache License, Version 2.0
+
+from contextlib import ExitStack
+import json
+import os
+from pathlib import Path
+import re
+import shutil
+import time
+
+from colcon_core.logging import colcon_logger
+
+logger = colcon_logger.getChild(__name__)
+
+# The file in a target directory recording the units used by its last build
+REFERENCES_FILE = 'colcon_cargo_gc.json'
+
+# The subdirectories of a profile directory containing per unit artifacts
+UNIT_DIRECTORIES = ('.fingerprint', 'build', 'deps', 'examples', 'incremental')
+
+# Cargo appends the hash of the unit metadata to the artifact names
+UNIT_HASH_PATTERN = re.compile(r'-([0-9a-f]{16})(?=\.|$)')
+
+
+class UnitReferences:
+    """Collect the units of a target directory used by a build."""
+
+    def __init__(self):  # noqa: D107
+        self.files = set()
+        self.hashes = set()
+
+    def add_message(self, message):
+        """
+        Record the artifacts of a cargo JSON message.
+
+        :param dict message: The decoded message
+        """
+        reason = message.get('reason')
+        if reason == 'compiler-artifact':
+            self.files.update(message.get('filenames') or ())
+            if message.get('executable'):
+                self.files.add(message['executable'])
+        elif reason == 'build-script-executed':
+            if message.get('out_dir'):
+                # the out directory is located inside of the unit directory
+                self.files.add(os.path.dirname(message['out_dir']))
+
+    def resolve(self, target_dir):
+        """
+        Determine the hashes of all referenced units.
+
+        Artifacts which cargo copied or linked out of the `deps` directory
+        don't contain the unit hash in their name, so the hash is taken from
+        the file in `deps` they share their inode with.
+
+        :param target_dir: The target directory
+        """
+        self.hashes.update(_get_unit_hash(name) for name in self.files)
+        self.hashes.discard(None)
+
+        inodes = {}
+        for profile_dir in find_profile_directories(target_dir):
+            for path in profile_dir.glob('deps/*'):
+                try:
+                    inodes[_get_inode(path)] = path.name
+                except OSError:
+                    pass
+        for name in self.files:
+            if _get_unit_hash(name) is not None:
+                continue
+            try:
+                deps_name = inodes.get(_get_inode(Path(name)))
+            except OSError:
+                continue
+            if deps_name is not None:
+                self.hashes.add(_get_unit_hash(deps_name))
+        self.hashes.discard(None)
+
+    def save(self, target_dir):
+        """
+        Persist the referenced unit hashes in the target directory.
+
+        :param target_dir: The target directory
+        """
+        (Path(target_dir) / REFERENCES_FILE).write_text(
+            json.dumps(sorted(self.hashes)))
+
+
+def collect_garbage(
+    target_dir, references, *, min_age=0, max_size=None,
+    other_target_dirs=(),
+):
+    """
+    Remove unused units from target directories.
+
+    Units which aren't referenced and haven't been modified for at least the
+    minimum age are removed.
+    If the total size still exceeds the maximum, the remaining unreferenced
+    units are removed in least recently used order.
+
+    :param target_dir: The target directory of the current build
+    :param references: The `UnitReferences` of the current build
+    :param float min_age: The minimum age in seconds of units to remove
+    :param int max_size: The maximum total size in bytes of all target
+      directories
+    :param other_target_dirs: Additional target directories which count
+      towards the maximum size, using the references saved by their last
+      build
+    :returns: The number of bytes removed
+    :rtype: int
+    """
+    with ExitStack() as locks:
+        return _collect_garbage(
+            target_dir, references, min_age, max_size, other_target_dirs,
+            locks)
+
+
+def _collect_garbage(
+    target_dir, references, min_age, max_size, other_target_dirs, locks,
+):
+    units = _get_units(
+        find_profile_directories(target_dir), references.hashes)
+    for other_target_dir in other_target_dirs:
+        # the locks are held until the units have been removed, so that
+        # cargo can't start using the target directory in the meantime
+        profile_dirs = _lock_profile_directories(other_target_dir, locks)
+        if profile_dirs is None:
+            # another build is currently using the target directory
+            continue
+        try:
+            other_hashes = set(json.loads(
+                (Path(other_target_dir) / REFERENCES_FILE).read_text()))
+        except (OSError, ValueError):
+            # without knowing its references only the size cap applies
+            other_hashes = None
+        units += _get_units(profile_dirs, other_hashes)
+
+    now = time.time()
+    removed = 0
+    remaining = []
+    for unit in units:
+        if unit.referenced is False and now - unit.mtime >= min_age:
+            removed += unit.remove()
+        else:
+            remaining.append(unit)
+
+    if max_size is not None:
+        total_size = sum(unit.size for unit in remaining)
+        for unit in sorted(remaining, key=lambda u: u.mtime):
+            if total_size <= max_size:
+                break
+            if unit.referenced:
+                continue
+            removed += unit.remove()
+            total_size -= unit.size
+        if total_size > max_size:
+            logger.warning(
+                f"The target directory '{target_dir}' exceeds the size limit "
+                'with artifacts used by the current build')
+    return removed
+
+
+def find_target_directories(build_base):
+    """
+    Find the cargo target directories next to a build base.
+
+    :param build_base: The build base of a package
+    :returns: The target directories of all other packages
+    :rtype: list
+    """
+    build_base = Path(build_base)
+    return [
+        path for path in build_base.parent.iterdir()
+        if path != build_base and (path / 'CACHEDIR.TAG').is_file()
+    ] if build_base.parent.is_dir() else []
+
+
+def find_profile_directories(target_dir):
+    """
+    Find the profile directories of a target directory.
+
+    Profile directories are either located directly in the target directory
+    or, when cross compiling, in a directory named after the target triple.
+
+    :param target_dir: The target directory
+    :returns: The profile directories
+    :rtype: list
+    """
+    target_dir = Path(target_dir)
+    return sorted(
+        path.parent
+        for pattern in ('*/.fingerprint', '*/*/.fingerprint')
+        for path in target_dir.glob(pattern))
+
+
+class _Unit:
+
+    def __init__(self, referenced):
+        self.paths = []
+        self.referenced = referenced
+        self.mtime = 0
+        self.size = 0
+
+    def add(self, path):
+        self.paths.append(path)
+        self.mtime = max(self.mtime, _get_mtime(path))
+        self.size += _get_size(path)
+
+    def remove(self):
+        for path in self.paths:
+            if path.is_dir() and not path.is_symlink():
+                shutil.rmtree(str(path), ignore_errors=True)
+            else:
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+        return self.size
+
+
+def _get_units(profile_dirs, hashes):
+    units = []
+    for profile_dir in profile_dirs:
+        by_hash = {}
+        for subdirectory in UNIT_DIRECTORIES:
+            for path in (profile_dir / subdirectory).glob('*'):
+                unit_hash = _get_unit_hash(path.name)
+                if unit_hash is None:
+                    # e.g. incremental compilation sessions, which are named
+                    # differently and are only ever evicted by the size cap
+                    unit = _Unit(None)
+                    unit.add(path)
+                    units.append(unit)
+                    continue
+                if unit_hash not in by_hash:
+                    referenced = None if hashes is None \
+                        else unit_hash in hashes
+                    by_hash[unit_hash] = _Unit(referenced)
+                by_hash[unit_hash].add(path)
+        units += by_hash.values()
+    return units
+
+
+def _get_unit_hash(name):
+    match = UNIT_HASH_PATTERN.search(os.path.basename(name))
+    return match.group(1) if match else None
+
+
+def _get_inode(path):
+    stat = path.stat()
+    return stat.st_dev, stat.st_ino
+
+
+def _get_mtime(path):
+    mtime = 0
+    try:
+        mtime = path.lstat().st_mtime
+        if path.is_dir() and not path.is_symlink():
+            for child in path.iterdir():
+                mtime = max(mtime, child.lstat().st_mtime)
+    except OSError:
+        pass
+    return mtime
+
+
+def _get_size(path):
+    try:
+        if not path.is_dir() or path.is_symlink():
+            return path.lstat().st_size
+    except OSError:
+        return 0
+    size = 0
+    for dirpath, _, filenames in os.walk(str(path)):
+        for filename in filenames:
+            try:
+                size += os.lstat(os.path.join(dirpath, filename)).st_size
+            except OSError:
+                pass
+    return size
+
+
+def _lock_profile_directories(target_dir, locks):
+    # lock the build directories the way cargo does, returning None if any
+    # of them is locked by another process
+    profile_dirs = find_profile_directories(target_dir)
+    try:
+        import fcntl
+    except ImportError:
+        return profile_dirs
+    with ExitStack() as stack:
+        for profile_dir in profile_dirs:
+            try:
+                f = stack.enter_context(
+                    (profile_dir / '.cargo-lock').open('a'))
+            except OSError:
+                continue
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                return None
+        # closing the files releases the locks
+        locks.enter_context(stack.pop_all())
+    return profile_dirs
@@ -0,0 +1,228 @@
+# Copyright 2025 Open Source Robotics Foundation, Inc.
+# Licensed under the Apache License, Version 2.0
+
+import errno
+import hashlib
+import os
+from pathlib import Path
+import shutil
+
+from colcon_cargo.task.cargo.target_gc import find_profile_directories
+from colcon_core.logging import colcon_logger
+
+logger = colcon_logger.getChild(__name__)
+
+# The file in the build directory containing the path of a target directory
+# staged in memory
+TARGET_DIR_MARKER = 'cargo_target_dir'
+
+# The directory in the build directory the fingerprints of a staged target
+# directory are synced to
+SNAPSHOT_DIRECTORY_NAME = 'cargo_target_snapshot'
+
+# The output of cargo, rustc and the linker when a file system is full
+NO_SPACE_MESSAGES = (
+    'No space left on device', f'(os error {errno.ENOSPC})')
+
+
+def get_staging_directory(root, build_base):
+    """
+    Get the staged target directory of a package.
+
+    The directory is stable for a build directory, so incremental builds can
+    reuse it as long as the file system keeps its content.
+
+    :param root: The directory on the memory backed file system, e.g.
+      `/dev/shm`
+    :param build_base: The build directory of the package
+    :returns: The target directory
+    :rtype: Path
+    """
+    digest = hashlib.sha256(
+        os.path.realpath(str(build_base)).encode()).hexdigest()[:16]
+    return Path(root) / f'colcon-cargo-{_get_user()}' / \
+        f'{Path(build_base).name}-{digest}'
+
+
+def create_staging_directory(path):
+    """
+    Create a staged target directory.
+
+    The parent directory, which is shared by all packages of the user, is
+    only accessible by the user since the file system is usually shared.
+
+    :param path: The target directory
+    :returns: True if the directory can be used
+    :rtype: bool
+    """
+    path = Path(path)
+    try:
+        path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+        if hasattr(os, 'getuid') and \
+                path.parent.stat().st_uid != os.getuid():
+            logger.warning(
+                f"The directory '{path.parent}' is owned by another user")
+            return False
+        path.mkdir(exist_ok=True)
+    except OSError as e:
+        logger.warning(f"Failed to create '{path}': {e}")
+        return False
+    return True
+
+
+def has_capacity(path, min_free):
+    """
+    Check if a file system has enough free space.
+
+    :param path: A path on the file system, which doesn't need to exist
+    :param int min_free: The minimum free space in bytes
+    :rtype: bool
+    """
+    path = Path(path)
+    while not path.exists() and path.parent != path:
+        path = path.parent
+    try:
+        return shutil.disk_usage(str(path)).free >= min_free
+    except OSError:
+        return False
+
+
+def write_marker(build_base, target_dir):
+    """
+    Record the target directory used for a build directory.
+
+    :param build_base: The build directory
+    :param target_dir: The target directory, or None to remove the marker
+    """
+    marker = Path(build_base) / TARGET_DIR_MARKER
+    if target_dir is None:
+        if marker.exists():
+            marker.unlink()
+        return
+    marker.parent.mkdir(parents=True, exist_ok=True)
+    marker.write_text(str(target_dir))
+
+
+def get_target_dir(build_base):
+    """
+    Get the target directory used for a build directory.
+
+    :param build_base: The build directory
+    :returns: The staged target directory if it still exists, otherwise the
+      build directory
+    :rtype: str
+    """
+    try:
+        target_dir = (Path(build_base) / TARGET_DIR_MARKER).read_text()
+    except OSError:
+        return str(build_base)
+    if not os.path.isdir(target_dir):
+        return str(build_base)
+    return target_dir
+
+
+def sync_snapshot(target_dir, build_base):
+    """
+    Sync the fingerprints of a staged target directory to the build directory.
+
+    The snapshot mirrors the `.fingerprint` directories of all profiles,
+    which record which units have been built and from which inputs, while
+    omitting the much larger intermediate artifacts.
+    It is informational only, e.g. to inspect why a unit was rebuilt after
+    the staged target directory was lost: without the artifacts cargo
+    rebuilds all units anyway, so it isn't used to seed a new staged target
+    directory.
+
+    :param target_dir: The staged target directory
+    :param build_base: The build directory
+    :returns: The number of copied files
+    :rtype: int
+    """
+    target_dir = Path(target_dir)
+    snapshot = Path(build_base) / SNAPSHOT_DIRECTORY_NAME
+    copied = 0
+    expected = set()
+    for profile_dir in find_profile_directories(target_dir):
+        source = profile_dir / '.fingerprint'
+        destination = snapshot / profile_dir.relative_to(target_dir) / \
+            '.fingerprint'
+        expected.add(destination)
+        copied += _sync_directory(source, destination)
+    if snapshot.is_dir():
+        # remove profiles which don't exist anymore
+        for path in sorted(snapshot.glob('**/.fingerprint')):
+            if path not in expected:
+                shutil.rmtree(str(path), ignore_errors=True)
+    return copied
+
+
+class SpaceExhaustion:
+    """Detect in the output of cargo if a file system ran out of space."""
+
+    def __init__(self):  # noqa: D107
+        self.detected = False
+
+    def add_line(self, line):
+        """
+        Process a line of output.
+
+        :param line: The line
+        :type line: bytes or str
+        """
+        if isinstance(line, bytes):
+            line = line.decode(errors='replace')
+        if any(message in line for message in NO_SPACE_MESSAGES):
+            self.detected = True
+
+    def add_message(self, message):
+        """
+        Process a JSON message emitted by cargo.
+
+        :param dict message: The message
+        """
+        if message.get('reason') == 'compiler-message':
+            self.add_line(message.get('message', {}).get('rendered') or '')
+
+
+def _sync_directory(source, destination):
+    copied = 0
+    present = set()
+    for dirpath, _, filenames in os.walk(str(source)):
+        relpath = os.path.relpath(dirpath, str(source))
+        dst_dir = destination / relpath
+        dst_dir.mkdir(parents=True, exist_ok=True)
+        present.add(os.path.normpath(relpath))
+        for filename in filenames:
+            src = os.path.join(dirpath, filename)
+            dst = dst_dir / filename
+            present.add(os.path.normpath(os.path.join(relpath, filename)))
+            src_stat = os.stat(src)
+            try:
+                dst_stat = dst.stat()
+            except OSError:
+                dst_stat = None
+            if dst_stat is not None and \
+                    dst_stat.st_size == src_stat.st_size and \
+                    dst_stat.st_mtime_ns == src_stat.st_mtime_ns:
+                continue
+            shutil.copy2(src, str(dst))
+            copied += 1
+    # remove the fingerprints of units which don't exist anymore
+    for dirpath, dirnames, filenames in os.walk(
+        str(destination), topdown=False
+    ):
+        relpath = os.path.relpath(dirpath, str(destination))
+        for filename in filenames:
+            if os.path.normpath(os.path.join(relpath, filename)) not in \
+                    present:
+                os.unlink(os.path.join(dirpath, filename))
+        if os.path.normpath(relpath) not in present:
+            shutil.rmtree(dirpath, ignore_errors=True)
+    return copied
+
+
+def _get_user():
+    if hasattr(os, 'getuid'):
+        return str(os.getuid())
+    import getpass
+    return getpass.getuser()
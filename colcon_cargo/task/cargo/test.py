@@ -1,20 +1,45 @@
 # Copyright 2018 Easymov Robotics
 # Licensed under the Apache License, Version 2.0
 
+import asyncio
+import hashlib
 import os
-from xml.dom import minidom
-import xml.etree.ElementTree as eTree
+from typing import TYPE_CHECKING
 
-from colcon_cargo.task.cargo import CARGO_EXECUTABLE
+from colcon_cargo.event_log import count_test_results
+from colcon_cargo.event_log import get_event_log
+from colcon_cargo.event_log import log_event
+from colcon_cargo.event_log import logged_command
+from colcon_cargo.event_log import logged_task
+from colcon_cargo.profiling import profile_section
+from colcon_cargo.profiling import profiled
+from colcon_cargo.task.cargo import get_cache_path
+from colcon_cargo.task.cargo import get_cargo_executable
+from colcon_cargo.task.cargo.artifact_cache import get_cache_key
+from colcon_cargo.task.cargo.bench import find_regressions
+from colcon_cargo.task.cargo.bench import load_results
+from colcon_cargo.task.cargo.bench import parse_bench_output
+from colcon_cargo.task.cargo.bench import save_results
+from colcon_cargo.task.cargo.command_environment \
+    import get_cached_command_environment
+from colcon_cargo.task.cargo.message import add_message_format
+from colcon_cargo.task.cargo.message import run_with_messages
+from colcon_cargo.task.cargo.target_tmpfs import get_target_dir
+from colcon_cargo.task.cargo.thread_budget import share_test_threads
 from colcon_core.event.test import TestFailure
 from colcon_core.logging import colcon_logger
 from colcon_core.plugin_system import satisfies_version
-from colcon_core.shell import get_command_environment
 from colcon_core.task import run
 from colcon_core.task import TaskExtensionPoint
 
+if TYPE_CHECKING:
+    import xml.etree.ElementTree as eTree
+
 logger = colcon_logger.getChild(__name__)
 
+# The names of the files configuring the lints of clippy
+CLIPPY_CONFIGURATION_FILES = ('clippy.toml', '.clippy.toml')
+
 
 class CargoTestTask(TaskExtensionPoint):
     """Test Cargo packages."""
@@ -22,6 +47,7 @@ class CargoTestTask(TaskExtensionPoint):
     def __init__(self):  # noqa: D107
         super().__init__()
         satisfies_version(TaskExtensionPoint.EXTENSION_POINT_VERSION, '^1.0')
+        self.toolchain = None
 
     def add_arguments(self, *, parser):  # noqa: D102
         parser.add_argument(
@@ -30,7 +56,43 @@ class CargoTestTask(TaskExtensionPoint):
             help='Pass arguments to Cargo projects. '
             'Arguments matching other options must be prefixed by a space,\n'
             'e.g. --cargo-args " --help"')
+        parser.add_argument(
+            '--cargo-bench',
+            action='store_true',
+            help='Also run the benchmarks using `cargo bench` and report '
+            'regressions compared to a baseline as test failures')
+        parser.add_argument(
+            '--cargo-bench-baseline',
+            metavar='PATH',
+            help='The file containing the baseline timings, which is created '
+            'from the first run if it does not exist (default: '
+            'cargo_bench_baseline.json in the build directory)')
+        parser.add_argument(
+            '--cargo-bench-threshold',
+            type=float, default=10, metavar='PERCENT',
+            help='The slowdown of a benchmark compared to the baseline which '
+            'is considered a regression (default: 10)')
+        parser.add_argument(
+            '--cargo-bench-update-baseline',
+            action='store_true',
+            help='Replace the baseline with the timings of this run')
+        parser.add_argument(
+            '--cargo-test-threads',
+            type=int, metavar='N',
+            help='Divide this number of test threads among the packages '
+            'tested concurrently, unless RUST_TEST_THREADS is set. A package '
+            'gets an equal share among the running packages of the threads '
+            'not used by them, at least one, fixed when its tests start '
+            '(default: the test harness uses all CPUs)')
+        parser.add_argument(
+            '--cargo-clippy',
+            action='store_true',
+            help='Also lint the package using `cargo clippy`, reporting each '
+            'lint as a failed test. Clean results are cached until the '
+            'sources change')
 
+    @profiled('test')
+    @logged_task('test')
     async def test(self, *, additional_hooks=None):  # noqa: D102
         """
         Runs tests and style checks for the requested package.
@@ -55,38 +117,71 @@ class CargoTestTask(TaskExtensionPoint):
         test_results_path = os.path.join(args.build_base, 'cargo_test.xml')
 
         try:
-            env = await get_command_environment(
-                'test', args.build_base, self.context.dependencies)
+            with profile_section('test.environment'):
+                env = await get_cached_command_environment(
+                    'test', args.build_base, self.context.dependencies)
         except RuntimeError as e:
             # TODO(luca) log this as error in the test result file
             logger.error(str(e))
             return 1
 
-        if CARGO_EXECUTABLE is None:
+        if _get_cargo_executable() is None:
             raise RuntimeError("Could not find 'cargo' executable")
 
+        # the module is only imported once a package is actually tested
+        from colcon_cargo.task.cargo import toolchain
+        with profile_section('test.toolchain'):
+            self.toolchain = await toolchain.try_get_toolchain_async(
+                cargo_executable=_get_cargo_executable(), env=env,
+                cwd=args.path)
+
         cargo_args = args.cargo_args
         if cargo_args is None:
             cargo_args = []
+        # use the same configuration as the build to reuse its artifacts
+        cargo_args = toolchain.load_fast_link_args(args.build_base) + \
+            cargo_args
 
         # invoke cargo test
-        unit_rc = await run(
-            self.context,
-            self._test_cmd(cargo_args),
-            cwd=args.path, env=env, capture_output=True)
-
-        fmt_rc = await run(
-            self.context,
-            self._fmt_cmd(),
-            cwd=args.path, env=env, capture_output=True)
-
-        error_report = self._create_error_report(unit_rc, fmt_rc)
-        with open(test_results_path, 'wb') as result_file:
-            xmlstr = minidom.parseString(eTree.tostring(error_report))
-            xmlstr = xmlstr.toprettyxml(indent='    ', encoding='utf-8')
-            result_file.write(xmlstr)
-
-        if unit_rc.returncode or fmt_rc.returncode:
+        with profile_section('test.cargo'):
+            unit_rc = await self._test(cargo_args, env)
+        if get_event_log() is not None:
+            log_event('tests', package=pkg.name, **count_test_results(
+                unit_rc.stdout.decode('utf-8', 'replace')
+                if unit_rc.stdout else ''))
+
+        # fmt doesn't use the target directory, so clippy can run at the
+        # same time without waiting for the lock of cargo
+        fmt = self._fmt(env)
+        clippy = None
+        if getattr(args, 'cargo_clippy', False):
+            fmt_rc, clippy = await asyncio.gather(
+                fmt, self._clippy(cargo_args, env))
+        else:
+            fmt_rc = await fmt
+
+        bench = None
+        if getattr(args, 'cargo_bench', False):
+            bench = await self._bench(cargo_args, env)
+
+        with profile_section('test.report'):
+            # the XML modules are only imported when a report is actually
+            # written
+            from xml.dom import minidom
+            import xml.etree.ElementTree as eTree
+
+            error_report = self._create_error_report(
+                unit_rc, fmt_rc, bench=bench, clippy=clippy)
+            with open(test_results_path, 'wb') as result_file:
+                xmlstr = minidom.parseString(eTree.tostring(error_report))
+                xmlstr = xmlstr.toprettyxml(indent='    ', encoding='utf-8')
+                result_file.write(xmlstr)
+
+        if unit_rc.returncode or fmt_rc.returncode or (
+            bench is not None and (bench.rc.returncode or bench.regressions)
+        ) or (
+            clippy is not None and (clippy.returncode or clippy.lints)
+        ):
             self.context.put_event_into_queue(TestFailure(pkg.name))
             # the return code should still be 0
         return 0
@@ -95,21 +190,165 @@ class CargoTestTask(TaskExtensionPoint):
         args = self.context.args
         pkg = self.context.pkg
         return [
-            CARGO_EXECUTABLE,
+            _get_cargo_executable(),
             'test',
             '--quiet',
             '--package', pkg.name,
-            '--target-dir', args.build_base,
+            '--target-dir', get_target_dir(args.build_base),
         ] + cargo_args + [
             '--',
             '--color=never',
         ]
 
+    async def _test(self, cargo_args, env):
+        args = self.context.args
+        pkg = self.context.pkg
+        cmd = self._test_cmd(cargo_args)
+        budget = getattr(args, 'cargo_test_threads', None)
+        if not budget or 'RUST_TEST_THREADS' in env:
+            return await logged_command(pkg.name, cmd, run(
+                self.context, cmd,
+                cwd=args.path, env=env, capture_output=True))
+
+        # the share is determined when the job starts, since the harness
+        # can't change the number of threads while it is running
+        with share_test_threads(budget) as threads:
+            logger.debug(f"Testing '{pkg.name}' with {threads} threads")
+            return await logged_command(pkg.name, cmd, run(
+                self.context, cmd + [f'--test-threads={threads}'],
+                cwd=args.path, env=dict(env, RUST_TEST_THREADS=str(threads)),
+                capture_output=True))
+
+    def _bench_cmd(self, cargo_args):
+        args = self.context.args
+        pkg = self.context.pkg
+        return [
+            _get_cargo_executable(),
+            'bench',
+            '--package', pkg.name,
+            '--target-dir', get_target_dir(args.build_base),
+        ] + cargo_args
+
+    @profiled('test.bench')
+    async def _bench(self, cargo_args, env):
+        args = self.context.args
+        cmd = self._bench_cmd(cargo_args)
+        rc = await logged_command(self.context.pkg.name, cmd, run(
+            self.context, cmd,
+            cwd=args.path, env=env, capture_output=True))
+        results = parse_bench_output(rc.stdout.decode('utf-8'))
+        save_results(
+            os.path.join(args.build_base, 'cargo_bench.json'), results)
+
+        baseline_path = getattr(args, 'cargo_bench_baseline', None) or \
+            os.path.join(args.build_base, 'cargo_bench_baseline.json')
+        baseline = load_results(baseline_path)
+        regressions = {}
+        if baseline is not None:
+            threshold = getattr(args, 'cargo_bench_threshold', None)
+            if threshold is None:
+                threshold = 10
+            regressions = find_regressions(
+                results, baseline, threshold / 100)
+        if rc.returncode == 0 and (
+            baseline is None or
+            getattr(args, 'cargo_bench_update_baseline', False)
+        ):
+            save_results(baseline_path, results)
+        return _BenchResult(rc, results, regressions)
+
+    def _clippy_cmd(self, cargo_args):
+        args = self.context.args
+        pkg = self.context.pkg
+        return [
+            _get_cargo_executable(),
+            'clippy',
+            '--package', pkg.name,
+            '--target-dir', get_target_dir(args.build_base),
+        ] + cargo_args
+
+    @profiled('test.clippy')
+    async def _clippy(self, cargo_args, env):
+        args = self.context.args
+        marker = None
+        if self.toolchain is not None:
+            from colcon_cargo.task.cargo.toolchain \
+                import get_toolchain_fingerprint
+            cache_key = get_cache_key(
+                self.context.pkg,
+                cargo_args=cargo_args,
+                toolchain_fingerprint=get_toolchain_fingerprint(
+                    self.toolchain),
+                dependencies=self.context.dependencies,
+                env=env,
+                # the configuration of the lints can be located outside of
+                # the sources, e.g. in the parent directory of a workspace
+                variant=[
+                    'clippy', env.get('CLIPPY_CONF_DIR'),
+                    _read_clippy_configuration(args.path, env)])
+            # a single marker per package keeps the cache bounded
+            marker = _get_clippy_marker(self.context.pkg, args.path)
+            try:
+                clean = marker.read_text() == cache_key
+            except OSError:
+                clean = False
+            if clean:
+                logger.info(
+                    f"Skipping clippy for unchanged '{self.context.pkg.name}'")
+                return _ClippyResult(0, {}, '', cached=True)
+
+        lints = {}
+        manifest_path = os.path.realpath(os.path.join(args.path, 'Cargo.toml'))
+
+        def message_callback(message):
+            if message.get('reason') != 'compiler-message':
+                return
+            # only report the lints of clippy in the sources of this package
+            # rather than those of rustc or of its path dependencies
+            if message.get('manifest_path') and os.path.realpath(
+                message['manifest_path']
+            ) != manifest_path:
+                return
+            diagnostic = message.get('message', {})
+            code = (diagnostic.get('code') or {}).get('code')
+            if not code or not code.startswith('clippy::'):
+                return
+            location = ''
+            for span in diagnostic.get('spans', []):
+                if span.get('is_primary'):
+                    location = f":{span['file_name']}:{span['line_start']}"
+                    break
+            lints[f'clippy/{code}{location}'] = \
+                diagnostic.get('rendered') or diagnostic.get('message', '')
+
+        cmd = self._clippy_cmd(cargo_args)
+        rc = await logged_command(
+            self.context.pkg.name, cmd, run_with_messages(
+                self.context,
+                add_message_format(cmd, 'json'),
+                message_callback,
+                cwd=args.path, env=env, capture_output=True))
+        stderr = rc.stderr.decode('utf-8') if rc.stderr else ''
+        if marker is not None and not rc.returncode and not lints:
+            marker.parent.mkdir(parents=True, exist_ok=True)
+            marker.write_text(cache_key)
+        return _ClippyResult(rc.returncode, lints, stderr)
+
     # Ignore cargo args for rustfmt
+    async def _fmt(self, env):
+        fmt_cmd = self._fmt_cmd()
+        with profile_section('test.fmt'):
+            return await logged_command(
+                self.context.pkg.name, fmt_cmd, run(
+                    self.context,
+                    fmt_cmd,
+                    cwd=self.context.args.path, env=env,
+                    capture_output=True))
+
     def _fmt_cmd(self):
         pkg = self.context.pkg
         return [
-            CARGO_EXECUTABLE,
+            _get_cargo_executable(),
             'fmt',
             '--check',
             '--package', pkg.name,
@@ -117,7 +356,11 @@ class CargoTestTask(TaskExtensionPoint):
             '--color=never',
         ]
 
-    def _create_error_report(self, unit_rc, fmt_rc) -> eTree.Element:
+    def _create_error_report(
+        self, unit_rc, fmt_rc, *, bench=None, clippy=None
+    ) -> 'eTree.Element':
+        import xml.etree.ElementTree as eTree
+
         # TODO(luca) revisit when programmatic output from cargo test is
         # stabilized, for now just have a suite for unit, and fmt tests
         failures = 0
@@ -138,8 +381,110 @@ class CargoTestTask(TaskExtensionPoint):
                                            {'message': 'cargo fmt failed'})
             fmt_failure.text = fmt_rc.stdout.decode('utf-8')
             failures += 1
+        tests = 2
+        if bench is not None:
+            bench_testcase = eTree.SubElement(
+                testsuite, 'testcase', {'name': 'bench'})
+            tests += 1
+            if bench.rc.returncode:
+                bench_failure = eTree.SubElement(
+                    bench_testcase, 'failure',
+                    {'message': 'cargo bench failed'})
+                bench_failure.text = bench.rc.stderr.decode('utf-8')
+                failures += 1
+            # one testcase per benchmark to track regressions individually
+            for name, value in sorted(bench.results.items()):
+                testcase = eTree.SubElement(
+                    testsuite, 'testcase',
+                    {'name': f'bench/{name}', 'time': str(value / 1e9)})
+                tests += 1
+                if name in bench.regressions:
+                    reference, value = bench.regressions[name]
+                    eTree.SubElement(testcase, 'failure', {
+                        'message':
+                            f'{value:.1f} ns/iter is slower than the '
+                            f'baseline of {reference:.1f} ns/iter',
+                    })
+                    failures += 1
+        if clippy is not None:
+            clippy_testcase = eTree.SubElement(
+                testsuite, 'testcase', {'name': 'clippy'})
+            tests += 1
+            if clippy.returncode:
+                clippy_failure = eTree.SubElement(
+                    clippy_testcase, 'failure',
+                    {'message': 'cargo clippy failed'})
+                clippy_failure.text = clippy.stderr
+                failures += 1
+            # one testcase per lint so that they can be tracked individually
+            for name, rendered in sorted(clippy.lints.items()):
+                testcase = eTree.SubElement(
+                    testsuite, 'testcase', {'name': name})
+                lint_failure = eTree.SubElement(
+                    testcase, 'failure', {'message': rendered.split('\n')[0]})
+                lint_failure.text = rendered
+                tests += 1
+                failures += 1
         testsuite.attrib['errors'] = str(0)
         testsuite.attrib['failures'] = str(failures)
         testsuite.attrib['skipped'] = str(0)
-        testsuite.attrib['tests'] = str(2)
+        testsuite.attrib['tests'] = str(tests)
         return testsuites
+
+
+class _BenchResult:
+
+    def __init__(self, rc, results, regressions):
+        self.rc = rc
+        self.results = results
+        self.regressions = regressions
+
+
+class _ClippyResult:
+
+    def __init__(self, returncode, lints, stderr, *, cached=False):
+        self.returncode = returncode
+        self.lints = lints
+        self.stderr = stderr
+        self.cached = cached
+
+
+def _get_clippy_marker(pkg, path):
+    # the marker contains the cache key of the last clean result
+    digest = hashlib.sha256(
+        os.path.realpath(str(path)).encode()).hexdigest()[:16]
+    return get_cache_path('clippy', f'{pkg.name}-{digest}')
+
+
+def _read_clippy_configuration(path, env):
+    # clippy uses the first configuration file found in the directory of the
+    # package or its parents
+    conf_dir = env.get('CLIPPY_CONF_DIR')
+    path = os.path.abspath(conf_dir or str(path))
+    while True:
+        for name in CLIPPY_CONFIGURATION_FILES:
+            try:
+                with open(os.path.join(path, name), 'r') as f:
+                    return [name, f.read()]
+            except OSError:
+                pass
+        parent = os.path.dirname(path)
+        if conf_dir or parent == path:
+            return None
+        path = parent
+
+
+def _get_cargo_executable():
+    # a value assigned to CARGO_EXECUTABLE of this module, e.g. by packages
+    # extending the task, takes precedence over the lookup
+    try:
+        return globals()['CARGO_EXECUTABLE']
+    except KeyError:
+        return get_cargo_executable()
+
+
+def __getattr__(name):
+    # Resolve CARGO_EXECUTABLE on first access rather than at import time
+    if name == 'CARGO_EXECUTABLE':
+        return get_cargo_executable()
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
@@ -0,0 +1,73 @@
+# Copyright 2025 Open Source Robotics Foundation, Inc.
+# Licensed under the Apache License, Version 2.0
+
+from contextlib import contextmanager
+import os
+import threading
+
+
+class ThreadBudget:
+    """
+    A budget of test threads divided among concurrently running test jobs.
+
+    Without coordination every test harness starts as many threads as there
+    are cores, oversubscribing the machine when packages are tested in
+    parallel.
+    A job is granted an equal share of the budget among the running jobs,
+    limited to the threads which aren't granted to them yet, so a job
+    running on its own gets the whole budget.
+    The share is fixed when the job starts since a test harness can't change
+    the number of its threads while it is running, threads released by a
+    finished job are only granted to jobs starting later on.
+    Each job is granted at least one thread, even if the budget is used up.
+    """
+
+    def __init__(self):  # noqa: D107
+        self._lock = threading.Lock()
+        self._active = 0
+        self._granted = 0
+
+    @property
+    def active(self):
+        """The number of currently running test jobs."""
+        with self._lock:
+            return self._active
+
+    @contextmanager
+    def share(self, budget=None):
+        """
+        Register a running test job for the duration of the context.
+
+        :param int budget: The total number of test threads, defaults to the
+          number of CPUs
+        :returns: The number of test threads the job should use, at least 1
+        :rtype: int
+        """
+        if not budget:
+            budget = os.cpu_count() or 1
+        with self._lock:
+            self._active += 1
+            threads = max(1, min(
+                budget - self._granted, budget // self._active))
+            self._granted += threads
+        try:
+            yield threads
+        finally:
+            with self._lock:
+                self._active -= 1
+                self._granted -= threads
+
+
+# The budget shared by all test tasks of this process
+_budget = ThreadBudget()
+
+
+def share_test_threads(budget=None):
+    """
+    Register a running test job with the budget of the process.
+
+    :param int budget: The total number of test threads, defaults to the
+      number of CPUs
+    :returns: A context manager yielding the number of test threads
+    """
+    return _budget.share(budget)
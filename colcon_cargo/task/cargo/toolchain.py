@@ -0,0 +1,455 @@
+# Copyright 2025 Open Source Robotics Foundation, Inc.
+# Licensed under the Apache License, Version 2.0
+
+import asyncio
+import functools
+import hashlib
+import json
+import os
+from pathlib import Path
+import re
+import shutil
+import subprocess
+import threading
+
+from colcon_cargo.package_identification.cargo import read_cargo_toml
+from colcon_cargo.task.cargo import get_cache_path
+from colcon_cargo.task.cargo import get_cargo_executable
+from colcon_cargo.task.cargo import RUSTC_COMMAND_ENVIRONMENT_VARIABLE
+from colcon_core.logging import colcon_logger
+
+logger = colcon_logger.getChild(__name__)
+
+# Environment variables which select a different toolchain without changing
+# the executables themselves, e.g. when they are rustup proxies
+TOOLCHAIN_ENVIRONMENT_VARIABLES = ('RUSTUP_TOOLCHAIN', 'RUSTUP_HOME')
+
+# The files overriding the toolchain of a directory and its subdirectories
+TOOLCHAIN_FILES = ('rust-toolchain', 'rust-toolchain.toml')
+
+# The file in the build directory recording the fast link arguments
+FAST_LINK_ARGS_FILE = 'cargo_fast_link_args.json'
+
+# Linkers which are faster than the system default, in order of preference,
+# mapping the executable to the value of `-fuse-ld`
+FAST_LINKERS = (('mold', 'mold'), ('ld.lld', 'lld'))
+
+_toolchains = {}
+_toolchains_lock = threading.Lock()
+
+
+def get_toolchain(
+    *, cargo_executable=None, rustc_executable=None, env=None, cwd=None,
+):
+    """
+    Get information about the Rust toolchain.
+
+    The information contains the versions of cargo and rustc, the host
+    triple, the sysroot and the configuration reported by
+    `rustc --print cfg`.
+    Since the executables are commonly rustup proxies, which select the
+    toolchain based on its settings and on `rust-toolchain` files, the
+    information is cached on disk keyed by the output of `rustc -vV`.
+    In memory it is cached for the lifetime of the process, keyed by the
+    executables, the rustup settings and the nearest `rust-toolchain` file.
+
+    :param str cargo_executable: The path of the cargo executable, by
+      default the one returned by `get_cargo_executable()`
+    :param str rustc_executable: The path of the rustc executable, by default
+      the one in the `RUSTC` variable or on the `PATH` of the environment
+    :param env: The environment to invoke the executables in
+    :param cwd: The directory to invoke the executables in, usually the path
+      of the package, by default the current working directory
+    :returns: The toolchain information
+    :rtype: dict
+    :raises RuntimeError: if the toolchain couldn't be probed
+    """
+    if env is None:
+        env = os.environ
+    if cwd is None:
+        cwd = os.getcwd()
+    if cargo_executable is None:
+        cargo_executable = get_cargo_executable()
+    if rustc_executable is None:
+        # look up rustc like cargo does in the environment it is invoked in
+        rustc_executable = env.get(
+            RUSTC_COMMAND_ENVIRONMENT_VARIABLE.name) or shutil.which(
+                'rustc', path=env.get('PATH'))
+    if cargo_executable is None:
+        raise RuntimeError("Could not find 'cargo' executable")
+    if rustc_executable is None:
+        raise RuntimeError("Could not find 'rustc' executable")
+
+    identity = _get_identity(cargo_executable, rustc_executable, env)
+    memo_key = json.dumps(
+        [identity, _get_selection(env, cwd)], default=str)
+    toolchain = _toolchains.get(memo_key)
+    if toolchain is not None:
+        return toolchain
+
+    # concurrent tasks probe in executor threads, only the first of them
+    # needs to invoke the executables
+    with _toolchains_lock:
+        toolchain = _toolchains.get(memo_key)
+        if toolchain is not None:
+            return toolchain
+
+        verbose_version = _check_output([rustc_executable, '-vV'], env, cwd)
+        key = hashlib.sha256(
+            json.dumps([identity, verbose_version]).encode()).hexdigest()
+        cache_file = get_cache_path('toolchain', key + '.json')
+        try:
+            toolchain = json.loads(cache_file.read_text())
+        except (OSError, ValueError):
+            toolchain = _probe_toolchain(
+                cargo_executable, rustc_executable, env, cwd,
+                verbose_version)
+            _write_cache_file(cache_file, toolchain)
+
+        _toolchains[memo_key] = toolchain
+    return toolchain
+
+
+def try_get_toolchain(*, cargo_executable=None, env=None, cwd=None):
+    """
+    Get information about the Rust toolchain if it can be probed.
+
+    :param str cargo_executable: The path of the cargo executable
+    :param env: The environment to invoke the executables in
+    :param cwd: The directory to invoke the executables in
+    :returns: The toolchain information, or None if probing failed
+    :rtype: dict
+    """
+    try:
+        return get_toolchain(
+            cargo_executable=cargo_executable, env=env, cwd=cwd)
+    except RuntimeError as e:
+        logger.warning(str(e))
+        return None
+
+
+async def try_get_toolchain_async(
+    *, cargo_executable=None, env=None, cwd=None,
+):
+    """
+    Get information about the Rust toolchain without blocking the event loop.
+
+    The probe runs in the default executor of the event loop, so that other
+    tasks keep running while the executables are invoked.
+
+    :param str cargo_executable: The path of the cargo executable
+    :param env: The environment to invoke the executables in
+    :param cwd: The directory to invoke the executables in
+    :returns: The toolchain information, or None if probing failed
+    :rtype: dict
+    """
+    return await asyncio.get_event_loop().run_in_executor(
+        None, functools.partial(
+            try_get_toolchain, cargo_executable=cargo_executable, env=env,
+            cwd=cwd))
+
+
+def clear_memo():
+    """Forget the toolchains probed by this process."""
+    with _toolchains_lock:
+        _toolchains.clear()
+
+
+def get_toolchain_fingerprint(toolchain):
+    """
+    Get a fingerprint identifying a Rust toolchain.
+
+    :param dict toolchain: The toolchain information returned by
+      `get_toolchain()`
+    :returns: A hex digest
+    :rtype: str
+    """
+    identity = {
+        k: v for k, v in toolchain.items()
+        if k not in ('cargo', 'rustc')}
+    content = json.dumps(identity, sort_keys=True)
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+def get_split_debuginfo(toolchain):
+    """
+    Get the split debuginfo mode which keeps debuginfo out of the linker.
+
+    :param dict toolchain: The toolchain information returned by
+      `get_toolchain()`
+    :returns: The value for the `split-debuginfo` profile setting, or None if
+      the toolchain doesn't support it for its host
+    :rtype: str
+    """
+    host = toolchain.get('host', '')
+    version = _parse_version(toolchain.get('release', ''))
+    if 'apple' in host and version >= (1, 51):
+        return 'unpacked'
+    if 'linux' in host and version >= (1, 65):
+        return 'unpacked'
+    return None
+
+
+def find_fast_linker(toolchain, *, env=None):
+    """
+    Find a linker which is faster than the system default.
+
+    Fast linkers are only selected for Linux hosts, where rustc links through
+    a C compiler which accepts the `-fuse-ld` option.
+
+    :param dict toolchain: The toolchain information returned by
+      `get_toolchain()`
+    :param env: The environment to search the `PATH` of
+    :returns: The value for `-fuse-ld`, or None if no fast linker is
+      available
+    :rtype: str
+    """
+    if 'linux' not in toolchain.get('host', ''):
+        return None
+    path = (env if env is not None else os.environ).get('PATH')
+    for executable, name in FAST_LINKERS:
+        if shutil.which(executable, path=path):
+            return name
+    return None
+
+
+def get_fast_link_args(toolchain, *, env=None, cwd=None):
+    """
+    Get the cargo arguments selecting a fast linker and split debuginfo.
+
+    Since flags for the host target replace the flags configured in
+    `build.rustflags`, those are merged into the flags selecting the linker.
+    The linker isn't selected if the `RUSTFLAGS` or `CARGO_ENCODED_RUSTFLAGS`
+    environment variables are set, which take precedence over any
+    configuration.
+
+    :param dict toolchain: The toolchain information returned by
+      `get_toolchain()`
+    :param env: The environment cargo is invoked in
+    :param cwd: The directory cargo is invoked in, by default the current
+      working directory
+    :returns: The `--config` arguments
+    :rtype: list
+    """
+    if env is None:
+        env = os.environ
+    args = []
+    linker = find_fast_linker(toolchain, env=env)
+    overriding = [
+        name for name in ('CARGO_ENCODED_RUSTFLAGS', 'RUSTFLAGS')
+        if env.get(name)]
+    if linker is not None and overriding:
+        logger.warning(
+            f"Not selecting the '{linker}' linker since the flags in "
+            f"'{overriding[0]}' take precedence, add "
+            f"'-C link-arg=-fuse-ld={linker}' to them instead")
+    elif linker is not None:
+        rustflags = ['-C', f'link-arg=-fuse-ld={linker}']
+        build_rustflags, has_target_rustflags = _get_configured_rustflags(
+            env, os.getcwd() if cwd is None else cwd)
+        if not has_target_rustflags:
+            # otherwise the build flags aren't used anyway and the flags
+            # for the host target are joined with the configured ones
+            rustflags = build_rustflags + rustflags
+        args += [
+            '--config',
+            f"target.{toolchain['host']}.rustflags={json.dumps(rustflags)}"]
+    split_debuginfo = get_split_debuginfo(toolchain)
+    if split_debuginfo is not None:
+        # custom profiles inherit from these
+        for profile in ('dev', 'release'):
+            args += [
+                '--config',
+                f'profile.{profile}.split-debuginfo="{split_debuginfo}"']
+    return args
+
+
+def save_fast_link_args(build_base, args):
+    """
+    Record the fast link arguments used for a build directory.
+
+    Cargo invocations using the same target directory need to pass the same
+    arguments, otherwise they rebuild everything.
+
+    :param build_base: The build directory
+    :param list args: The arguments, or None to remove the record
+    """
+    path = Path(build_base) / FAST_LINK_ARGS_FILE
+    if not args:
+        if path.exists():
+            path.unlink()
+        return
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(args))
+
+
+def load_fast_link_args(build_base):
+    """
+    Get the fast link arguments used for a build directory.
+
+    :param build_base: The build directory
+    :returns: The arguments recorded by the last build
+    :rtype: list
+    """
+    try:
+        args = json.loads((Path(build_base) / FAST_LINK_ARGS_FILE).read_text())
+    except (OSError, ValueError):
+        return []
+    return args if isinstance(args, list) else []
+
+
+def _get_configured_rustflags(env, cwd):
+    # cargo joins arrays from all configuration files, starting with the one
+    # with the lowest precedence
+    build_rustflags = []
+    has_target_rustflags = any(
+        name.startswith('CARGO_TARGET_') and name.endswith('_RUSTFLAGS')
+        for name in env)
+    for config in reversed(_read_cargo_configurations(env, cwd)):
+        value = config.get('build', {}).get('rustflags')
+        if isinstance(value, str):
+            build_rustflags = value.split()
+        elif isinstance(value, list):
+            build_rustflags += value
+        has_target_rustflags |= any(
+            isinstance(table, dict) and 'rustflags' in table
+            for table in config.get('target', {}).values())
+    build_rustflags += env.get('CARGO_BUILD_RUSTFLAGS', '').split()
+    return build_rustflags, has_target_rustflags
+
+
+def _read_cargo_configurations(env, cwd):
+    # the configuration files in order of precedence
+    cargo_home = env.get('CARGO_HOME') or os.path.join(
+        os.path.expanduser('~'), '.cargo')
+    config_dirs = [
+        os.path.join(directory, '.cargo')
+        for directory in _get_parents(os.path.abspath(str(cwd)))
+    ] + [cargo_home]
+    paths = []
+    for config_dir in config_dirs:
+        # cargo prefers the legacy name if both files exist
+        for name in ('config', 'config.toml'):
+            path = os.path.join(config_dir, name)
+            if os.path.isfile(path):
+                if path not in paths:
+                    paths.append(path)
+                break
+    configurations = []
+    for path in paths:
+        try:
+            configurations.append(read_cargo_toml(Path(path)))
+        except (OSError, ValueError) as e:
+            logger.debug(f"Failed to read '{path}': {e}")
+    return configurations
+
+
+def _get_parents(path):
+    while True:
+        yield path
+        parent = os.path.dirname(path)
+        if parent == path:
+            return
+        path = parent
+
+
+def _parse_version(release):
+    match = re.match(r'(\d+)\.(\d+)', release)
+    return tuple(int(n) for n in match.groups()) if match else (0, 0)
+
+
+def _get_identity(cargo_executable, rustc_executable, env):
+    identity = []
+    for executable in (cargo_executable, rustc_executable):
+        path = os.path.realpath(executable)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            raise RuntimeError(
+                f"Could not find executable '{executable}'") from None
+        identity.append((path, stat.st_mtime_ns, stat.st_size))
+    identity += [env.get(name) for name in TOOLCHAIN_ENVIRONMENT_VARIABLES]
+    return identity
+
+
+def _get_selection(env, cwd):
+    # the inputs rustup uses to select the toolchain, which change without
+    # changing the proxy executables, e.g. by `rustup default`
+    rustup_home = env.get('RUSTUP_HOME') or os.path.join(
+        os.path.expanduser('~'), '.rustup')
+    selection = [_get_stat(os.path.join(rustup_home, 'settings.toml'))]
+    path = os.path.abspath(str(cwd))
+    while True:
+        files = [
+            (os.path.join(path, name), _get_stat(os.path.join(path, name)))
+            for name in TOOLCHAIN_FILES]
+        if any(stat is not None for _, stat in files):
+            return selection + files
+        parent = os.path.dirname(path)
+        if parent == path:
+            return selection
+        path = parent
+
+
+def _get_stat(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def _probe_toolchain(
+    cargo_executable, rustc_executable, env, cwd, verbose_version,
+):
+    logger.debug(f"Probing Rust toolchain of '{cargo_executable}'")
+    toolchain = {
+        'cargo': cargo_executable,
+        'rustc': rustc_executable,
+        'cargo_version': _check_output(
+            [cargo_executable, '--version'], env, cwd).strip(),
+    }
+
+    lines = verbose_version.splitlines()
+    toolchain['rustc_version'] = lines[0].strip() if lines else ''
+    for line in lines[1:]:
+        key, sep, value = line.partition(':')
+        if sep:
+            key = key.strip().lower().replace(' ', '_').replace('-', '_')
+            toolchain[key] = value.strip()
+    if 'host' not in toolchain:
+        raise RuntimeError(
+            f"Failed to determine the host triple using '{rustc_executable}'")
+
+    toolchain['sysroot'] = _check_output(
+        [rustc_executable, '--print', 'sysroot'], env, cwd).strip()
+    toolchain['cfg'] = [
+        line.strip()
+        for line in _check_output(
+            [rustc_executable, '--print', 'cfg'], env, cwd).splitlines()
+        if line.strip()]
+    return toolchain
+
+
+def _check_output(cmd, env, cwd):
+    try:
+        return subprocess.check_output(
+            cmd, env=env, cwd=str(cwd), stderr=subprocess.PIPE,
+            universal_newlines=True)
+    except (OSError, subprocess.CalledProcessError) as e:
+        raise RuntimeError(
+            f"Failed to probe Rust toolchain using '{' '.join(cmd)}'"
+        ) from e
+
+
+def _write_cache_file(cache_file, toolchain):
+    # write to a temporary file first so that concurrent readers never see
+    # partial content
+    temp_file = cache_file.with_name(
+        f'{cache_file.name}.{os.getpid()}.tmp')
+    try:
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        temp_file.write_text(json.dumps(toolchain, sort_keys=True))
+        os.replace(str(temp_file), str(cache_file))
+    except OSError as e:
+        logger.debug(f'Failed to cache toolchain information: {e}')
@@ -0,0 +1,93 @@
+# Copyright 2025 Open Source Robotics Foundation, Inc.
+# Licensed under the Apache License, Version 2.0
+
+from concurrent.futures import ThreadPoolExecutor
+import os
+from pathlib import Path
+import shutil
+import threading
+import uuid
+
+from colcon_core.logging import colcon_logger
+
+logger = colcon_logger.getChild(__name__)
+
+# The directory next to the removed directories holding them until they are
+# deleted
+TRASH_DIRECTORY_NAME = '.colcon_cargo_trash'
+
+_executor = None
+_executor_lock = threading.Lock()
+_emptied_trash_directories = set()
+
+
+def move_to_trash(path):
+    """
+    Remove a directory without waiting for its content to be deleted.
+
+    The directory is atomically renamed into a trash directory next to it
+    and deleted in a background thread.
+    Leftovers of earlier processes in the same trash directory, e.g. from
+    interrupted runs, are deleted as well.
+    If the directory can't be renamed, e.g. because it is a mount point, it
+    is deleted synchronously instead.
+
+    :param path: The directory to remove
+    """
+    path = Path(path)
+    trash_dir = path.parent / TRASH_DIRECTORY_NAME
+    empty_trash(trash_dir)
+
+    trash_path = trash_dir / f'{path.name}-{os.getpid()}-{uuid.uuid4().hex}'
+    try:
+        trash_dir.mkdir(exist_ok=True)
+        os.rename(str(path), str(trash_path))
+    except OSError as e:
+        logger.debug(f"Failed to move '{path}' to the trash: {e}")
+        shutil.rmtree(str(path))
+        return
+    _delete_in_background(trash_path)
+
+
+def empty_trash(trash_dir):
+    """
+    Delete the leftovers of earlier processes in a trash directory.
+
+    Each trash directory is only checked once per process.
+
+    :param trash_dir: The trash directory
+    """
+    trash_dir = Path(trash_dir)
+    with _executor_lock:
+        if trash_dir in _emptied_trash_directories:
+            return
+        _emptied_trash_directories.add(trash_dir)
+    if not trash_dir.is_dir():
+        return
+
+    for path in trash_dir.iterdir():
+        # the names end with the process id and a random suffix
+        parts = path.name.rsplit('-', 2)
+        if len(parts) != 3 or parts[1] != str(os.getpid()):
+            _delete_in_background(path)
+
+
+def _delete_in_background(path):
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # the worker threads are joined when the interpreter exits, so
+            # the deletion finishes even if all builds are done before
+            _executor = ThreadPoolExecutor(
+                max_workers=2, thread_name_prefix='colcon-cargo-trash')
+        _executor.submit(_delete, path)
+
+
+def _delete(path):
+    if path.is_dir() and not path.is_symlink():
+        shutil.rmtree(str(path), ignore_errors=True)
+    else:
+        try:
+            path.unlink()
+        except OSError:
+            pass
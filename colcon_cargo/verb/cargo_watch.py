@@ -0,0 +1,242 @@
+# Copyright 2025 Open Source Robotics Foundation, Inc.
+# Licensed under the Apache License, Version 2.0
+
+import os
+from pathlib import Path
+
+from colcon_core.logging import colcon_logger
+from colcon_core.verb.build import BuildVerb
+from colcon_core.verb.build import check_and_mark_build_tool
+from colcon_core.verb.build import check_and_mark_install_layout
+
+logger = colcon_logger.getChild(__name__)
+
+# The files which change the set of packages or their metadata
+MANIFEST_NAMES = ('Cargo.toml', 'Cargo.lock')
+
+# The files and directories of a Cargo package containing its sources
+SOURCE_NAMES = ('build.rs', 'src', 'tests', 'examples', 'benches')
+
+
+class CargoWatchVerb(BuildVerb):
+    """Build packages and rebuild them whenever their sources change."""
+
+    def add_arguments(self, *, parser):  # noqa: D102
+        super().add_arguments(parser=parser)
+        parser.add_argument(
+            '--watch-debounce',
+            type=float, default=0.2, metavar='SECONDS',
+            help='Wait until no further changes occurred for this long '
+            'before rebuilding (default: 0.2)')
+        parser.add_argument(
+            '--watch-poll-interval',
+            type=float, default=1.0, metavar='SECONDS',
+            help='The interval between scans if the file system can not '
+            'notify about changes (default: 1.0)')
+
+    def main(self, *, context):  # noqa: D102
+        args = context.args
+        check_and_mark_build_tool(args.build_base)
+        check_and_mark_install_layout(
+            args.install_base, merge_install=args.merge_install)
+        self._create_paths(args)
+
+        decorators = self._get_packages(args)
+        # only the packages selected initially are ever rebuilt
+        selection = {d.descriptor.name for d in decorators if d.selected}
+        rc = self._build(context, decorators)
+
+        watcher = self._create_watcher(args, decorators, selection)
+        logger.info('Watching for changes, press Ctrl-C to stop')
+        try:
+            while True:
+                changes = self._wait_for_changes(watcher, args)
+                manifest_changed = any(
+                    path.name in MANIFEST_NAMES for path in changes)
+                forget_process_state(manifest_changed=manifest_changed)
+                if manifest_changed:
+                    # packages might have been added, removed or changed
+                    # their dependencies
+                    decorators = self._get_packages(args)
+                    watcher.close()
+                    watcher = self._create_watcher(
+                        args, decorators, selection)
+
+                affected = get_affected_packages(
+                    [d.descriptor for d in decorators], changes)
+                affected = {
+                    d.descriptor.name for d in decorators
+                    if d.descriptor.name in affected or
+                    affected & set(d.recursive_dependencies)}
+                affected &= selection
+                if not affected:
+                    continue
+                logger.info(
+                    f"Rebuilding {', '.join(sorted(affected))}")
+                for decorator in decorators:
+                    decorator.selected = decorator.descriptor.name in affected
+                rc = self._build(context, decorators)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            watcher.close()
+        return rc
+
+    def _get_packages(self, args):
+        from colcon_core.package_selection import get_packages
+        return get_packages(
+            args,
+            additional_argument_names=self.task_argument_destinations,
+            recursive_categories=('run', ))
+
+    def _build(self, context, decorators):
+        # the same as BuildVerb.main without discovering the packages again,
+        # using the methods it is composed of
+        from colcon_core.event.job import JobUnselected
+        from colcon_core.executor import execute_jobs
+        from colcon_core.executor import OnError
+
+        install_base = os.path.abspath(os.path.join(
+            os.getcwd(), context.args.install_base))
+        jobs, unselected_packages = self._get_jobs(
+            context.args, decorators, install_base)
+
+        on_error = OnError.interrupt \
+            if not context.args.continue_on_error else OnError.skip_downstream
+
+        def post_unselected_packages(*, event_queue):
+            names = [pkg.name for pkg in unselected_packages]
+            for name in sorted(names):
+                event_queue.put(
+                    (JobUnselected(name), None))
+
+        rc = execute_jobs(
+            context, jobs, on_error=on_error,
+            pre_execution_callback=post_unselected_packages)
+        self._create_prefix_scripts(install_base, context.args.merge_install)
+        return rc
+
+    @staticmethod
+    def _create_watcher(args, decorators, selection):
+        # the entry point is loaded by every colcon invocation, so modules
+        # only needed when the verb is used are imported lazily
+        from colcon_cargo.verb.file_watcher import create_watcher
+        watcher = create_watcher(poll_interval=args.watch_poll_interval)
+        for path, recursive in get_watched_directories([
+            d.descriptor for d in decorators
+            if d.descriptor.name in selection
+        ]):
+            watcher.add(path, recursive=recursive)
+        return watcher
+
+    @staticmethod
+    def _wait_for_changes(watcher, args):
+        changes = set()
+        while not changes:
+            changes = watcher.wait()
+        # coalesce the burst of events of e.g. an editor saving a file
+        while True:
+            more_changes = watcher.wait(timeout=args.watch_debounce)
+            if not more_changes:
+                return changes
+            changes |= more_changes
+
+
+def forget_process_state(*, manifest_changed):
+    """
+    Forget the state memoized by the tasks of this process.
+
+    The tasks keep state for the lifetime of the process, assuming that
+    it doesn't change during a single build.
+
+    :param bool manifest_changed: Whether a manifest changed, which
+      invalidates the state derived from the manifests as well
+    """
+    from colcon_cargo.task.cargo import build as build_module
+    from colcon_cargo.task.cargo import command_environment
+    from colcon_cargo.task.cargo import toolchain
+    from colcon_cargo.task.cargo.artifact_cache \
+        import forget_install_fingerprint
+
+    forget_install_fingerprint()
+    command_environment.clear_memo()
+    # e.g. after `rustup update` or a changed `rust-toolchain.toml`
+    toolchain.clear_memo()
+    if manifest_changed:
+        from colcon_cargo.package_identification.cargo_workspace \
+            import _expand_workspace_patterns
+        _expand_workspace_patterns.cache_clear()
+        build_module._metadata_cache.clear()
+
+
+def get_watched_directories(descriptors):
+    """
+    Get the directories to watch for changes to Cargo packages.
+
+    The source directories of each package are watched recursively, while
+    the package directory itself and all parent directories containing a
+    `Cargo.toml` file, e.g. the root of a workspace, are only watched for
+    changes to their manifests.
+
+    :param descriptors: The package descriptors
+    :returns: Tuples of a directory and a flag if it should be watched
+      recursively
+    :rtype: list
+    """
+    directories = {}
+    for descriptor in descriptors:
+        if descriptor.type != 'cargo':
+            continue
+        path = Path(os.path.realpath(str(descriptor.path)))
+        directories.setdefault(path, False)
+        for name in SOURCE_NAMES:
+            if (path / name).is_dir():
+                directories[path / name] = True
+        for parent in path.parents:
+            if (parent / 'Cargo.toml').is_file():
+                directories.setdefault(parent, False)
+    return sorted(directories.items())
+
+
+def get_affected_packages(descriptors, changes):
+    """
+    Map changed files to the packages they belong to.
+
+    Each file belongs to the package with the longest path containing it.
+    A manifest outside of all packages, e.g. of a virtual workspace, affects
+    all packages below it.
+
+    :param descriptors: The package descriptors
+    :param changes: The paths of the changed files
+    :returns: The names of the affected packages
+    :rtype: set
+    """
+    packages = sorted(
+        (
+            (Path(os.path.realpath(str(d.path))), d.name)
+            for d in descriptors),
+        key=lambda p: len(p[0].parts), reverse=True)
+    affected = set()
+    for change in changes:
+        change = Path(os.path.realpath(str(change)))
+        if not _is_relevant(change, packages):
+            continue
+        owner = next((
+            name for path, name in packages
+            if path == change or path in change.parents), None)
+        if owner is not None:
+            affected.add(owner)
+        elif change.name in MANIFEST_NAMES:
+            affected.update(
+                name for path, name in packages
+                if change.parent in path.parents)
+    return affected
+
+
+def _is_relevant(change, packages):
+    # files directly in a package or workspace directory only matter if they
+    # are manifests or build scripts
+    if any(change.parent == path for path, _ in packages) or \
+            not any(path in change.parents for path, _ in packages):
+        return change.name in MANIFEST_NAMES or change.name == 'build.rs'
+    return True
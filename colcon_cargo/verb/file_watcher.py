@@ -0,0 +1,209 @@
+# Copyright 2025 Open Source Robotics Foundation, Inc.
+# Licensed under the Apache License, Version 2.0
+
+import ctypes
+import ctypes.util
+import os
+from pathlib import Path
+import select
+import struct
+import sys
+import time
+
+from colcon_cargo.package_identification.cargo_workspace \
+    import PRUNED_DIRECTORY_NAMES
+from colcon_core.logging import colcon_logger
+
+logger = colcon_logger.getChild(__name__)
+
+# The inotify event flags, see inotify(7)
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+
+WATCH_MASK = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | \
+    IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF
+
+INOTIFY_EVENT = struct.Struct('iIII')
+
+
+def create_watcher(*, poll_interval=1.0):
+    """
+    Create a file watcher using the most efficient available mechanism.
+
+    :param float poll_interval: The interval in seconds between scans of the
+      polling watcher, which is used if inotify isn't available
+    :returns: The file watcher
+    """
+    if sys.platform.startswith('linux'):
+        try:
+            return InotifyWatcher()
+        except OSError as e:
+            logger.warning(
+                f'Failed to initialize inotify, falling back to polling: {e}')
+    return PollingWatcher(poll_interval=poll_interval)
+
+
+class InotifyWatcher:
+    """Watch directories for changes using the Linux inotify API."""
+
+    def __init__(self):  # noqa: D107
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = (
+            ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32)
+        self._fd = libc.inotify_init()
+        if self._fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+        # the watched directory of each watch descriptor
+        self._directories = {}
+        self._recursive = set()
+
+    def add(self, path, *, recursive=False):
+        """
+        Watch a directory.
+
+        :param path: The directory
+        :param bool recursive: Also watch all subdirectories, including the
+          ones created later
+        """
+        path = Path(path)
+        if not path.is_dir():
+            return
+        wd = self._add_watch(self._fd, os.fsencode(str(path)), WATCH_MASK)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            logger.warning(
+                f"Failed to watch '{path}': {os.strerror(errno)}")
+            return
+        self._directories[wd] = path
+        if not recursive:
+            return
+        self._recursive.add(path)
+        for dirpath, dirnames, _ in os.walk(str(path)):
+            dirnames[:] = [
+                d for d in dirnames if d not in PRUNED_DIRECTORY_NAMES]
+            for dirname in dirnames:
+                self.add(Path(dirpath, dirname))
+                self._recursive.add(Path(dirpath, dirname))
+
+    def wait(self, timeout=None):
+        """
+        Wait for changes.
+
+        :param float timeout: The maximum time in seconds to wait, or None to
+          wait indefinitely
+        :returns: The paths of the changed files and directories, an empty
+          set if the timeout expired
+        :rtype: set
+        """
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return set()
+        buffer = os.read(self._fd, 64 * 1024)
+        changes = set()
+        offset = 0
+        while offset < len(buffer):
+            wd, mask, _, length = INOTIFY_EVENT.unpack_from(buffer, offset)
+            offset += INOTIFY_EVENT.size
+            name = buffer[offset:offset + length].rstrip(b'\0')
+            offset += length
+            if mask & IN_Q_OVERFLOW:
+                # events have been lost, report all watched directories
+                changes.update(self._directories.values())
+                continue
+            directory = self._directories.get(wd)
+            if directory is None:
+                continue
+            if mask & IN_IGNORED:
+                del self._directories[wd]
+                continue
+            path = directory / os.fsdecode(name) if name else directory
+            changes.add(path)
+            if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO) and \
+                    directory in self._recursive and \
+                    path.name not in PRUNED_DIRECTORY_NAMES:
+                self.add(path, recursive=True)
+        return changes
+
+    def close(self):
+        """Stop watching all directories."""
+        os.close(self._fd)
+
+
+class PollingWatcher:
+    """Watch directories for changes by periodically comparing mtimes."""
+
+    def __init__(self, *, poll_interval=1.0):  # noqa: D107
+        self._poll_interval = poll_interval
+        self._roots = {}
+        self._snapshot = {}
+
+    def add(self, path, *, recursive=False):
+        """
+        Watch a directory.
+
+        :param path: The directory
+        :param bool recursive: Also watch all subdirectories
+        """
+        self._roots[Path(path)] = recursive
+        self._snapshot.update(self._scan_root(Path(path), recursive))
+
+    def wait(self, timeout=None):
+        """
+        Wait for changes.
+
+        :param float timeout: The maximum time in seconds to wait, or None to
+          wait indefinitely
+        :returns: The paths of the changed files and directories, an empty
+          set if the timeout expired
+        :rtype: set
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            snapshot = {}
+            for root, recursive in self._roots.items():
+                snapshot.update(self._scan_root(root, recursive))
+            changes = {
+                path for path in set(snapshot) | set(self._snapshot)
+                if snapshot.get(path) != self._snapshot.get(path)}
+            self._snapshot = snapshot
+            if changes:
+                return changes
+            if deadline is not None and time.monotonic() >= deadline:
+                return set()
+            interval = self._poll_interval
+            if deadline is not None:
+                interval = min(interval, deadline - time.monotonic())
+            time.sleep(max(interval, 0))
+
+    def close(self):
+        """Stop watching all directories."""
+        self._roots.clear()
+
+    @staticmethod
+    def _scan_root(root, recursive):
+        snapshot = {}
+        for dirpath, dirnames, filenames in os.walk(str(root)):
+            if recursive:
+                dirnames[:] = [
+                    d for d in dirnames if d not in PRUNED_DIRECTORY_NAMES]
+            else:
+                dirnames[:] = []
+            for name in filenames:
+                path = Path(dirpath, name)
+                try:
+                    stat = path.stat()
+                except OSError:
+                    continue
+                snapshot[path] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
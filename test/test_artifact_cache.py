@@ -0,0 +1,60 @@
+# Copyright 2025 Open Source Robotics Foundation, Inc.
+# Licensed under the Apache License, Version 2.0
+
+from types import SimpleNamespace
+
+from colcon_cargo.task.cargo import artifact_cache
+from colcon_cargo.task.cargo.artifact_cache import forget_install_fingerprint
+from colcon_cargo.task.cargo.artifact_cache import get_cache_key
+
+
+def get_key(path, dependencies=None):
+    return get_cache_key(
+        SimpleNamespace(name=path.name, path=path), cargo_args=[],
+        toolchain_fingerprint='toolchain', dependencies=dependencies,
+        env={})
+
+
+def test_workspace_path_dependencies(tmp_path):
+    (tmp_path / 'Cargo.toml').write_text('\n'.join((
+        '[workspace]',
+        'members = ["app"]',
+        '[workspace.dependencies]',
+        'lib = { path = "lib" }',
+    )) + '\n')
+    app = tmp_path / 'app'
+    (app / 'src').mkdir(parents=True)
+    (app / 'Cargo.toml').write_text('\n'.join((
+        '[package]',
+        'name = "app"',
+        '[dependencies]',
+        'lib = { workspace = true }',
+    )) + '\n')
+    (app / 'src' / 'main.rs').write_text('fn main() {}\n')
+    lib = tmp_path / 'lib'
+    (lib / 'src').mkdir(parents=True)
+    (lib / 'Cargo.toml').write_text('[package]\nname = "lib"\n')
+    (lib / 'src' / 'lib.rs').write_text('')
+
+    key = get_key(app)
+    # the dependency inherited from the workspace is an input of the package
+    (lib / 'src' / 'lib.rs').write_text('pub fn f() {}\n')
+    assert get_key(app) != key
+
+
+def test_install_fingerprint(monkeypatch, tmp_path):
+    monkeypatch.setattr(artifact_cache, '_install_fingerprints', {})
+    pkg = tmp_path / 'pkg'
+    pkg.mkdir()
+    (pkg / 'Cargo.toml').write_text('[package]\nname = "pkg"\n')
+    prefix = tmp_path / 'install' / 'dep'
+    (prefix / 'bin').mkdir(parents=True)
+    (prefix / 'bin' / 'dep').write_text('old')
+    dependencies = {'dep': str(prefix)}
+
+    key = get_key(pkg, dependencies)
+    (prefix / 'bin' / 'dep').write_text('new')
+    # the fingerprint is memoized until the dependency is built again
+    assert get_key(pkg, dependencies) == key
+    forget_install_fingerprint('dep')
+    assert get_key(pkg, dependencies) != key
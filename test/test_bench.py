@@ -0,0 +1,49 @@
+# Copyright 2025 Open Source Robotics Foundation, Inc.
+# Licensed under the Apache License, Version 2.0
+
+from colcon_cargo.task.cargo.bench import find_regressions
+from colcon_cargo.task.cargo.bench import load_results
+from colcon_cargo.task.cargo.bench import parse_bench_output
+from colcon_cargo.task.cargo.bench import save_results
+
+LIBTEST_OUTPUT = """
+running 2 tests
+test tests::fib     ... bench:       1,234.56 ns/iter (+/- 78.90)
+test tests::sort    ... bench:          42 ns/iter (+/- 3)
+
+test result: ok. 0 passed; 0 failed; 0 ignored; 2 measured
+"""
+
+CRITERION_OUTPUT = """
+Benchmarking fib 20: Warming up for 3.0000 s
+fib 20                  time:   [26.029 µs 26.251 µs 26.505 µs]
+                        change: [-1.2% +0.5% +2.1%] (p = 0.61 > 0.05)
+a/very/long/benchmark/name/exceeding/the/column
+                        time:   [1.0000 ms 1.5000 ms 2.0000 ms]
+                        thrpt:  [100 elem/s 110 elem/s 120 elem/s]
+"""
+
+
+def test_parse_bench_output():
+    assert parse_bench_output(LIBTEST_OUTPUT) == {
+        'tests::fib': 1234.56,
+        'tests::sort': 42.0,
+    }
+    results = parse_bench_output(CRITERION_OUTPUT)
+    assert set(results) == {
+        'fib 20', 'a/very/long/benchmark/name/exceeding/the/column'}
+    assert round(results['fib 20']) == 26251
+    assert results['a/very/long/benchmark/name/exceeding/the/column'] == \
+        1.5e6
+
+
+def test_find_regressions(tmp_path):
+    baseline = {'fast': 100.0, 'slow': 100.0, 'removed': 1.0}
+    results = {'fast': 105.0, 'slow': 120.0, 'added': 1000.0}
+    assert find_regressions(results, baseline, 0.1) == {
+        'slow': (100.0, 120.0)}
+
+    path = tmp_path / 'results.json'
+    assert load_results(path) is None
+    save_results(path, results)
+    assert load_results(path) == results
@@ -0,0 +1,339 @@
+# Copyright 2025 Open Source Robotics Foundation, Inc.
+# Licensed under the Apache License, Version 2.0
+
+# Benchmarks of the plugin overhead, using synthetic trees of Cargo packages
+# and workspaces, and of the build options affecting cargo itself. They
+# require the pytest-benchmark plugin and only run if selected explicitly:
+#
+#   pytest test/test_benchmark.py -m benchmark
+#
+# The timings depend on the machine, so no baseline is part of the
+# repository. Save a baseline locally before a change and compare a run
+# against it after the change to catch regressions:
+#
+#   pytest test/test_benchmark.py -m benchmark --benchmark-autosave
+#   pytest test/test_benchmark.py -m benchmark \
+#     --benchmark-compare --benchmark-compare-fail=mean:25%
+#
+# The size of the generated trees can be scaled with the environment
+# variable COLCON_CARGO_BENCHMARK_SCALE (default: 1).
+
+import asyncio
+import json
+import os
+from pathlib import Path
+import shutil
+import subprocess
+import sys
+import time
+from types import SimpleNamespace
+
+from colcon_cargo.package_augmentation.cargo import CargoPackageAugmentation
+from colcon_cargo.package_discovery.cargo_workspace \
+    import CargoWorkspacePackageDiscovery
+from colcon_cargo.package_identification.cargo \
+    import CargoPackageIdentification
+from colcon_cargo.package_identification.cargo_workspace \
+    import _expand_workspace_patterns
+from colcon_cargo.package_identification.cargo_workspace \
+    import CargoWorkspaceIdentification
+from colcon_cargo.task.cargo import CACHE_PATH_ENVIRONMENT_VARIABLE
+from colcon_cargo.task.cargo import CARGO_COMMAND_ENVIRONMENT_VARIABLE
+from colcon_cargo.task.cargo import get_cargo_executable
+from colcon_cargo.task.cargo.build import CargoBuildTask
+from colcon_cargo.task.cargo.toolchain import get_fast_link_args
+from colcon_cargo.task.cargo.toolchain import try_get_toolchain
+from colcon_core.package_descriptor import PackageDescriptor
+from colcon_core.package_identification import IgnoreLocationException
+from colcon_core.subprocess import new_event_loop
+from colcon_core.task import TaskContext
+import pytest
+
+pytest.importorskip('pytest_benchmark')
+
+pytestmark = pytest.mark.benchmark
+
+SCALE = int(os.environ.get('COLCON_CARGO_BENCHMARK_SCALE', '1'))
+
+TREE_SIZES = {
+    'packages': 50 * SCALE,
+    'workspaces': 5 * SCALE,
+    'members': 10,
+    'fan_out': 5,
+    'targets': 3,
+    'features': 5,
+}
+
+
+def generate_tree(
+    root, *, packages, workspaces, members, fan_out, targets, features
+):
+    """
+    Generate a synthetic tree of Cargo packages and workspaces.
+
+    :param root: The directory to generate the tree in
+    :param packages: The number of standalone packages
+    :param workspaces: The number of virtual workspaces
+    :param members: The number of members of each workspace
+    :param fan_out: The number of path dependencies of each package
+    :param targets: The number of binary targets and target specific
+      dependency tables of each package
+    :param features: The number of features of each package
+    :returns: The paths of the standalone packages and the workspace roots
+    """
+    package_paths = []
+    workspace_paths = []
+    names = []
+
+    def write_package(path, name):
+        lines = [
+            '[package]',
+            f'name = "{name}"',
+            'version = "0.1.0"',
+            'authors = ["Test<test@test.com>"]',
+            'edition = "2021"',
+            '',
+            '[dependencies]',
+            'either = "1.0"',
+        ]
+        for dependency in names[-fan_out:]:
+            lines.append(
+                f'{dependency} = {{ path = "../{dependency}" }}')
+        lines.append('')
+        lines.append('[dev-dependencies]')
+        lines.append(f'{name} = {{ path = "." }}')
+        lines.append('tempdir = "0.3"')
+        for index in range(targets):
+            lines.append('')
+            lines.append(f"[target.'cfg(target_arch = \"t{index}\")'."
+                         'dependencies]')
+            lines.append(f'target-dependency-{index} = "1.0"')
+            lines.append('')
+            lines.append('[[bin]]')
+            lines.append(f'name = "{name}-bin-{index}"')
+            lines.append('path = "src/main.rs"')
+        lines.append('')
+        lines.append('[features]')
+        lines.append('default = ["feature-0"]')
+        for index in range(features):
+            lines.append(f'feature-{index} = []')
+        (path / 'src').mkdir(parents=True)
+        (path / 'src' / 'main.rs').write_text('fn main() {}\n')
+        (path / 'Cargo.toml').write_text('\n'.join(lines) + '\n')
+        names.append(name)
+
+    for index in range(packages):
+        path = root / 'packages' / f'package-{index}'
+        write_package(path, f'package-{index}')
+        package_paths.append(path)
+
+    for index in range(workspaces):
+        path = root / 'workspaces' / f'workspace-{index}'
+        path.mkdir(parents=True)
+        (path / 'Cargo.toml').write_text('\n'.join((
+            '[workspace]',
+            'members = ["members/*"]',
+            'exclude = ["members/excluded-*"]',
+            '',
+            '[workspace.metadata.colcon]',
+            'additional-packages = ["vendor/**/additional-*"]',
+        )) + '\n')
+        for member in range(members):
+            write_package(
+                path / 'members' / f'member-{index}-{member}',
+                f'member-{index}-{member}')
+        write_package(
+            path / 'members' / f'excluded-{index}', f'excluded-{index}')
+        write_package(
+            path / 'vendor' / 'nested' / f'additional-{index}',
+            f'additional-{index}')
+        # a populated target directory which needs to be pruned
+        for dep in range(100):
+            (path / 'target' / 'debug' / 'deps' / f'dep-{dep}').mkdir(
+                parents=True)
+        workspace_paths.append(path)
+
+    return package_paths, workspace_paths
+
+
+@pytest.fixture(scope='module')
+def synthetic_tree(tmp_path_factory):
+    root = tmp_path_factory.mktemp('tree')
+    return generate_tree(root, **TREE_SIZES)
+
+
+@pytest.fixture
+def stub_cargo(tmp_path, monkeypatch):
+    if os.name == 'nt':
+        pytest.skip('The stub cargo executable requires a POSIX system')
+
+    metadata = {
+        'packages': [{
+            'name': 'package-0',
+            'targets': [{'kind': ['bin'], 'name': 'package-0'}],
+        }],
+    }
+    cargo = tmp_path / 'cargo'
+    cargo.write_text('\n'.join((
+        f'#!{sys.executable}',
+        'import sys',
+        "if sys.argv[1] == 'metadata':",
+        f'    print({json.dumps(json.dumps(metadata))})',
+    )) + '\n')
+    cargo.chmod(0o755)
+    monkeypatch.setenv(CARGO_COMMAND_ENVIRONMENT_VARIABLE.name, str(cargo))
+    monkeypatch.setenv(
+        CACHE_PATH_ENVIRONMENT_VARIABLE.name, str(tmp_path / 'cache'))
+    get_cargo_executable.cache_clear()
+    yield cargo
+    get_cargo_executable.cache_clear()
+
+
+def test_benchmark_package_identification(benchmark, synthetic_tree):
+    package_paths, _ = synthetic_tree
+    cpi = CargoPackageIdentification()
+
+    def identify_all():
+        for path in package_paths:
+            desc = PackageDescriptor(path)
+            cpi.identify(desc)
+            assert desc.type == 'cargo'
+
+    benchmark(identify_all)
+
+
+def test_benchmark_workspace_identification(benchmark, synthetic_tree):
+    _, workspace_paths = synthetic_tree
+
+    def identify_all():
+        # measure the directory walk rather than the memoized result
+        _expand_workspace_patterns.cache_clear()
+        cwi = CargoWorkspaceIdentification()
+        for path in workspace_paths:
+            with pytest.raises(IgnoreLocationException):
+                cwi.identify(PackageDescriptor(path))
+        return cwi.workspace_package_paths
+
+    paths = benchmark(identify_all)
+    assert len(paths) == TREE_SIZES['workspaces'] * TREE_SIZES['members'] + \
+        TREE_SIZES['workspaces']
+
+
+def test_benchmark_workspace_discovery(benchmark, synthetic_tree):
+    _, workspace_paths = synthetic_tree
+
+    def discover_all():
+        _expand_workspace_patterns.cache_clear()
+        cwi = CargoWorkspaceIdentification()
+        cpi = CargoPackageIdentification()
+        for path in workspace_paths:
+            with pytest.raises(IgnoreLocationException):
+                cwi.identify(PackageDescriptor(path))
+        cwpd = CargoWorkspacePackageDiscovery()
+        return cwpd.discover(
+            args=SimpleNamespace(),
+            identification_extensions={
+                cwi.PRIORITY: {'cargo_workspace': cwi},
+                cpi.PRIORITY: {'cargo': cpi},
+            })
+
+    descs = benchmark(discover_all)
+    assert len(descs) == TREE_SIZES['workspaces'] * TREE_SIZES['members'] + \
+        TREE_SIZES['workspaces']
+
+
+def test_benchmark_package_augmentation(benchmark, synthetic_tree):
+    package_paths, _ = synthetic_tree
+    cpi = CargoPackageIdentification()
+    aug = CargoPackageAugmentation()
+
+    def augment_all():
+        for path in package_paths:
+            desc = PackageDescriptor(path)
+            cpi.identify(desc)
+            aug.augment_package(desc)
+
+    benchmark(augment_all)
+
+
+def test_benchmark_build_task(benchmark, synthetic_tree, stub_cargo, tmp_path):
+    package_paths, _ = synthetic_tree
+    package = PackageDescriptor(package_paths[0])
+    CargoPackageIdentification().identify(package)
+    context = TaskContext(
+        pkg=package,
+        args=SimpleNamespace(
+            path=str(package.path),
+            build_base=str(tmp_path / 'build'),
+            install_base=str(tmp_path / 'install'),
+            clean_build=None,
+            cargo_args=['--features', 'feature-1'],
+        ),
+        dependencies={})
+    context.put_event_into_queue = lambda event: None
+
+    event_loop = new_event_loop()
+    asyncio.set_event_loop(event_loop)
+    try:
+        def build():
+            task = CargoBuildTask()
+            task.set_context(context=context)
+            return event_loop.run_until_complete(task.build())
+
+        rc = benchmark(build)
+        assert not rc
+        assert (Path(context.args.install_base) / 'share').is_dir()
+    finally:
+        event_loop.close()
+
+
+def test_benchmark_link(benchmark, monkeypatch, tmp_path):
+    # Compare the time of incremental rebuilds, which are dominated by
+    # linking, with and without --cargo-fast-link using the real toolchain
+    if benchmark.disabled:
+        pytest.skip('The link benchmark only runs when benchmarking')
+    monkeypatch.setenv(
+        CACHE_PATH_ENVIRONMENT_VARIABLE.name, str(tmp_path / 'cache'))
+    if shutil.which('cargo') is None:
+        pytest.skip('The link benchmark requires cargo')
+    toolchain = try_get_toolchain()
+    if toolchain is None:
+        pytest.skip('The link benchmark requires rustc')
+    fast_link_args = get_fast_link_args(toolchain)
+    if not fast_link_args:
+        pytest.skip('The toolchain supports no fast link options')
+
+    workspace = tmp_path / 'rust-workspace'
+    shutil.copytree(
+        str(Path(__file__).parent / 'rust-workspace'), str(workspace))
+    main_rs = workspace / 'workspace-member' / 'src' / 'main.rs'
+
+    def get_rebuild(cargo_args, target_dir):
+        cmd = [
+            'cargo', 'build', '--quiet', '--offline',
+            '--target-dir', str(target_dir),
+        ] + cargo_args
+        assert subprocess.run(cmd, cwd=str(workspace)).returncode == 0
+
+        def rebuild():
+            main_rs.write_text(main_rs.read_text() + '\n')
+            return subprocess.run(cmd, cwd=str(workspace)).returncode
+        return rebuild
+
+    # the rounds alternate between both modes, so that both are affected
+    # by the load of the machine alike
+    rebuild_default = get_rebuild([], tmp_path / 'default')
+    rebuild = get_rebuild(fast_link_args, tmp_path / 'fast-link')
+    durations = []
+
+    def setup():
+        start = time.perf_counter()
+        assert rebuild_default() == 0
+        durations.append(time.perf_counter() - start)
+
+    assert benchmark.pedantic(rebuild, setup=setup, rounds=5) == 0
+    # the fastest rounds are the least affected by noise, regressions are
+    # detected by comparing runs using --benchmark-compare
+    benchmark.extra_info['default_min'] = min(durations)
+    if benchmark.stats is not None:
+        benchmark.extra_info['fast_link_min'] = benchmark.stats.stats.min
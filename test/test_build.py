@@ -6,6 +6,7 @@ import os
 from pathlib import Path
 import shutil
 import tempfile
+import time
 from types import SimpleNamespace
 import xml.etree.ElementTree as eTree
 
@@ -16,10 +17,14 @@ from colcon_cargo.package_identification.cargo \
     import CargoPackageIdentification
 from colcon_cargo.package_identification.cargo_workspace \
     import CargoWorkspaceIdentification
+from colcon_cargo.package_identification.cargo_workspace \
+    import expand_workspace_patterns
+from colcon_cargo.task.cargo import CACHE_PATH_ENVIRONMENT_VARIABLE
 from colcon_cargo.task.cargo.build import CargoBuildTask
 from colcon_cargo.task.cargo.test import CargoTestTask
 from colcon_core.event_handler.console_direct import ConsoleDirectEventHandler
 from colcon_core.package_descriptor import PackageDescriptor
+from colcon_core.package_identification import IgnoreLocationException
 from colcon_core.subprocess import new_event_loop
 from colcon_core.task import TaskContext
 import pytest
@@ -33,6 +38,12 @@ pure_library_path = Path(__file__).parent / PURE_LIBRARY_PACKAGE_NAME
 workspace_project_path = Path(__file__).parent / WORKSPACE_PACKAGE_NAME
 
 
+@pytest.fixture(autouse=True)
+def isolate_cache_path(monkeypatch, tmp_path):
+    monkeypatch.setenv(
+        CACHE_PATH_ENVIRONMENT_VARIABLE.name, str(tmp_path / 'cache'))
+
+
 @pytest.fixture(autouse=True)
 def monkey_patch_put_event_into_queue(monkeypatch):
     event_handler = ConsoleDirectEventHandler()
@@ -108,6 +119,84 @@ def test_package_discovery():
     assert desc.name == 'additional-package'
 
 
+def test_nested_workspace_discovery():
+    def write_manifest(path, content):
+        path.mkdir(parents=True, exist_ok=True)
+        (path / 'Cargo.toml').write_text(content)
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        tmpdir = Path(tmpdir)
+        write_manifest(tmpdir, '\n'.join((
+            '[workspace]',
+            'members = ["crates/*"]',
+            '[workspace.metadata.colcon]',
+            'additional-packages = ["vendor/*"]',
+        )))
+        write_manifest(
+            tmpdir / 'crates' / 'member',
+            '[package]\nname = "member"\n')
+        # a standalone virtual workspace inside of additional-packages
+        write_manifest(
+            tmpdir / 'vendor' / 'workspace',
+            '[workspace]\nmembers = ["nested-*"]\n')
+        write_manifest(
+            tmpdir / 'vendor' / 'workspace' / 'nested-member',
+            '[package]\nname = "nested-member"\n')
+        # a standalone workspace which is also a package
+        write_manifest(
+            tmpdir / 'vendor' / 'package-workspace',
+            '\n'.join((
+                '[package]',
+                'name = "package-workspace"',
+                '[workspace]',
+                'members = ["inner"]',
+            )))
+        write_manifest(
+            tmpdir / 'vendor' / 'package-workspace' / 'inner',
+            '[package]\nname = "inner"\n')
+
+        cwi = CargoWorkspaceIdentification()
+        cpi = CargoPackageIdentification()
+        with pytest.raises(IgnoreLocationException):
+            cwi.identify(PackageDescriptor(tmpdir))
+
+        cwpd = CargoWorkspacePackageDiscovery()
+        descs = cwpd.discover(
+            args=SimpleNamespace(),
+            identification_extensions={
+                cwi.PRIORITY: {'cargo_workspace': cwi},
+                cpi.PRIORITY: {'cargo': cpi},
+            })
+
+        assert {desc.name for desc in descs} == {
+            'member', 'nested-member', 'package-workspace', 'inner'}
+        assert not cwi.workspace_package_paths
+
+
+def test_workspace_pattern_expansion():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        tmpdir = Path(tmpdir)
+        for path in (
+            'crates/a', 'crates/b/nested', 'target/debug/crate',
+            'vendor/.git/crate', 'build/crate', 'vendor/crate',
+        ):
+            (tmpdir / path).mkdir(parents=True)
+        (tmpdir / 'build' / 'COLCON_IGNORE').touch()
+
+        patterns = ('crates/*', '**/crate', 'crates/b', 'target/*/crate')
+        matches = expand_workspace_patterns(tmpdir, patterns)
+        assert matches[0] == {tmpdir / 'crates/a', tmpdir / 'crates/b'}
+        # target, .git and build bases are pruned from wildcards...
+        assert matches[1] == {tmpdir / 'vendor/crate'}
+        assert matches[2] == {tmpdir / 'crates/b'}
+        # ...but are still reachable through literal path components
+        assert matches[3] == {tmpdir / 'target/debug/crate'}
+
+        # the result is memoized per workspace root
+        (tmpdir / 'crates/c').mkdir()
+        assert expand_workspace_patterns(tmpdir, patterns) == matches
+
+
 # Ported from Python 3.13 implementation
 # Remove when migrating to Python 3.13 and above
 def from_uri(uri):
@@ -317,3 +406,70 @@ def test_workspace_with_package():
 
     finally:
         event_loop.close()
+
+
+@pytest.mark.skipif(
+    not shutil.which('cargo'),
+    reason='Rust must be installed to run this test')
+def test_target_garbage_collection():
+    event_loop = new_event_loop()
+    asyncio.set_event_loop(event_loop)
+
+    try:
+        cpi = CargoPackageIdentification()
+        package = PackageDescriptor(workspace_project_path)
+        cpi.identify(package)
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            tmpdir = Path(tmpdir)
+            context = TaskContext(pkg=package,
+                                  args=SimpleNamespace(
+                                      path=str(workspace_project_path),
+                                      build_base=str(tmpdir / 'build'),
+                                      install_base=str(tmpdir / 'install'),
+                                      clean_build=None,
+                                      cargo_args=None,
+                                      cargo_gc=True,
+                                      cargo_gc_min_age=1,
+                                      cargo_gc_max_size=None,
+                                      cargo_gc_scope='package',
+                                      ),
+                                  dependencies={}
+                                  )
+
+            task = CargoBuildTask()
+            task.set_context(context=context)
+            rc = event_loop.run_until_complete(task.build())
+            assert not rc
+
+            # Artifacts of a unit which isn't part of the build anymore
+            profile_dir = Path(context.args.build_base) / 'debug'
+            stale_paths = (
+                profile_dir / 'deps' / 'libstale-0123456789abcdef.rlib',
+                profile_dir / '.fingerprint' / 'stale-0123456789abcdef',
+            )
+            stale_paths[0].write_text('')
+            stale_paths[1].mkdir()
+            two_hours_ago = time.time() - 2 * 60 * 60
+            for path in stale_paths:
+                os.utime(str(path), (two_hours_ago, two_hours_ago))
+            used_paths = set(profile_dir.glob('*/*'))
+
+            messages = []
+            task = CargoBuildTask()
+            task.set_context(context=context)
+            task.message_callbacks.append(messages.append)
+            rc = event_loop.run_until_complete(task.build())
+            assert not rc
+
+            assert not any(path.exists() for path in stale_paths)
+            assert used_paths - set(stale_paths) == set(
+                profile_dir.glob('*/*'))
+            # Nothing used by the build has been removed
+            artifacts = [
+                m for m in messages if m['reason'] == 'compiler-artifact']
+            assert artifacts
+            assert all(m['fresh'] for m in artifacts)
+
+    finally:
+        event_loop.close()
@@ -0,0 +1,709 @@
+# Copyright 2025 Open Source Robotics Foundation, Inc.
+# Licensed under the Apache License, Version 2.0
+
+import asyncio
+import json
+import os
+from pathlib import Path
+import shutil
+import sys
+from types import SimpleNamespace
+import xml.etree.ElementTree as eTree
+
+from colcon_cargo import event_log as event_log_module
+from colcon_cargo.event_log import EventLog
+from colcon_cargo.package_identification.cargo \
+    import CargoPackageIdentification
+from colcon_cargo.task.cargo import build as build_module
+from colcon_cargo.task.cargo import CACHE_PATH_ENVIRONMENT_VARIABLE
+from colcon_cargo.task.cargo import CARGO_COMMAND_ENVIRONMENT_VARIABLE
+from colcon_cargo.task.cargo import compiler_cache as compiler_cache_module
+from colcon_cargo.task.cargo import get_cargo_executable
+from colcon_cargo.task.cargo import RUSTC_COMMAND_ENVIRONMENT_VARIABLE
+from colcon_cargo.task.cargo import SCCACHE_COMMAND_ENVIRONMENT_VARIABLE
+from colcon_cargo.task.cargo import toolchain as toolchain_module
+from colcon_cargo.task.cargo import trash as trash_module
+from colcon_cargo.task.cargo.build import CargoBuildTask
+from colcon_cargo.task.cargo.build import parse_variant
+from colcon_cargo.task.cargo.compiler_cache import format_size
+from colcon_cargo.task.cargo.compiler_cache import report_session
+from colcon_cargo.task.cargo.environment_hooks \
+    import generate_unless_unchanged
+from colcon_cargo.task.cargo.target_tmpfs import get_staging_directory
+from colcon_cargo.task.cargo.test import CargoTestTask
+from colcon_cargo.task.cargo.trash import TRASH_DIRECTORY_NAME
+from colcon_core.package_descriptor import PackageDescriptor
+from colcon_core.subprocess import new_event_loop
+from colcon_core.task import TaskContext
+import pytest
+
+# The stub cargo executable logs its invocations and emulates the subset of
+# the cargo commands used by the tasks
+STUB_CARGO = """
+import json
+import os
+import sys
+
+args = sys.argv[1:]
+with open(os.environ['STUB_CARGO_LOG'], 'a') as f:
+    f.write(json.dumps(args) + '\\n')
+
+def option(name):
+    return args[args.index(name) + 1] if name in args else None
+
+if args[0] == '--version':
+    print('cargo 1.90.0')
+elif args[0] == 'metadata':
+    print(json.dumps({'packages': [{
+        'name': 'stub-package',
+        'targets': [{'kind': ['bin'], 'name': 'stub-package'}],
+    }]}))
+elif args[0] == 'check':
+    print(json.dumps({
+        'reason': 'compiler-message',
+        'message': {'level': 'warning', 'rendered': 'warning: unused'},
+    }))
+elif args[0] == 'bench':
+    print('test tests::fib ... bench: ' + os.environ['STUB_BENCH_NS'] +
+          ' ns/iter (+/- 5)')
+elif args[0] == 'clippy' and os.environ.get('STUB_CLIPPY_LINT'):
+    print(json.dumps({
+        'reason': 'compiler-message',
+        'manifest_path': os.environ.get(
+            'STUB_CLIPPY_MANIFEST', os.path.join(os.getcwd(), 'Cargo.toml')),
+        'message': {
+            'level': 'warning',
+            'code': {'code': os.environ['STUB_CLIPPY_LINT']},
+            'rendered': 'warning: lint\\n',
+            'spans': [
+                {'is_primary': True, 'file_name': 'src/main.rs',
+                 'line_start': 1},
+            ],
+        },
+    }))
+elif args[0] == 'build' and os.environ.get('RUSTC_WRAPPER'):
+    import subprocess
+    subprocess.check_call([
+        os.environ['RUSTC_WRAPPER'], os.environ['RUSTC'],
+        '--crate-name', 'stub_package'])
+elif args[0] == 'test':
+    import time
+    time.sleep(float(os.environ.get('STUB_TEST_SLEEP', '0')))
+    print('test result: ok. 2 passed; 0 failed; 1 ignored; 0 measured; '
+          '0 filtered out')
+elif args[0] == 'install':
+    bin_dir = os.path.join(option('--root'), 'bin')
+    os.makedirs(bin_dir, exist_ok=True)
+    with open(os.path.join(bin_dir, 'stub-package'), 'w') as f:
+        f.write(os.environ.get('STUB_CARGO_BINARY', 'binary'))
+
+if args[0] == 'build':
+    fail_in = os.environ.get('STUB_BUILD_FAIL_IN')
+    if fail_in and option('--target-dir').startswith(fail_in):
+        print(os.environ.get('STUB_BUILD_FAIL_OUTPUT', ''), file=sys.stderr)
+        sys.exit(101)
+    fingerprint = os.path.join(
+        option('--target-dir'), 'debug', '.fingerprint', 'stub-package-0')
+    os.makedirs(fingerprint, exist_ok=True)
+    with open(os.path.join(fingerprint, 'bin-stub-package'), 'w') as f:
+        f.write('fingerprint')
+
+if args[0] == 'build' and '--message-format=json-render-diagnostics' in args:
+    artifact = os.path.join(option('--target-dir'), 'stub-package')
+    with open(artifact, 'w') as f:
+        f.write('artifact')
+    print(json.dumps({
+        'reason': 'compiler-artifact', 'fresh': False,
+        'manifest_path': os.path.join(os.getcwd(), 'Cargo.toml'),
+        'filenames': [artifact],
+    }))
+"""
+
+STUB_RUSTC = """
+import sys
+
+outputs = {
+    '-vV': '\\n'.join((
+        'rustc 1.90.0',
+        'host: x86_64-unknown-linux-gnu',
+        'release: 1.90.0',
+    )),
+    'sysroot': '/opt/rust',
+    'cfg': 'unix',
+}
+print(outputs.get(sys.argv[-1], ''))
+"""
+
+# The stub sccache caches the crate names passed to the compiler in its cache
+# directory and keeps statistics like the sccache server
+STUB_SCCACHE = """
+import json
+import os
+import subprocess
+import sys
+
+cache_dir = os.environ['SCCACHE_DIR']
+stats_file = os.path.join(cache_dir, 'stats.json')
+os.makedirs(cache_dir, exist_ok=True)
+try:
+    with open(stats_file) as f:
+        stats = json.load(f)
+except OSError:
+    stats = {'compile_requests': 0, 'cache_hits': {'counts': {}},
+             'cache_misses': {'counts': {}}}
+
+if sys.argv[1] == '--show-stats':
+    print(json.dumps({'stats': stats}))
+    sys.exit(0)
+
+stats['compile_requests'] += 1
+entry = os.path.join(cache_dir, sys.argv[sys.argv.index('--crate-name') + 1])
+result = 'cache_hits' if os.path.exists(entry) else 'cache_misses'
+counts = stats[result]['counts']
+counts['Rust'] = counts.get('Rust', 0) + 1
+open(entry, 'w').close()
+with open(stats_file, 'w') as f:
+    json.dump(stats, f)
+sys.exit(subprocess.call(sys.argv[1:]))
+"""
+
+
+def write_executable(path, content):
+    path.write_text(f'#!{sys.executable}\n' + content)
+    path.chmod(0o755)
+
+
+@pytest.fixture
+def stub_cargo(monkeypatch, tmp_path):
+    if os.name == 'nt':
+        pytest.skip('The stub executables require a POSIX system')
+
+    cargo = tmp_path / 'cargo'
+    write_executable(cargo, STUB_CARGO)
+    rustc = tmp_path / 'rustc'
+    write_executable(rustc, STUB_RUSTC)
+    log = tmp_path / 'cargo.log'
+    log.touch()
+
+    monkeypatch.setenv(CARGO_COMMAND_ENVIRONMENT_VARIABLE.name, str(cargo))
+    monkeypatch.setenv(RUSTC_COMMAND_ENVIRONMENT_VARIABLE.name, str(rustc))
+    monkeypatch.setenv(
+        CACHE_PATH_ENVIRONMENT_VARIABLE.name, str(tmp_path / 'cache'))
+    monkeypatch.setenv('STUB_CARGO_LOG', str(log))
+    monkeypatch.setattr(toolchain_module, '_toolchains', {})
+    get_cargo_executable.cache_clear()
+    yield SimpleNamespace(
+        invocations=lambda: [
+            json.loads(line) for line in log.read_text().splitlines()],
+        clear=lambda: log.write_text(''))
+    get_cargo_executable.cache_clear()
+
+
+@pytest.fixture
+def package(tmp_path):
+    path = tmp_path / 'src' / 'stub-package'
+    (path / 'src').mkdir(parents=True)
+    (path / 'Cargo.toml').write_text(
+        '[package]\nname = "stub-package"\nversion = "0.1.0"\n')
+    (path / 'src' / 'main.rs').write_text('fn main() {}\n')
+    desc = PackageDescriptor(path)
+    CargoPackageIdentification().identify(desc)
+    return desc
+
+
+@pytest.fixture
+def event_loop():
+    loop = new_event_loop()
+    asyncio.set_event_loop(loop)
+    yield loop
+    loop.close()
+
+
+def create_context(package, tmp_path, **kwargs):
+    args = SimpleNamespace(
+        path=str(package.path),
+        build_base=str(tmp_path / 'build' / package.name),
+        install_base=str(tmp_path / 'install' / package.name),
+        clean_build=None,
+        cargo_args=None,
+    )
+    for k, v in kwargs.items():
+        setattr(args, k, v)
+    context = TaskContext(pkg=package, args=args, dependencies={})
+    context.put_event_into_queue = lambda event: None
+    return context
+
+
+def run_build(event_loop, context):
+    task = CargoBuildTask()
+    task.set_context(context=context)
+    return event_loop.run_until_complete(task.build())
+
+
+def test_artifact_cache(event_loop, package, stub_cargo, tmp_path):
+    context = create_context(
+        package, tmp_path,
+        cargo_artifact_cache=str(tmp_path / 'artifacts'),
+        cargo_artifact_cache_max_size=None,
+        cargo_artifact_cache_max_age=None)
+    install_base = Path(context.args.install_base)
+    binary = install_base / 'bin' / 'stub-package'
+
+    # a miss builds the package and stores the install prefix
+    assert not run_build(event_loop, context)
+    assert [i[0] for i in stub_cargo.invocations()] == \
+        ['--version', 'metadata', 'build', 'install']
+    assert binary.read_text() == 'binary'
+
+    # a hit restores the install prefix without invoking cargo
+    stub_cargo.clear()
+    shutil.rmtree(str(install_base))
+    assert not run_build(event_loop, context)
+    assert stub_cargo.invocations() == []
+    assert binary.read_text() == 'binary'
+    assert (install_base / 'share' / 'stub-package' / 'package.dsv').is_file()
+    # the environment hooks are generated after the restore, so they are
+    # up to date for the next build
+    generate_unless_unchanged(
+        context.args.build_base, install_base, 'stub-package',
+        'cargo_stub-package_path', ['PATH', 'bin'],
+        lambda: pytest.fail('The environment hooks are outdated'))
+
+    # changed sources are a miss, the metadata of the unchanged manifest is
+    # reused
+    (package.path / 'src' / 'main.rs').write_text('fn main() { }\n')
+    assert not run_build(event_loop, context)
+    assert [i[0] for i in stub_cargo.invocations()] == ['build', 'install']
+    entries = list((tmp_path / 'artifacts').glob('entries/*/*'))
+    assert len(entries) == 2
+
+    # the least recently used entries are evicted beyond the maximum size
+    context.args.cargo_artifact_cache_max_size = 0
+    (package.path / 'src' / 'main.rs').write_text('fn main() {  }\n')
+    assert not run_build(event_loop, context)
+    assert list((tmp_path / 'artifacts').glob('entries/*/*')) == []
+
+
+def test_cargo_executable_attribute(
+    event_loop, package, stub_cargo, tmp_path,
+):
+    # packages extending the task replace the executable of the module
+    log = tmp_path / 'wrapped.log'
+    wrapper = tmp_path / 'wrapped-cargo'
+    write_executable(wrapper, '\n'.join((
+        'import os',
+        'import sys',
+        f'with open({str(log)!r}, "a") as f:',
+        '    f.write(sys.argv[1] + "\\n")',
+        f'os.execv({str(tmp_path / "cargo")!r}, sys.argv)',
+    )) + '\n')
+    assert build_module.CARGO_EXECUTABLE == str(tmp_path / 'cargo')
+    build_module.CARGO_EXECUTABLE = str(wrapper)
+    try:
+        assert not run_build(event_loop, create_context(package, tmp_path))
+    finally:
+        del build_module.CARGO_EXECUTABLE
+    assert log.read_text().split() == [
+        '--version', 'metadata', 'build', 'install']
+
+
+def test_clean_build(event_loop, monkeypatch, package, stub_cargo, tmp_path):
+    monkeypatch.setattr(trash_module, '_executor', None)
+    monkeypatch.setattr(trash_module, '_emptied_trash_directories', set())
+    context = create_context(package, tmp_path, clean_build=True)
+    build_dir = Path(context.args.build_base)
+    trash_dir = build_dir.parent / TRASH_DIRECTORY_NAME
+    (build_dir / 'target').mkdir(parents=True)
+    (build_dir / 'target' / 'stale').write_text('')
+    # a leftover of an interrupted run of another process
+    (trash_dir / 'other-0-0123').mkdir(parents=True)
+
+    assert not run_build(event_loop, context)
+    assert build_dir.is_dir()
+    assert not (build_dir / 'target' / 'stale').exists()
+
+    trash_module._executor.shutdown(wait=True)
+    assert list(trash_dir.iterdir()) == []
+
+
+def test_check(event_loop, package, stub_cargo, tmp_path):
+    context = create_context(
+        package, tmp_path, cargo_check=True, cargo_check_all_targets=True)
+    events = []
+    context.put_event_into_queue = events.append
+    install_base = Path(context.args.install_base)
+
+    assert not run_build(event_loop, context)
+    invocations = stub_cargo.invocations()
+    assert [i[0] for i in invocations] == ['--version', 'check']
+    assert '--message-format=json' in invocations[1]
+    assert '--all-targets' in invocations[1]
+    assert not (install_base / 'bin').exists()
+    # downstream packages can still find the package
+    assert (install_base / 'share' / 'stub-package' / 'package.dsv').is_file()
+
+    result = json.loads(
+        (Path(context.args.build_base) / 'cargo_check.json').read_text())
+    assert result['diagnostics'] == {'warning': 1}
+    assert any(
+        getattr(event, 'line', None) == b'warning: unused' for event in events)
+
+
+def test_bench(event_loop, monkeypatch, package, stub_cargo, tmp_path):
+    context = create_context(
+        package, tmp_path, cargo_bench=True, cargo_bench_threshold=10)
+    build_base = Path(context.args.build_base)
+    build_base.mkdir(parents=True)
+
+    def run_test(ns):
+        monkeypatch.setenv('STUB_BENCH_NS', ns)
+        task = CargoTestTask()
+        task.set_context(context=context)
+        assert not event_loop.run_until_complete(task.test())
+        testsuite = eTree.parse(
+            str(build_base / 'cargo_test.xml')).getroot().find('testsuite')
+        return testsuite.find("testcase[@name='bench/tests::fib']")
+
+    # the first run creates the baseline
+    testcase = run_test('1,000')
+    assert testcase.find('failure') is None
+    assert json.loads((build_base / 'cargo_bench.json').read_text())[
+        'results'] == {'tests::fib': 1000.0}
+    assert (build_base / 'cargo_bench_baseline.json').is_file()
+
+    assert run_test('1,050').find('failure') is None
+    assert run_test('1,200').find('failure') is not None
+
+    # the baseline is kept unless it is explicitly updated
+    context.args.cargo_bench_update_baseline = True
+    assert run_test('1,200').find('failure') is not None
+    assert run_test('1,200').find('failure') is None
+
+
+def test_fast_link(event_loop, package, stub_cargo, tmp_path):
+    context = create_context(package, tmp_path, cargo_fast_link=True)
+    assert not run_build(event_loop, context)
+    build_cmd = next(i for i in stub_cargo.invocations() if i[0] == 'build')
+    config = [
+        build_cmd[i + 1] for i, arg in enumerate(build_cmd)
+        if arg == '--config']
+    assert 'profile.dev.split-debuginfo="unpacked"' in config
+
+    # the tests use the same configuration to reuse the artifacts
+    stub_cargo.clear()
+    task = CargoTestTask()
+    task.set_context(context=context)
+    assert not event_loop.run_until_complete(task.test())
+    test_cmd = next(i for i in stub_cargo.invocations() if i[0] == 'test')
+    assert config == [
+        test_cmd[i + 1] for i, arg in enumerate(test_cmd)
+        if arg == '--config']
+
+    # until a build without the option
+    context.args.cargo_fast_link = False
+    assert not run_build(event_loop, context)
+    stub_cargo.clear()
+    assert not event_loop.run_until_complete(task.test())
+    test_cmd = next(i for i in stub_cargo.invocations() if i[0] == 'test')
+    assert '--config' not in test_cmd
+
+
+def test_clippy(event_loop, monkeypatch, package, stub_cargo, tmp_path):
+    context = create_context(package, tmp_path, cargo_clippy=True)
+    build_base = Path(context.args.build_base)
+    build_base.mkdir(parents=True)
+
+    def run_test():
+        stub_cargo.clear()
+        task = CargoTestTask()
+        task.set_context(context=context)
+        assert not event_loop.run_until_complete(task.test())
+        testsuite = eTree.parse(
+            str(build_base / 'cargo_test.xml')).getroot().find('testsuite')
+        return {
+            testcase.get('name'): testcase.find('failure') is not None
+            for testcase in testsuite.findall('testcase')
+            if testcase.get('name').startswith('clippy')}
+
+    monkeypatch.setenv('STUB_CLIPPY_LINT', 'clippy::needless_return')
+    assert run_test() == {
+        'clippy': False,
+        'clippy/clippy::needless_return:src/main.rs:1': True,
+    }
+    assert 'clippy' in [i[0] for i in stub_cargo.invocations()]
+
+    # neither the lints of rustc nor those of other packages are reported
+    monkeypatch.setenv('STUB_CLIPPY_LINT', 'unused_variables')
+    assert run_test() == {'clippy': False}
+    monkeypatch.setenv('STUB_CLIPPY_LINT', 'clippy::needless_return')
+    monkeypatch.setenv(
+        'STUB_CLIPPY_MANIFEST', str(tmp_path / 'dependency' / 'Cargo.toml'))
+    assert run_test() == {'clippy': False}
+    monkeypatch.delenv('STUB_CLIPPY_MANIFEST')
+
+    # a clean result is cached until the sources change
+    monkeypatch.delenv('STUB_CLIPPY_LINT')
+    assert run_test() == {'clippy': False}
+    assert run_test() == {'clippy': False}
+    assert 'clippy' not in [i[0] for i in stub_cargo.invocations()]
+    (package.path / 'src' / 'main.rs').write_text('fn main() { }\n')
+    assert run_test() == {'clippy': False}
+    assert 'clippy' in [i[0] for i in stub_cargo.invocations()]
+
+    # as is the configuration of the lints in a parent directory
+    assert run_test() == {'clippy': False}
+    assert 'clippy' not in [i[0] for i in stub_cargo.invocations()]
+    (package.path.parent / 'clippy.toml').write_text(
+        'too-many-lines-threshold = 50\n')
+    assert run_test() == {'clippy': False}
+    assert 'clippy' in [i[0] for i in stub_cargo.invocations()]
+
+    # only the latest clean result of each package is kept
+    assert len(list((tmp_path / 'cache' / 'clippy').iterdir())) == 1
+
+
+def test_compiler_cache(
+    event_loop, monkeypatch, package, stub_cargo, tmp_path
+):
+    monkeypatch.setattr(compiler_cache_module, '_session', None)
+    sccache = tmp_path / 'sccache'
+    write_executable(sccache, STUB_SCCACHE)
+    monkeypatch.setenv(SCCACHE_COMMAND_ENVIRONMENT_VARIABLE.name, str(sccache))
+    monkeypatch.delenv('SCCACHE_DIR', raising=False)
+    context = create_context(
+        package, tmp_path, cargo_compiler_cache=True, clean_build=True)
+
+    # the statistics of the shared server are reported for all builds
+    assert not run_build(event_loop, context)
+    # the cache directory outlives the clean build directory
+    assert not run_build(event_loop, context)
+    assert report_session() == {'hits': 1, 'misses': 1, 'requests': 2}
+    assert (tmp_path / 'cache' / 'sccache' / 'stub_package').is_file()
+
+    # a rustc wrapper configured by the user isn't replaced
+    wrapper = tmp_path / 'wrapper'
+    write_executable(wrapper, 'import subprocess, sys\n'
+                     'sys.exit(subprocess.call(sys.argv[1:]))\n')
+    monkeypatch.setenv('RUSTC_WRAPPER', str(wrapper))
+    assert not run_build(event_loop, context)
+    assert report_session() is None
+
+    # the size uses the syntax of sccache
+    assert format_size(10 << 30) == '10G'
+    assert format_size(1536 << 20) == '1536M'
+    assert format_size(1000) == '1K'
+
+
+def test_unchanged_environment_hooks(
+    event_loop, package, stub_cargo, tmp_path
+):
+    context = create_context(package, tmp_path)
+    share = Path(context.args.install_base) / 'share' / package.name
+
+    def get_hooks():
+        return {
+            str(p.relative_to(share)): (p.read_text(), p.stat().st_mtime_ns)
+            for p in share.rglob('*') if p.is_file()}
+
+    assert not run_build(event_loop, context)
+    hooks = get_hooks()
+    assert 'hook/cargo_stub-package_path.dsv' in hooks
+    assert 'package.dsv' in hooks
+
+    # the files of an unchanged package aren't even written
+    ctime = (share / 'package.dsv').stat().st_ctime_ns
+    assert not run_build(event_loop, context)
+    assert get_hooks() == hooks
+    assert (share / 'package.dsv').stat().st_ctime_ns == ctime
+
+    # deleted files are generated again
+    (share / 'package.dsv').unlink()
+    assert not run_build(event_loop, context)
+    regenerated = get_hooks()
+    assert regenerated.pop('package.dsv')[0] == hooks.pop('package.dsv')[0]
+    assert regenerated == hooks
+    hooks = get_hooks()
+
+    # modified files are generated again as well, keeping their mtime if
+    # the content turns out to be identical
+    hook = share / 'hook' / 'cargo_stub-package_path.dsv'
+    hook.write_text(hook.read_text())
+    hooks = get_hooks()
+    assert not run_build(event_loop, context)
+    assert get_hooks() == hooks
+
+
+def test_variants(event_loop, package, stub_cargo, tmp_path):
+    context = create_context(
+        package, tmp_path, cargo_variants=[
+            parse_variant('dev'), parse_variant('release'),
+            parse_variant('release:aarch64-unknown-linux-gnu')])
+    install_base = Path(context.args.install_base)
+
+    assert not run_build(event_loop, context)
+    invocations = [
+        i for i in stub_cargo.invocations() if i[0] in ('build', 'install')]
+    # a single invocation builds all targets of a profile
+    assert [i[i.index('--profile'):] for i in invocations[:2]] == [
+        ['--profile', 'dev'],
+        ['--profile', 'release', '--target', 'x86_64-unknown-linux-gnu',
+         '--target', 'aarch64-unknown-linux-gnu'],
+    ]
+    assert [
+        (i[i.index('--root') + 1], i[i.index('--profile'):])
+        for i in invocations[2:]
+    ] == [
+        (str(install_base), ['--profile', 'dev']),
+        (str(install_base / 'lib' / 'stub-package' / 'release'),
+         ['--profile', 'release', '--target', 'x86_64-unknown-linux-gnu']),
+        (str(install_base / 'lib' / 'stub-package' /
+             'release-aarch64-unknown-linux-gnu'),
+         ['--profile', 'release', '--target', 'aarch64-unknown-linux-gnu']),
+    ]
+    assert (install_base / 'bin' / 'stub-package').is_file()
+
+    # the arguments must not select a profile themselves
+    context.args.cargo_args = ['--release']
+    assert run_build(event_loop, context) == 1
+
+    with pytest.raises(ValueError):
+        parse_variant(':aarch64-unknown-linux-gnu')
+
+
+def test_test_threads(event_loop, monkeypatch, package, stub_cargo, tmp_path):
+    monkeypatch.setenv('STUB_TEST_SLEEP', '0.5')
+    monkeypatch.delenv('RUST_TEST_THREADS', raising=False)
+    tasks = []
+    for name in ('first', 'second', 'third'):
+        context = create_context(
+            package, tmp_path, cargo_test_threads=4,
+            build_base=str(tmp_path / 'build' / name))
+        Path(context.args.build_base).mkdir(parents=True)
+        task = CargoTestTask()
+        task.set_context(context=context)
+        tasks.append(task)
+
+    def get_test_threads():
+        return sorted(
+            i[-1] for i in stub_cargo.invocations() if i[0] == 'test')
+
+    # a package tested on its own gets the whole budget
+    assert not event_loop.run_until_complete(tasks[0].test())
+    assert get_test_threads() == ['--test-threads=4']
+
+    # packages starting while the budget is used up get a single thread
+    stub_cargo.clear()
+    assert event_loop.run_until_complete(asyncio.gather(
+        *(task.test() for task in tasks))) == [0, 0, 0]
+    assert get_test_threads() == [
+        '--test-threads=1', '--test-threads=1', '--test-threads=4']
+
+    # the budget is only used if requested
+    stub_cargo.clear()
+    tasks[0].context.args.cargo_test_threads = None
+    assert not event_loop.run_until_complete(tasks[0].test())
+    assert get_test_threads() == ['--color=never']
+
+    # and if the number of threads isn't set explicitly
+    stub_cargo.clear()
+    tasks[0].context.args.cargo_test_threads = 4
+    monkeypatch.setenv('RUST_TEST_THREADS', '3')
+    assert not event_loop.run_until_complete(tasks[0].test())
+    assert get_test_threads() == ['--color=never']
+
+
+def test_event_log(event_loop, monkeypatch, package, stub_cargo, tmp_path):
+    monkeypatch.setattr(
+        event_log_module, '_event_log', EventLog(tmp_path / 'events.jsonl'))
+    context = create_context(package, tmp_path)
+
+    def get_events():
+        return [
+            json.loads(line) for line in
+            (tmp_path / 'events.jsonl').read_text().splitlines()]
+
+    assert not run_build(event_loop, context)
+    events = get_events()
+    assert [e['event'] for e in events if e['event'] != 'command'] == [
+        'start', 'phase', 'phase', 'phase', 'artifacts', 'finish']
+    assert [e['phase'] for e in events if e['event'] == 'phase'] == [
+        'prepare', 'build', 'install']
+    assert [e['command'][1] for e in events if e['event'] == 'command'] == [
+        'metadata', 'build', 'install']
+    artifacts = next(e for e in events if e['event'] == 'artifacts')
+    assert artifacts['compiled'] == 1
+    assert artifacts['fresh'] == 0
+    assert artifacts['artifact_bytes'] == len('artifact')
+    assert artifacts['installed_bytes'] > len('binary')
+    assert events[-1]['returncode'] == 0
+    assert all(e['package'] == package.name for e in events)
+
+    task = CargoTestTask()
+    task.set_context(context=context)
+    assert not event_loop.run_until_complete(task.test())
+    events = get_events()[len(events):]
+    assert events[0]['event'] == 'start'
+    assert events[0]['task'] == 'test'
+    tests = next(e for e in events if e['event'] == 'tests')
+    assert (tests['passed'], tests['failed'], tests['ignored']) == (2, 0, 1)
+    assert {
+        e['command'][1] for e in events if e['event'] == 'command'
+    } == {'test', 'fmt'}
+
+
+def test_target_tmpfs(
+    event_loop, monkeypatch, package, stub_cargo, tmp_path
+):
+    context = create_context(
+        package, tmp_path, cargo_target_tmpfs=str(tmp_path / 'shm'),
+        cargo_target_tmpfs_min_free=0)
+    build_base = Path(context.args.build_base)
+
+    def get_target_dirs(command):
+        return {
+            i[i.index('--target-dir') + 1]
+            for i in stub_cargo.invocations() if i[0] == command}
+
+    assert not run_build(event_loop, context)
+    staging = get_staging_directory(tmp_path / 'shm', build_base)
+    assert get_target_dirs('build') == {str(staging)}
+    assert get_target_dirs('install') == {str(staging)}
+    assert (build_base / 'cargo_target_dir').read_text() == str(staging)
+    # only the fingerprints are synced to the build directory
+    assert (
+        build_base / 'cargo_target_snapshot' / 'debug' / '.fingerprint' /
+        'stub-package-0' / 'bin-stub-package').read_text() == 'fingerprint'
+    assert not (build_base / 'debug').exists()
+
+    # the test task uses the staged target directory
+    stub_cargo.clear()
+    task = CargoTestTask()
+    task.set_context(context=context)
+    assert not event_loop.run_until_complete(task.test())
+    assert get_target_dirs('test') == {str(staging)}
+
+    # other failures aren't repeated on disk
+    stub_cargo.clear()
+    monkeypatch.setenv('STUB_BUILD_FAIL_IN', str(tmp_path / 'shm'))
+    assert run_build(event_loop, context) == 101
+    assert get_target_dirs('build') == {str(staging)}
+
+    # a build failing because the space ran out is repeated on disk
+    stub_cargo.clear()
+    monkeypatch.setenv(
+        'STUB_BUILD_FAIL_OUTPUT',
+        'error: failed to write `stub.rlib`: No space left on device '
+        '(os error 28)')
+    assert not run_build(event_loop, context)
+    assert [
+        i[i.index('--target-dir') + 1]
+        for i in stub_cargo.invocations() if i[0] == 'build'
+    ] == [str(staging), str(build_base)]
+    assert not (build_base / 'cargo_target_dir').exists()
+
+    # without enough space the build happens on disk right away
+    stub_cargo.clear()
+    context.args.cargo_target_tmpfs_min_free = 1 << 60
+    monkeypatch.delenv('STUB_BUILD_FAIL_IN')
+    assert not run_build(event_loop, context)
+    assert get_target_dirs('build') == {str(build_base)}
@@ -0,0 +1,111 @@
+# Copyright 2025 Open Source Robotics Foundation, Inc.
+# Licensed under the Apache License, Version 2.0
+
+from collections import OrderedDict
+import os
+
+from colcon_cargo.task.cargo import CACHE_PATH_ENVIRONMENT_VARIABLE
+from colcon_cargo.task.cargo import command_environment
+from colcon_cargo.task.cargo.command_environment \
+    import get_cached_command_environment
+from colcon_cargo.task.cargo.command_environment import get_environment_key
+from colcon_core.subprocess import new_event_loop
+import pytest
+
+
+def create_prefix(path, name, value):
+    share = path / 'share' / name
+    share.mkdir(parents=True)
+    (share / 'package.sh').write_text(f'export STUB_HOOK_VALUE={value}\n')
+    (share / 'package.dsv').write_text('')
+    return path
+
+
+@pytest.fixture
+def get_environment(monkeypatch, tmp_path):
+    if os.name == 'nt':
+        pytest.skip('The hooks of the test require a POSIX shell')
+    monkeypatch.setenv(
+        CACHE_PATH_ENVIRONMENT_VARIABLE.name, str(tmp_path / 'cache'))
+    monkeypatch.setattr(command_environment, '_environments', {})
+    calls = []
+
+    async def get_command_environment(task_name, build_base, dependencies):
+        calls.append(task_name)
+        env = dict(os.environ)
+        for prefix in dependencies.values():
+            for line in (prefix / 'share' / 'dep' / 'package.sh').read_text() \
+                    .splitlines():
+                name, value = line[len('export '):].split('=', 1)
+                env[name] = value
+        env.pop('STUB_UNSET', None)
+        return env
+
+    monkeypatch.setattr(
+        command_environment, 'get_command_environment',
+        get_command_environment)
+    build_base = tmp_path / 'build'
+    build_base.mkdir()
+    loop = new_event_loop()
+
+    def get_environment(task_name, dependencies):
+        return loop.run_until_complete(get_cached_command_environment(
+            task_name, str(build_base), dependencies))
+    get_environment.calls = calls
+    yield get_environment
+    loop.close()
+
+
+def test_cached_command_environment(get_environment, monkeypatch, tmp_path):
+    monkeypatch.setenv('STUB_UNSET', '1')
+    prefix = create_prefix(tmp_path / 'install', 'dep', 'first')
+    dependencies = OrderedDict(dep=prefix)
+
+    env = get_environment('build', dependencies)
+    assert env['STUB_HOOK_VALUE'] == 'first'
+    assert 'STUB_UNSET' not in env
+    assert get_environment.calls == ['build']
+
+    # the test task reuses the environment of the build task
+    env['STUB_HOOK_VALUE'] = 'modified'
+    env = get_environment('test', dependencies)
+    assert env['STUB_HOOK_VALUE'] == 'first'
+    assert 'STUB_UNSET' not in env
+    assert get_environment.calls == ['build']
+
+    # as do later invocations, which only persist the changed variables
+    monkeypatch.setattr(command_environment, '_environments', {})
+    assert get_environment('test', dependencies)['STUB_HOOK_VALUE'] == 'first'
+    assert get_environment.calls == ['build']
+    entries = list((tmp_path / 'cache' / 'command-environment').glob('*/*'))
+    assert len(entries) == 1
+    assert str(tmp_path) not in entries[0].read_text().replace(
+        str(prefix), '')
+
+    # changed hooks of a dependency invalidate the environment
+    hook = prefix / 'share' / 'dep' / 'package.sh'
+    hook.write_text('export STUB_HOOK_VALUE=second\n')
+    os.utime(str(hook), ns=(0, 0))
+    assert get_environment('build', dependencies)['STUB_HOOK_VALUE'] == \
+        'second'
+    assert get_environment.calls == ['build', 'build']
+
+    # as does a changed environment of the process
+    monkeypatch.setenv('STUB_OTHER', '1')
+    assert get_environment('build', dependencies)['STUB_OTHER'] == '1'
+    assert get_environment.calls == ['build', 'build', 'build']
+
+
+def test_environment_key(monkeypatch, tmp_path):
+    prefix = create_prefix(tmp_path / 'install', 'dep', 'value')
+    key = get_environment_key(OrderedDict(dep=prefix))
+    assert key == get_environment_key(OrderedDict(dep=prefix))
+    assert key != get_environment_key(OrderedDict())
+
+    # dependencies without resources aren't cached
+    assert get_environment_key(OrderedDict(missing=prefix)) is None
+
+    monkeypatch.setenv(
+        command_environment.NO_ENVIRONMENT_CACHE_ENVIRONMENT_VARIABLE.name,
+        '1')
+    assert key != get_environment_key(OrderedDict(dep=prefix))
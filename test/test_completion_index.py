@@ -0,0 +1,123 @@
+# Copyright 2025 Open Source Robotics Foundation, Inc.
+# Licensed under the Apache License, Version 2.0
+
+from colcon_cargo.argcomplete_completer import completion_index
+from colcon_cargo.argcomplete_completer.completion_index \
+    import get_index_path
+from colcon_cargo.argcomplete_completer.completion_index \
+    import get_package_completions
+from colcon_cargo.argcomplete_completer.completion_index \
+    import load_completions
+from colcon_cargo.argcomplete_completer.completion_index \
+    import record_package
+from colcon_cargo.argcomplete_completer.completion_index \
+    import write_index
+from colcon_cargo.task.cargo import CACHE_PATH_ENVIRONMENT_VARIABLE
+import pytest
+
+CONTENT = {
+    'package': {'name': 'sample'},
+    'features': {'default': ['fast'], 'fast': []},
+    'dependencies': {
+        'serde': {'version': '1', 'optional': True},
+        'log': '0.4',
+    },
+    'profile': {'release-lto': {'inherits': 'release'}},
+    'bin': [{'name': 'tool', 'path': 'tools/tool.rs'}],
+}
+
+
+@pytest.fixture
+def cache_path(tmp_path, monkeypatch):
+    monkeypatch.setenv(
+        CACHE_PATH_ENVIRONMENT_VARIABLE.name, str(tmp_path / 'cache'))
+    monkeypatch.setattr(completion_index, '_pending', {})
+    monkeypatch.setattr(completion_index, '_manifests', {})
+    monkeypatch.setattr(completion_index, '_recorded', None)
+    return tmp_path / 'cache'
+
+
+def create_package(path):
+    (path / 'src' / 'bin' / 'server').mkdir(parents=True)
+    (path / 'src' / 'main.rs').write_text('fn main() {}\n')
+    (path / 'src' / 'bin' / 'client.rs').write_text('fn main() {}\n')
+    (path / 'src' / 'bin' / 'server' / 'main.rs').write_text('fn main() {}\n')
+    (path / 'examples').mkdir()
+    (path / 'examples' / 'demo.rs').write_text('fn main() {}\n')
+    (path / 'Cargo.toml').write_text('')
+    return path
+
+
+def test_package_completions(tmp_path):
+    path = create_package(tmp_path / 'sample')
+    assert get_package_completions(path, CONTENT) == {
+        'profiles': ['bench', 'dev', 'release', 'release-lto', 'test'],
+        'features': ['default', 'fast', 'serde'],
+        'bins': ['client', 'sample', 'server', 'tool'],
+        'examples': ['demo'],
+    }
+
+    # automatic target discovery can be disabled
+    content = dict(CONTENT, package={'name': 'sample', 'autobins': False})
+    assert get_package_completions(path, content)['bins'] == [
+        'sample', 'tool']
+
+
+def test_completion_index(cache_path, monkeypatch, tmp_path):
+    path = create_package(tmp_path / 'workspace' / 'sample')
+    assert ' --release' in load_completions()
+
+    record_package(path, CONTENT)
+    write_index()
+    choices = load_completions()
+    # the options and the names are separate words prefixed by a space
+    for choice in (
+        ' --release', ' --profile', ' release-lto', ' --features', ' serde',
+        ' fast', ' --bin', ' server', ' --example', ' demo',
+    ):
+        assert choice in choices
+    assert not [choice for choice in choices if '=' in choice]
+
+    # the index is only rewritten if the completions changed
+    mtime = get_index_path().stat().st_mtime_ns
+    record_package(path, CONTENT)
+    write_index()
+    assert get_index_path().stat().st_mtime_ns == mtime
+
+    # later processes don't collect the completions of unchanged packages
+    with monkeypatch.context() as m:
+        m.setattr(completion_index, '_recorded', None)
+        m.setattr(
+            completion_index, 'get_package_completions',
+            lambda *args, **kwargs: pytest.fail('Unchanged package'))
+        record_package(path, CONTENT)
+    assert completion_index._pending == {}
+
+    # packages of other workspaces are ignored if the current one has any
+    other = create_package(tmp_path / 'other')
+    record_package(other, dict(CONTENT, features={'other': []}))
+    write_index()
+    assert ' other' in load_completions()
+    assert ' other' not in load_completions(tmp_path / 'workspace')
+
+    # packages which have been removed are dropped from the index
+    (other / 'Cargo.toml').unlink()
+    (path / 'Cargo.toml').write_text('[package]\n')
+    record_package(path, dict(CONTENT, features={}))
+    write_index()
+    assert ' other' not in load_completions()
+    assert ' fast' not in load_completions()
+
+
+def test_virtual_workspace(cache_path, tmp_path):
+    # the profiles are declared in the root manifest without a package
+    (tmp_path / 'Cargo.toml').write_text('\n'.join((
+        '[workspace]',
+        'members = ["sample"]',
+        '[profile.release-lto]',
+        'inherits = "release"',
+    )) + '\n')
+    path = create_package(tmp_path / 'sample')
+    record_package(path, {'package': {'name': 'sample'}})
+    write_index()
+    assert ' release-lto' in load_completions()
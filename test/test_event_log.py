@@ -0,0 +1,50 @@
+# Copyright 2025 Open Source Robotics Foundation, Inc.
+# Licensed under the Apache License, Version 2.0
+
+import json
+import os
+
+from colcon_cargo import event_log
+from colcon_cargo.event_log import count_test_results
+from colcon_cargo.event_log import EventLog
+from colcon_cargo.event_log import get_event_log
+from colcon_cargo.event_log import log_event
+
+
+def test_event_log_disabled(monkeypatch):
+    monkeypatch.delenv('COLCON_CARGO_EVENT_LOG', raising=False)
+    monkeypatch.setattr(event_log, '_event_log', event_log._UNSET)
+    assert get_event_log() is None
+    log_event('start', package='package')
+
+
+def test_event_log(tmp_path):
+    log = EventLog(tmp_path)
+    assert log.path.name == f'colcon_cargo_events_{os.getpid()}.jsonl'
+    log.write('start', package='package')
+    # each event is readable as soon as it has been written
+    assert json.loads(log.path.read_text())['event'] == 'start'
+    log.write('finish', package='package', returncode=0)
+    log.close()
+
+    # events are appended to existing logs
+    log = EventLog(log.path)
+    log.write('start', package='other')
+    log.close()
+    events = [json.loads(line) for line in log.path.read_text().splitlines()]
+    assert [e['event'] for e in events] == ['start', 'finish', 'start']
+    assert all(e['pid'] == os.getpid() for e in events)
+
+
+def test_count_test_results():
+    output = '\n'.join((
+        'running 3 tests',
+        'test result: ok. 2 passed; 0 failed; 1 ignored; 0 measured; '
+        '0 filtered out; finished in 0.00s',
+        'running 2 tests',
+        'test result: FAILED. 1 passed; 1 failed; 0 ignored; 0 measured; '
+        '0 filtered out; finished in 0.01s',
+    ))
+    assert count_test_results(output) == {
+        'passed': 3, 'failed': 1, 'ignored': 1}
+    assert count_test_results('') == {'passed': 0, 'failed': 0, 'ignored': 0}
@@ -0,0 +1,103 @@
+# Copyright 2025 Open Source Robotics Foundation, Inc.
+# Licensed under the Apache License, Version 2.0
+
+import json
+from pathlib import Path
+import subprocess
+import sys
+
+import pytest
+
+# All colcon-cargo modules which are loaded as entry points by every colcon
+# invocation, e.g. `colcon list`
+ENTRY_POINT_MODULES = (
+    'colcon_cargo.argcomplete_completer.cargo_args',
+    'colcon_cargo.package_augmentation.cargo',
+    'colcon_cargo.package_discovery.cargo_workspace',
+    'colcon_cargo.package_identification.cargo',
+    'colcon_cargo.package_identification.cargo_workspace',
+    'colcon_cargo.task.cargo.build',
+    'colcon_cargo.task.cargo.test',
+    'colcon_cargo.verb.cargo_watch',
+)
+
+# The colcon-core modules used by the entry points, which are imported
+# beforehand so that they aren't accounted to colcon-cargo
+COLCON_CORE_MODULES = (
+    'colcon_core.dependency_descriptor',
+    'colcon_core.environment',
+    'colcon_core.environment_variable',
+    'colcon_core.event.test',
+    'colcon_core.logging',
+    'colcon_core.package_augmentation',
+    'colcon_core.package_descriptor',
+    'colcon_core.package_discovery',
+    'colcon_core.package_identification',
+    'colcon_core.package_identification.ignore',
+    'colcon_core.plugin_system',
+    'colcon_core.shell',
+    'colcon_core.task',
+    'colcon_core.verb.build',
+)
+
+# Modules which must only be imported once they are actually needed
+DEFERRED_MODULES = (
+    'colcon_cargo.task.cargo.toolchain',
+    'colcon_cargo.verb.file_watcher',
+    'ctypes',
+    'tomli',
+    'tomllib',
+    'xml.dom.minidom',
+    'xml.etree.ElementTree',
+)
+
+# The budget for the cumulative import time of colcon-cargo in microseconds
+IMPORT_TIME_BUDGET = 50000
+
+MARKER = 'colcon-cargo-import-time-marker'
+
+
+def measure_import():
+    code = '\n'.join(
+        [f'import {module}' for module in COLCON_CORE_MODULES] +
+        ['import json', 'import sys', f'print({MARKER!r}, file=sys.stderr)'] +
+        [f'import {module}' for module in ENTRY_POINT_MODULES] +
+        [
+            'from colcon_cargo.task.cargo import get_cargo_executable',
+            'print(json.dumps({',
+            '    "modules": sorted(sys.modules),',
+            '    "resolved": get_cargo_executable.cache_info().currsize,',
+            '}))',
+        ])
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        cwd=str(Path(__file__).parents[1]),
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True,
+        universal_newlines=True)
+
+    lines = result.stderr.splitlines()
+    lines = lines[lines.index(MARKER) + 1:]
+    total = 0
+    for line in lines:
+        if not line.startswith('import time:'):
+            continue
+        self_time = line.split(':', 1)[1].split('|')[0]
+        total += int(self_time)
+    return total, json.loads(result.stdout)
+
+
+def test_deferred_imports():
+    _, state = measure_import()
+    for module in DEFERRED_MODULES:
+        assert module not in state['modules']
+    # the cargo executable must not be looked up at import time
+    assert not state['resolved']
+
+
+@pytest.mark.benchmark
+def test_import_time_budget():
+    # use the best of a few runs to reduce the noise
+    total = min(measure_import()[0] for _ in range(3))
+    assert total < IMPORT_TIME_BUDGET, \
+        f'Importing colcon-cargo took {total}us, ' \
+        f'the budget is {IMPORT_TIME_BUDGET}us'
@@ -0,0 +1,99 @@
+# Copyright 2025 Open Source Robotics Foundation, Inc.
+# Licensed under the Apache License, Version 2.0
+
+import os
+import subprocess
+import sys
+import threading
+import time
+
+from colcon_cargo.task.cargo.link_throttle import configure_environment
+from colcon_cargo.task.cargo.link_throttle import create_wrapper
+from colcon_cargo.task.cargo.link_throttle import DEFAULT_LINK_MEMORY
+from colcon_cargo.task.cargo.link_throttle import is_link_invocation
+from colcon_cargo.task.cargo.link_throttle import LinkLedger
+import pytest
+
+
+def test_is_link_invocation():
+    assert is_link_invocation([
+        '--crate-name', 'foo', '--crate-type', 'bin',
+        '--emit=dep-info,link'])
+    assert is_link_invocation(['--crate-name', 'foo', '--test'])
+    assert is_link_invocation(['--crate-name=foo', '--crate-type=cdylib'])
+    assert not is_link_invocation([
+        '--crate-name', 'foo', '--crate-type', 'lib',
+        '--emit=dep-info,metadata,link'])
+    # cargo check
+    assert not is_link_invocation([
+        '--crate-name', 'foo', '--crate-type', 'bin',
+        '--emit=dep-info,metadata'])
+    assert not is_link_invocation([
+        '--crate-name', 'build_script_build', '--crate-type', 'bin'])
+    assert not is_link_invocation(['-vV'])
+    assert not is_link_invocation([
+        '-', '--crate-name', '___', '--print=file-names',
+        '--crate-type', 'bin'])
+
+
+def test_ledger(tmp_path):
+    ledger = LinkLedger(tmp_path)
+    assert ledger.get_estimate('pkg:foo:link') == DEFAULT_LINK_MEMORY
+    ledger.record_peak('pkg:foo:link', 100)
+    assert ledger.get_estimate('pkg:foo:link') == 100
+
+    # a link exceeding the budget is admitted if no other link is running
+    first = ledger.reserve(200, 150)
+
+    # reservations of terminated processes are ignored
+    finished = subprocess.Popen([sys.executable, '-c', ''])
+    finished.wait()
+    stale = ledger._read('ledger.json')
+    stale['stale'] = {'pid': finished.pid, 'size': 1000}
+    ledger._write('ledger.json', stale)
+
+    admitted = []
+    thread = threading.Thread(
+        target=lambda: admitted.append(ledger.reserve(100, 350)))
+    thread.start()
+    time.sleep(0.5)
+    assert admitted
+    thread.join()
+
+    # the budget is exhausted until another link finishes
+    thread = threading.Thread(
+        target=lambda: admitted.append(ledger.reserve(100, 350)))
+    thread.start()
+    time.sleep(0.5)
+    assert len(admitted) == 1
+    ledger.release(first)
+    thread.join()
+    assert len(admitted) == 2
+
+
+def test_wrapper(tmp_path):
+    if os.name == 'nt':
+        pytest.skip('The rustc wrapper requires a POSIX system')
+
+    rustc = tmp_path / 'rustc'
+    rustc.write_text(
+        f'#!{sys.executable}\n'
+        'import sys\n'
+        "sys.exit(3 if '--crate-name' in sys.argv else 0)\n")
+    rustc.chmod(0o755)
+    wrapper = tmp_path / 'wrapper'
+    create_wrapper(wrapper)
+    env = dict(os.environ, COLCON_CARGO_CACHE_PATH=str(tmp_path / 'cache'))
+    configure_environment(env, wrapper, 1 << 30)
+
+    # other invocations are passed through
+    assert subprocess.run(
+        [env['RUSTC_WRAPPER'], str(rustc), '-vV'], env=env).returncode == 0
+
+    env['CARGO_PKG_NAME'] = 'pkg'
+    assert subprocess.run(
+        [str(wrapper), str(rustc), '--crate-name', 'foo', '--test'],
+        env=env).returncode == 3
+    ledger = LinkLedger(tmp_path / 'cache' / 'link-throttle')
+    assert 0 < ledger.get_estimate('pkg:foo:test') < DEFAULT_LINK_MEMORY
+    assert ledger._read('ledger.json') == {}
@@ -0,0 +1,54 @@
+# Copyright 2025 Open Source Robotics Foundation, Inc.
+# Licensed under the Apache License, Version 2.0
+
+import asyncio
+import json
+import time
+
+from colcon_cargo import profiling
+from colcon_cargo.profiling import get_profile
+from colcon_cargo.profiling import Profile
+from colcon_cargo.profiling import profile_section
+from colcon_cargo.profiling import profiled
+from colcon_core.subprocess import new_event_loop
+
+
+def test_profiling_disabled(monkeypatch):
+    monkeypatch.delenv('COLCON_CARGO_PROFILE', raising=False)
+    monkeypatch.setattr(profiling, '_profile', profiling._UNSET)
+    assert get_profile() is None
+    with profile_section('section'):
+        pass
+
+
+def test_profile(monkeypatch, tmp_path):
+    profile = Profile(tmp_path, cprofile_path=tmp_path / 'stats.prof')
+    monkeypatch.setattr(profiling, '_profile', profile)
+
+    @profiled('function')
+    def function():
+        time.sleep(0.01)
+
+    @profiled('coroutine')
+    async def coroutine():
+        with profile_section('nested'):
+            await asyncio.sleep(0.01)
+
+    function()
+    function()
+    loop = new_event_loop()
+    try:
+        loop.run_until_complete(coroutine())
+    finally:
+        loop.close()
+
+    profile.write()
+    report = json.loads(
+        next(tmp_path.glob('colcon_cargo_profile_*.json')).read_text())
+    sections = report['sections']
+    assert set(sections) == {'coroutine', 'function', 'nested'}
+    assert sections['function']['count'] == 2
+    assert sections['function']['wall'] >= 0.02
+    assert sections['coroutine']['wall'] >= sections['nested']['wall'] > 0
+    assert report['total']['wall'] >= sections['function']['wall']
+    assert (tmp_path / 'stats.prof').is_file()
@@ -0,0 +1,59 @@
+# Copyright 2025 Open Source Robotics Foundation, Inc.
+# Licensed under the Apache License, Version 2.0
+
+import json
+
+from colcon_cargo.task.cargo import target_gc
+from colcon_cargo.task.cargo.target_gc import collect_garbage
+from colcon_cargo.task.cargo.target_gc import REFERENCES_FILE
+from colcon_cargo.task.cargo.target_gc import UnitReferences
+import pytest
+
+fcntl = pytest.importorskip('fcntl')
+
+
+def create_target_dir(path):
+    profile_dir = path / 'debug'
+    (profile_dir / '.fingerprint' / 'stale-0123456789abcdef').mkdir(
+        parents=True)
+    (profile_dir / 'deps').mkdir()
+    (profile_dir / 'deps' / 'libstale-0123456789abcdef.rlib').write_text('')
+    (path / REFERENCES_FILE).write_text(json.dumps([]))
+    return profile_dir
+
+
+def is_locked(profile_dir):
+    with (profile_dir / '.cargo-lock').open('a') as f:
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            return True
+        fcntl.flock(f, fcntl.LOCK_UN)
+    return False
+
+
+def test_other_target_dirs_are_locked(monkeypatch, tmp_path):
+    idle = create_target_dir(tmp_path / 'idle')
+    busy = create_target_dir(tmp_path / 'busy')
+
+    # the target directory is locked while its units are removed
+    locked_during_removal = []
+    remove = target_gc._Unit.remove
+
+    def checked_remove(unit):
+        locked_during_removal.append(is_locked(idle))
+        return remove(unit)
+
+    monkeypatch.setattr(target_gc._Unit, 'remove', checked_remove)
+
+    with (busy / '.cargo-lock').open('a') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        collect_garbage(
+            tmp_path / 'current', UnitReferences(),
+            other_target_dirs=[tmp_path / 'idle', tmp_path / 'busy'])
+
+    assert locked_during_removal == [True]
+    assert list(idle.glob('*/*')) == []
+    # the units of a target directory used by another build are kept
+    assert len(list(busy.glob('*/*'))) == 2
+    assert not is_locked(idle)
@@ -0,0 +1,31 @@
+# Copyright 2025 Open Source Robotics Foundation, Inc.
+# Licensed under the Apache License, Version 2.0
+
+from contextlib import ExitStack
+
+from colcon_cargo.task.cargo.thread_budget import ThreadBudget
+
+
+def test_share():
+    budget = ThreadBudget()
+    # a job running on its own gets the whole budget
+    with budget.share(16) as threads:
+        assert threads == 16
+
+    with ExitStack() as stack:
+        first = stack.enter_context(budget.share(16))
+        assert first == 16
+        # jobs starting while the budget is used up get a single thread
+        assert stack.enter_context(budget.share(16)) == 1
+        assert budget.active == 2
+
+    with ExitStack() as stack:
+        with ExitStack() as first:
+            first.enter_context(budget.share(16))
+            second = stack.enter_context(budget.share(16))
+        # the threads released by a finished job are granted to the next one
+        # up to an equal share among the running jobs
+        third = stack.enter_context(budget.share(16))
+        assert (second, third) == (1, 8)
+        assert stack.enter_context(budget.share(16)) == 5
+    assert budget.active == 0
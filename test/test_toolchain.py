@@ -0,0 +1,160 @@
+# Copyright 2025 Open Source Robotics Foundation, Inc.
+# Licensed under the Apache License, Version 2.0
+
+import os
+import sys
+
+from colcon_cargo.task.cargo import CACHE_PATH_ENVIRONMENT_VARIABLE
+from colcon_cargo.task.cargo import toolchain as toolchain_module
+from colcon_cargo.task.cargo.toolchain import get_fast_link_args
+from colcon_cargo.task.cargo.toolchain import get_toolchain
+from colcon_cargo.task.cargo.toolchain import get_toolchain_fingerprint
+import pytest
+
+RUSTC_OUTPUT = {
+    '-vV': '\n'.join((
+        'rustc 1.90.0 (1159e78c4 2025-09-14)',
+        'binary: rustc',
+        'commit-hash: 1159e78c4747b02ef996e55082b704c09b970588',
+        'host: x86_64-unknown-linux-gnu',
+        'release: 1.90.0',
+        'LLVM version: 20.1.8',
+    )),
+    'sysroot': '/opt/rust',
+    'cfg': 'debug_assertions\ntarget_os="linux"\nunix',
+}
+
+
+def write_stub(path, outputs, log):
+    path.write_text('\n'.join((
+        f'#!{sys.executable}',
+        'import os',
+        'import sys',
+        f'outputs = {outputs!r}',
+        f'with open({str(log)!r}, "a") as f:',
+        '    f.write(" ".join(sys.argv[1:]) + "\\n")',
+        'output = outputs[sys.argv[-1]]',
+        '# the toolchain file selects the release, as with rustup proxies',
+        'if os.path.exists("rust-toolchain.toml"):',
+        '    with open("rust-toolchain.toml") as f:',
+        '        output = output.replace("1.90.0", f.read().strip())',
+        'print(output)',
+    )) + '\n')
+    path.chmod(0o755)
+
+
+@pytest.mark.skipif(
+    os.name == 'nt', reason='The stub executables require a POSIX system')
+def test_toolchain_probe(monkeypatch, tmp_path):
+    monkeypatch.setenv(
+        CACHE_PATH_ENVIRONMENT_VARIABLE.name, str(tmp_path / 'cache'))
+    monkeypatch.setattr(toolchain_module, '_toolchains', {})
+    log = tmp_path / 'invocations.log'
+    cargo = tmp_path / 'cargo'
+    write_stub(cargo, {'--version': 'cargo 1.90.0'}, log)
+    rustc = tmp_path / 'rustc'
+    write_stub(rustc, RUSTC_OUTPUT, log)
+
+    toolchain = get_toolchain(
+        cargo_executable=str(cargo), rustc_executable=str(rustc))
+    assert toolchain['cargo_version'] == 'cargo 1.90.0'
+    assert toolchain['rustc_version'] == 'rustc 1.90.0 (1159e78c4 2025-09-14)'
+    assert toolchain['release'] == '1.90.0'
+    assert toolchain['host'] == 'x86_64-unknown-linux-gnu'
+    assert toolchain['llvm_version'] == '20.1.8'
+    assert toolchain['sysroot'] == '/opt/rust'
+    assert toolchain['cfg'] == [
+        'debug_assertions', 'target_os="linux"', 'unix']
+    assert len(log.read_text().splitlines()) == 4
+
+    # a new process only invokes `rustc -vV` to identify the toolchain
+    monkeypatch.setattr(toolchain_module, '_toolchains', {})
+    assert get_toolchain(
+        cargo_executable=str(cargo), rustc_executable=str(rustc)) == toolchain
+    assert log.read_text().splitlines()[4:] == ['-vV']
+
+    # a different toolchain selected through rustup is probed again
+    env = dict(os.environ, RUSTUP_TOOLCHAIN='nightly')
+    other = get_toolchain(
+        cargo_executable=str(cargo), rustc_executable=str(rustc), env=env)
+    assert other == toolchain
+    assert len(log.read_text().splitlines()) == 9
+
+    # as is a toolchain selected by a file in the package, although the
+    # executables are the same
+    (tmp_path / 'package').mkdir()
+    (tmp_path / 'package' / 'rust-toolchain.toml').write_text(
+        '1.92.0-nightly\n')
+    nightly = get_toolchain(
+        cargo_executable=str(cargo), rustc_executable=str(rustc),
+        cwd=tmp_path / 'package')
+    assert nightly['release'] == '1.92.0-nightly'
+    assert get_toolchain(
+        cargo_executable=str(cargo), rustc_executable=str(rustc)) == toolchain
+
+    # rustc is looked up on the PATH of the environment it is invoked in
+    bin_dir = tmp_path / 'bin'
+    bin_dir.mkdir()
+    write_stub(bin_dir / 'rustc', RUSTC_OUTPUT, log)
+    monkeypatch.delenv('RUSTC', raising=False)
+    monkeypatch.setenv('PATH', os.defpath)
+    assert get_toolchain(
+        cargo_executable=str(cargo),
+        env={'PATH': str(bin_dir)})['rustc'] == str(bin_dir / 'rustc')
+
+    fingerprint = get_toolchain_fingerprint(toolchain)
+    assert fingerprint == get_toolchain_fingerprint(dict(toolchain))
+    assert fingerprint != get_toolchain_fingerprint(
+        dict(toolchain, release='1.91.0'))
+
+
+@pytest.mark.skipif(
+    os.name == 'nt', reason='The stub executables require a POSIX system')
+def test_fast_link_args(tmp_path):
+    toolchain = {'host': 'x86_64-unknown-linux-gnu', 'release': '1.90.0'}
+    env = {'PATH': str(tmp_path), 'CARGO_HOME': str(tmp_path / 'home')}
+    assert get_fast_link_args(toolchain, env=env, cwd=tmp_path) == [
+        '--config', 'profile.dev.split-debuginfo="unpacked"',
+        '--config', 'profile.release.split-debuginfo="unpacked"',
+    ]
+
+    for name in ('ld.lld', 'mold'):
+        (tmp_path / name).touch(mode=0o755)
+    assert get_fast_link_args(toolchain, env=env, cwd=tmp_path)[:2] == [
+        '--config',
+        'target.x86_64-unknown-linux-gnu.rustflags='
+        '["-C", "link-arg=-fuse-ld=mold"]',
+    ]
+
+    # the flags for the host replace the configured build flags, so they
+    # are merged
+    (tmp_path / 'home').mkdir()
+    (tmp_path / 'home' / 'config.toml').write_text(
+        '[build]\nrustflags = ["-C", "target-cpu=native"]\n')
+    (tmp_path / '.cargo').mkdir()
+    (tmp_path / '.cargo' / 'config.toml').write_text(
+        '[build]\nrustflags = ["--cfg", "local"]\n')
+    assert get_fast_link_args(toolchain, env=env, cwd=tmp_path)[1] == (
+        'target.x86_64-unknown-linux-gnu.rustflags='
+        '["-C", "target-cpu=native", "--cfg", "local", '
+        '"-C", "link-arg=-fuse-ld=mold"]')
+
+    # unless flags for the target are configured, which are joined instead
+    (tmp_path / '.cargo' / 'config.toml').write_text(
+        '[target.x86_64-unknown-linux-gnu]\nrustflags = ["--cfg", "local"]\n')
+    assert get_fast_link_args(toolchain, env=env, cwd=tmp_path)[1] == (
+        'target.x86_64-unknown-linux-gnu.rustflags='
+        '["-C", "link-arg=-fuse-ld=mold"]')
+
+    # flags in the environment take precedence over any configuration
+    assert len(get_fast_link_args(
+        toolchain, env=dict(env, RUSTFLAGS='-Copt-level=1'),
+        cwd=tmp_path)) == 4
+
+    # split debuginfo isn't stable on Linux before Rust 1.65
+    old_toolchain = dict(toolchain, release='1.64.0')
+    assert len(get_fast_link_args(old_toolchain, env=env, cwd=tmp_path)) == 2
+
+    assert get_fast_link_args(
+        {'host': 'x86_64-pc-windows-msvc', 'release': '1.90.0'},
+        env=env, cwd=tmp_path) == []
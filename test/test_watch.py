@@ -0,0 +1,123 @@
+# Copyright 2025 Open Source Robotics Foundation, Inc.
+# Licensed under the Apache License, Version 2.0
+
+import argparse
+import os
+from pathlib import Path
+import sys
+
+from colcon_cargo.task.cargo import artifact_cache
+from colcon_cargo.task.cargo import build as build_module
+from colcon_cargo.task.cargo import command_environment
+from colcon_cargo.task.cargo import toolchain
+from colcon_cargo.verb.cargo_watch import CargoWatchVerb
+from colcon_cargo.verb.cargo_watch import forget_process_state
+from colcon_cargo.verb.cargo_watch import get_affected_packages
+from colcon_cargo.verb.cargo_watch import get_watched_directories
+from colcon_cargo.verb.file_watcher import InotifyWatcher
+from colcon_cargo.verb.file_watcher import PollingWatcher
+from colcon_core.package_descriptor import PackageDescriptor
+import pytest
+
+
+def create_package(path, name):
+    (path / 'src').mkdir(parents=True)
+    (path / 'src' / 'main.rs').write_text('fn main() {}\n')
+    (path / 'Cargo.toml').write_text(f'[package]\nname = "{name}"\n')
+    desc = PackageDescriptor(path)
+    desc.type = 'cargo'
+    desc.name = name
+    return desc
+
+
+@pytest.fixture
+def workspace(tmp_path):
+    root = Path(os.path.realpath(str(tmp_path)))
+    (root / 'Cargo.toml').write_text('[workspace]\nmembers = ["*"]\n')
+    outer = create_package(root / 'outer', 'outer')
+    # a package nested inside of another one
+    inner = create_package(root / 'outer' / 'inner', 'inner')
+    return root, [outer, inner]
+
+
+def test_get_watched_directories(workspace):
+    root, descriptors = workspace
+    directories = dict(get_watched_directories(descriptors))
+    assert directories[root] is False
+    assert directories[root / 'outer'] is False
+    assert directories[root / 'outer' / 'src'] is True
+    assert directories[root / 'outer' / 'inner' / 'src'] is True
+    assert root / 'outer' / 'tests' not in directories
+
+
+def test_get_affected_packages(workspace):
+    root, descriptors = workspace
+    outer = root / 'outer'
+    assert get_affected_packages(
+        descriptors, [outer / 'src' / 'main.rs']) == {'outer'}
+    assert get_affected_packages(
+        descriptors, [outer / 'inner' / 'src' / 'main.rs']) == {'inner'}
+    assert get_affected_packages(
+        descriptors, [outer / 'Cargo.toml']) == {'outer'}
+    # the manifest of the workspace affects all members
+    assert get_affected_packages(
+        descriptors, [root / 'Cargo.toml']) == {'outer', 'inner'}
+    # unrelated files next to the manifests are ignored
+    assert get_affected_packages(
+        descriptors, [outer / 'README.md', root / 'notes.txt']) == set()
+
+
+@pytest.mark.parametrize('watcher_class', (InotifyWatcher, PollingWatcher))
+def test_watcher(watcher_class, workspace):
+    if watcher_class is InotifyWatcher and \
+            not sys.platform.startswith('linux'):
+        pytest.skip('inotify is only available on Linux')
+    root, _ = workspace
+    src = root / 'outer' / 'src'
+    watcher = watcher_class(poll_interval=0.01) \
+        if watcher_class is PollingWatcher else watcher_class()
+    try:
+        watcher.add(src, recursive=True)
+        assert watcher.wait(timeout=0.05) == set()
+
+        (src / 'main.rs').write_text('fn main() { }\n')
+        assert src / 'main.rs' in watcher.wait(timeout=1)
+        while watcher.wait(timeout=0.05):
+            pass
+
+        # new subdirectories are watched as well
+        (src / 'module').mkdir()
+        while watcher.wait(timeout=0.05):
+            pass
+        (src / 'module' / 'mod.rs').write_text('')
+        assert src / 'module' / 'mod.rs' in watcher.wait(timeout=1)
+    finally:
+        watcher.close()
+
+
+def test_verb_arguments():
+    parser = argparse.ArgumentParser()
+    verb = CargoWatchVerb()
+    verb.add_arguments(parser=parser)
+    args = parser.parse_args(['--watch-debounce', '1'])
+    assert args.watch_debounce == 1.0
+    assert args.watch_poll_interval == 1.0
+    assert hasattr(args, 'build_base')
+
+
+def test_forget_process_state(monkeypatch):
+    memos = (
+        (artifact_cache, '_install_fingerprints'),
+        (command_environment, '_environments'),
+        (toolchain, '_toolchains'),
+    )
+    for module, name in memos + ((build_module, '_metadata_cache'), ):
+        monkeypatch.setattr(module, name, {'key': 'value'})
+
+    forget_process_state(manifest_changed=False)
+    assert all(getattr(module, name) == {} for module, name in memos)
+    # the metadata only depends on the manifests
+    assert build_module._metadata_cache == {'key': 'value'}
+
+    forget_process_state(manifest_changed=True)
+    assert build_module._metadata_cache == {}